@@ -31,20 +31,25 @@ from sqlmodel import SQLModel
 
 # Import all your models so they are registered with SQLModel.metadata
 from app.models.user import User
+from app.models.refresh_token import RefreshToken
+from app.models.idempotency_key import IdempotencyKey
 from app.models.user_profile import UserProfile
 from app.models.seller_profile import SellerProfile
 from app.models.address import Address
 from app.models.category import Category
 from app.models.product import Product
+from app.models.product_price import ProductPrice
 from app.models.product_category import ProductCategoryLink
 from app.models.product_review import ProductReview
 from app.models.product_discount import ProductDiscount
 from app.models.cart import Cart
 from app.models.cart_item import CartItem
+from app.models.stock_reservation import StockReservation
 from app.models.coupon import Coupon
 from app.models.coupon_usage import CouponUsage
 from app.models.order import Order
 from app.models.order_item import OrderItem
+from app.models.order_status_count import OrderStatusCount
 from app.models.shipment import Shipment
 from app.models.shipment_discount import ShipmentDiscount
 from app.models.category_discount import CategoryDiscount
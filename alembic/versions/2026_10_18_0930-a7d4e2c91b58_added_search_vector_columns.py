@@ -0,0 +1,37 @@
+"""added search vector columns
+
+Revision ID: a7d4e2c91b58
+Revises: 3f1c2a9d7b10
+Create Date: 2026-10-18 09:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel  # Add SQLModel import
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7d4e2c91b58'
+down_revision: Union[str, None] = '3f1c2a9d7b10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+SEARCH_VECTOR = "to_tsvector('english', coalesce(name, '') || ' ' || coalesce(description, ''))"
+
+
+def upgrade() -> None:
+    op.add_column('products', sa.Column('search_vector', postgresql.TSVECTOR(), sa.Computed(SEARCH_VECTOR, persisted=True), nullable=True))
+    op.create_index('ix_products_search_vector', 'products', ['search_vector'], unique=False, postgresql_using='gin')
+    op.add_column('categories', sa.Column('search_vector', postgresql.TSVECTOR(), sa.Computed(SEARCH_VECTOR, persisted=True), nullable=True))
+    op.create_index('ix_categories_search_vector', 'categories', ['search_vector'], unique=False, postgresql_using='gin')
+
+
+def downgrade() -> None:
+    op.drop_index('ix_categories_search_vector', table_name='categories', postgresql_using='gin')
+    op.drop_column('categories', 'search_vector')
+    op.drop_index('ix_products_search_vector', table_name='products', postgresql_using='gin')
+    op.drop_column('products', 'search_vector')
@@ -0,0 +1,35 @@
+"""added trigram indexes
+
+Revision ID: c52e8f0d3a61
+Revises: a7d4e2c91b58
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel  # Add SQLModel import
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c52e8f0d3a61'
+down_revision: Union[str, None] = 'a7d4e2c91b58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.create_index('ix_products_name_trgm', 'products', ['name'], unique=False, postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'})
+    op.create_index('ix_products_description_trgm', 'products', ['description'], unique=False, postgresql_using='gin', postgresql_ops={'description': 'gin_trgm_ops'})
+    op.create_index('ix_categories_name_trgm', 'categories', ['name'], unique=False, postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'})
+    op.create_index('ix_categories_description_trgm', 'categories', ['description'], unique=False, postgresql_using='gin', postgresql_ops={'description': 'gin_trgm_ops'})
+
+
+def downgrade() -> None:
+    op.drop_index('ix_categories_description_trgm', table_name='categories', postgresql_using='gin')
+    op.drop_index('ix_categories_name_trgm', table_name='categories', postgresql_using='gin')
+    op.drop_index('ix_products_description_trgm', table_name='products', postgresql_using='gin')
+    op.drop_index('ix_products_name_trgm', table_name='products', postgresql_using='gin')
+    # pg_trgm is left installed, other objects may depend on it
@@ -0,0 +1,29 @@
+"""added image variants
+
+Revision ID: e1a7c3b95d02
+Revises: d8b3f6a1c274
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel  # Add SQLModel import
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e1a7c3b95d02'
+down_revision: Union[str, None] = 'd8b3f6a1c274'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # existing images get no variants and keep serving the original file
+    op.add_column('images', sa.Column('variants', postgresql.JSONB(astext_type=sa.Text()), server_default=sa.text("'{}'::jsonb"), nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('images', 'variants')
@@ -0,0 +1,30 @@
+"""added image content hash
+
+Revision ID: f4c9a2e7b813
+Revises: e1a7c3b95d02
+Create Date: 2026-10-18 11:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel  # Add SQLModel import
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f4c9a2e7b813'
+down_revision: Union[str, None] = 'e1a7c3b95d02'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # existing images keep their uuid named file and no hash, they are not deduplicated
+    op.add_column('images', sa.Column('content_hash', sqlmodel.sql.sqltypes.AutoString(length=64), nullable=True))
+    op.create_index(op.f('ix_images_content_hash'), 'images', ['content_hash'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_images_content_hash'), table_name='images')
+    op.drop_column('images', 'content_hash')
@@ -0,0 +1,46 @@
+"""added cart items unique product
+
+Revision ID: a2b9d4e61f37
+Revises: f4c9a2e7b813
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel  # Add SQLModel import
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a2b9d4e61f37'
+down_revision: Union[str, None] = 'f4c9a2e7b813'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # merge duplicate lines into the oldest one before the constraint is added
+    op.execute("""
+        UPDATE cart_items AS c SET quantity = d.quantity
+        FROM (
+            SELECT cart_id, product_id, sum(quantity) AS quantity
+            FROM cart_items GROUP BY cart_id, product_id HAVING count(*) > 1
+        ) AS d
+        WHERE c.cart_id = d.cart_id AND c.product_id = d.product_id
+    """)
+    op.execute("""
+        DELETE FROM cart_items AS c USING cart_items AS o
+        WHERE c.cart_id = o.cart_id AND c.product_id = o.product_id
+          AND (c.created_at, c.id) > (o.created_at, o.id)
+    """)
+    op.execute("""
+        UPDATE carts SET total = coalesce(
+            (SELECT sum(unit_price * quantity) FROM cart_items WHERE cart_items.cart_id = carts.id), 0
+        )
+    """)
+    op.create_unique_constraint('uq_cart_items_cart_id_product_id', 'cart_items', ['cart_id', 'product_id'])
+
+
+def downgrade() -> None:
+    op.drop_constraint('uq_cart_items_cart_id_product_id', 'cart_items', type_='unique')
@@ -1,10 +1,18 @@
+import asyncio
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+from typing import Callable, Optional, Dict, Any, Tuple, TypeVar
+from uuid import UUID, uuid4
+from fastapi import HTTPException, status
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 import os
 from dotenv import load_dotenv
 
+from app.authentication.auth_schema import UserSnapshot
+from app.core.cache import TTLCache
+
 load_dotenv()
 
 # Security settings
@@ -12,10 +20,38 @@ SECRET_KEY = os.getenv("SECRET_KEY", "your-super-secret-key-change-this-in-produ
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
 REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "7"))
+# how often expired refresh tokens are deleted
+REFRESH_TOKEN_PURGE_INTERVAL_MINUTES = float(os.getenv("REFRESH_TOKEN_PURGE_INTERVAL_MINUTES", "60"))
+
+
+# User snapshot cache settings, a role or status change reaches other workers within the ttl
+USER_SNAPSHOT_CACHE_TTL_SECONDS = float(os.getenv("USER_SNAPSHOT_CACHE_TTL_SECONDS", "30"))
+USER_SNAPSHOT_CACHE_SIZE = int(os.getenv("USER_SNAPSHOT_CACHE_SIZE", "10000"))
+
+# Password hashing settings
+# bcrypt work factor, hashes made with another cost are rehashed on the next login
+PASSWORD_HASH_ROUNDS = int(os.getenv("PASSWORD_HASH_ROUNDS", "12"))
+# hashes computed at the same time, bcrypt releases the GIL so threads run in parallel
+PASSWORD_HASH_MAX_CONCURRENCY = int(os.getenv("PASSWORD_HASH_MAX_CONCURRENCY", str(min(4, os.cpu_count() or 1))))
+# requests allowed to wait for a free slot, and how long, before answering 503
+PASSWORD_HASH_MAX_WAITING = int(os.getenv("PASSWORD_HASH_MAX_WAITING", "32"))
+PASSWORD_HASH_WAIT_TIMEOUT_SECONDS = float(os.getenv("PASSWORD_HASH_WAIT_TIMEOUT_SECONDS", "2"))
 
 
 # Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=PASSWORD_HASH_ROUNDS)
+
+_password_hash_executor = ThreadPoolExecutor(
+    max_workers=PASSWORD_HASH_MAX_CONCURRENCY,
+    thread_name_prefix="password-hash"
+)
+_password_hash_slots = asyncio.Semaphore(PASSWORD_HASH_MAX_CONCURRENCY)
+_password_hash_waiting = 0
+
+T = TypeVar("T")
+
+# auth snapshots by user id, invalidated by the repositories that change users
+user_snapshot_cache: TTLCache[UUID, UserSnapshot] = TTLCache(USER_SNAPSHOT_CACHE_SIZE, USER_SNAPSHOT_CACHE_TTL_SECONDS)
 
 
 
@@ -30,6 +66,49 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+def _password_hash_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Server is busy, please try again",
+        headers={"Retry-After": "1"}
+    )
+
+
+async def _run_password_hash(func: Callable[..., T], *args: Any) -> T:
+    """Run a bcrypt call on the hashing pool, shedding load with 503 once the pool is saturated."""
+    global _password_hash_waiting
+
+    if _password_hash_slots.locked():
+        if _password_hash_waiting >= PASSWORD_HASH_MAX_WAITING:
+            raise _password_hash_busy()
+        _password_hash_waiting += 1
+        try:
+            await asyncio.wait_for(_password_hash_slots.acquire(), PASSWORD_HASH_WAIT_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            raise _password_hash_busy()
+        finally:
+            _password_hash_waiting -= 1
+    else:
+        await _password_hash_slots.acquire()
+
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_password_hash_executor, func, *args)
+    finally:
+        _password_hash_slots.release()
+
+
+async def hash_password(password: str) -> str:
+    """Hash a password without blocking the event loop."""
+    return await _run_password_hash(get_password_hash, password)
+
+
+async def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify a password without blocking the event loop.
+    Returns (valid, new_hash), new_hash is set when the stored hash uses an outdated cost."""
+    return await _run_password_hash(pwd_context.verify_and_update, plain_password, hashed_password)
+
+
 def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT access token."""
     to_encode = data.copy()
@@ -51,11 +130,17 @@ def create_refresh_token(data: Dict[str, Any], expires_delta: Optional[timedelta
     else:
         expire = datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
     
-    to_encode.update({"exp": expire, "type": "refresh"})
+    # jti keeps two tokens issued in the same second apart, their digests are unique keys
+    to_encode.update({"exp": expire, "type": "refresh", "jti": uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 
+def hash_token(token: str) -> str:
+    """SHA-256 digest a token is stored and looked up by."""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
 def decode_token(token: str) -> Dict[str, Any]:
     """Decode and verify a JWT token."""
     try:
@@ -1,47 +1,46 @@
-from typing import Optional, List
+from typing import Any, Dict, Optional, List
 from uuid import UUID
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
 from jose import JWTError
 
-from app.authentication.auth_schema import UserRole
+from app.authentication.auth_schema import UserRole, UserSnapshot
 from app.db.database import get_db
-from app.models.user import User
 from app.repositories.auth_repository import AuthRepository
 from .auth_configuration import decode_token
 
 security = HTTPBearer()
 
 
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: AsyncSession = Depends(get_db)
-) -> User:
-    """Get current authenticated user from JWT token."""
-    token = credentials.credentials
-    
-    # Decode token
-    payload = decode_token(token)
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+async def get_token_claims(
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+) -> Dict[str, Any]:
+    """Decode the access token, no database access."""
+    payload = decode_token(credentials.credentials)
     
-    if not payload or payload.get("type") != "access":
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+    if not payload or payload.get("type") != "access" or payload.get("sub") is None:
+        raise _credentials_exception()
     
-    user_id = payload.get("sub")
-    if user_id is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+    return payload
+
+
+async def _get_user_snapshot(payload: Dict[str, Any], db: AsyncSession) -> UserSnapshot:
+    try:
+        user_id = UUID(payload["sub"])
+    except ValueError:
+        raise _credentials_exception()
     
-    # Get user from database
     auth_repo = AuthRepository(db)
-    user = await auth_repo.get_user_by_id(UUID(user_id))
+    user = await auth_repo.get_user_snapshot(user_id)
     
     if user is None:
         raise HTTPException(
@@ -58,9 +57,17 @@ async def get_current_user(
     return user
 
 
+async def get_current_user(
+    payload: Dict[str, Any] = Depends(get_token_claims),
+    db: AsyncSession = Depends(get_db)
+) -> UserSnapshot:
+    """Get the auth snapshot of the current user, cached per user id."""
+    return await _get_user_snapshot(payload, db)
+
+
 async def get_current_active_user(
-    current_user: User = Depends(get_current_user)
-) -> User:
+    current_user: UserSnapshot = Depends(get_current_user)
+) -> UserSnapshot:
     """Get current active user."""
     if not current_user.is_active:
         raise HTTPException(
@@ -71,8 +78,8 @@ async def get_current_active_user(
 
 
 async def get_current_verified_user(
-    current_user: User = Depends(get_current_active_user)
-) -> User:
+    current_user: UserSnapshot = Depends(get_current_active_user)
+) -> UserSnapshot:
     """Get current verified user."""
     if not current_user.is_verified:
         raise HTTPException(
@@ -83,17 +90,33 @@ async def get_current_verified_user(
 
 
 class RoleChecker:
-    """Role-based access control dependency."""
+    """
+    Role-based access control dependency.
+    The role claim of the token is checked first, so a wrong role is rejected without a lookup.
+    The cached snapshot then catches deactivated users and role changes made after the token was issued.
+    """
     
     def __init__(self, allowed_roles: List[UserRole]):
         self.allowed_roles = allowed_roles
     
-    def __call__(self, user: User = Depends(get_current_active_user)) -> User:
+    def __forbidden(self, role: str) -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=f"User with role '{role}' is not authorized to access this resource"
+        )
+    
+    async def __call__(
+        self,
+        payload: Dict[str, Any] = Depends(get_token_claims),
+        db: AsyncSession = Depends(get_db)
+    ) -> UserSnapshot:
+        role = payload.get("role")
+        if role not in [allowed_role.value for allowed_role in self.allowed_roles]:
+            raise self.__forbidden(str(role))
+        
+        user = await _get_user_snapshot(payload, db)
         if user.role not in self.allowed_roles:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail=f"User with role '{user.role.value}' is not authorized to access this resource"
-            )
+            raise self.__forbidden(user.role.value)
         return user
 
 
@@ -107,7 +130,7 @@ require_user = RoleChecker([UserRole.USER, UserRole.SELLER, UserRole.ADMIN])
 async def get_optional_current_user(
     authorization: Optional[str] = None,
     db: AsyncSession = Depends(get_db)
-) -> Optional[User]:
+) -> Optional[UserSnapshot]:
     """Get current user if token is provided, otherwise return None."""
     if not authorization:
         return None
@@ -128,9 +151,9 @@ async def get_optional_current_user(
         if user_id is None:
             return None
         
-        # Get user from database
+        # Get user snapshot, cached per user id
         auth_repo = AuthRepository(db)
-        user = await auth_repo.get_user_by_id(UUID(user_id))
+        user = await auth_repo.get_user_snapshot(UUID(user_id))
         
         if user and user.is_active:
             return user
@@ -138,4 +161,4 @@ async def get_optional_current_user(
     except (ValueError, JWTError):
         pass
     
-    return None
\ No newline at end of file
+    return None
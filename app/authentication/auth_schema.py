@@ -1,7 +1,7 @@
 from __future__ import annotations
 from datetime import datetime
 from typing import Optional
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, ConfigDict, EmailStr, Field
 from pydantic_extra_types.phone_numbers import PhoneNumber
 PhoneNumber.phone_format = 'E164'
 from uuid import UUID
@@ -26,6 +26,16 @@ class TokenData(BaseModel):
     role: Optional[UserRole] = None
 
 
+class UserSnapshot(BaseModel):
+    """The part of a user that authorization needs, cached per user id."""
+    model_config = ConfigDict(frozen=True)
+
+    id: UUID
+    role: UserRole
+    is_active: bool
+    is_verified: bool
+
+
 class LoginRequestEmail(BaseModel):
     email: EmailStr
     password: str
@@ -0,0 +1,205 @@
+## DISCOUNT AND COUPON BOUNDARY SCHEDULER ##
+import asyncio
+import heapq
+import itertools
+import time
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Optional, Set, Tuple, Union
+from uuid import UUID
+from sqlalchemy import and_, true, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from app.core.constants import BOUNDARY_SCHEDULER_HORIZON_HOURS, BOUNDARY_SCHEDULER_RELOAD_MINUTES
+from app.db.database import AsyncSessionLocal
+from app.models.category_discount import CategoryDiscount
+from app.models.coupon import Coupon
+from app.models.product_discount import ProductDiscount
+from app.models.shipment_discount import ShipmentDiscount
+
+Scheduled = Union[Coupon, ProductDiscount, CategoryDiscount, ShipmentDiscount]
+
+# the row a discount applies to, passed to listeners so they know what to recompute
+_ENTITY_COLUMNS = {
+   Coupon: None,
+   ProductDiscount: ProductDiscount.product_id,
+   CategoryDiscount: CategoryDiscount.category_id,
+   ShipmentDiscount: ShipmentDiscount.shipment_id,
+}
+
+# a row is live through end_at, it is flipped right after
+_END_DELAY = timedelta(microseconds=1)
+
+
+class LiveChange(NamedTuple):
+   model: type
+   id: UUID
+   entity_id: Optional[UUID]
+   is_live: bool
+
+
+Listener = Callable[[List[LiveChange]], Awaitable[None]]
+
+
+def is_live_now(row: Scheduled) -> bool:
+   """ is_live of a row being written, windows are naive local times like the rest of the discount code """
+   return row.is_active and row.start_at <= datetime.now() <= row.end_at
+
+
+def _live_expression(model, now: datetime):
+   return and_(model.is_active == True, model.start_at <= now, model.end_at >= now)
+
+
+class BoundaryScheduler:
+   """
+   Keeps the persisted is_live flag of coupons and discounts in step with their start_at / end_at.
+   Upcoming boundaries wait in a min-heap, one task sleeps until the earliest and flips the rows it
+   belongs to, then tells the listeners what changed. Writes set is_live themselves and queue the row's
+   boundaries with schedule(). The heap only holds the next BOUNDARY_SCHEDULER_HORIZON_HOURS, a reload
+   every BOUNDARY_SCHEDULER_RELOAD_MINUTES extends it and fixes rows that crossed a boundary while no
+   scheduler ran. Each worker runs its own, flipping the same row twice is a no-op
+   """
+
+   def __init__(self):
+      self.__heap: List[Tuple[datetime, int, type, UUID]] = []
+      self.__counter = itertools.count()
+      self.__listeners: List[Listener] = []
+      self.__wakeup: Optional[asyncio.Event] = None
+      self.__task: Optional["asyncio.Task[None]"] = None
+
+
+   def subscribe(self, listener: Listener) -> None:
+      if listener not in self.__listeners:
+         self.__listeners.append(listener)
+
+
+   def schedule(self, row: Scheduled) -> None:
+      """ queue the boundaries of a row that was just committed """
+      now = datetime.now()
+      horizon = now + timedelta(hours= BOUNDARY_SCHEDULER_HORIZON_HOURS)
+      for at in (row.start_at, row.end_at + _END_DELAY):
+         if now < at <= horizon:
+            self.__push(at, type(row), row.id)
+
+
+   def __push(self, at: datetime, model: type, id: UUID) -> None:
+      earliest = self.__heap[0][0] if self.__heap else None
+      heapq.heappush(self.__heap, (at, next(self.__counter), model, id))
+      if self.__wakeup is not None and (earliest is None or at < earliest):
+         # the task sleeps until the old head, wake it to sleep until this one
+         self.__wakeup.set()
+
+
+   async def start(self) -> None:
+      self.__wakeup = asyncio.Event()
+      await self.__reload()
+      self.__task = asyncio.create_task(self.__run(), name= "boundary_scheduler")
+
+
+   async def stop(self) -> None:
+      if self.__task is not None:
+         self.__task.cancel()
+         await asyncio.gather(self.__task, return_exceptions= True)
+         self.__task = None
+
+
+   async def __run(self) -> None:
+      assert self.__wakeup is not None
+      next_reload = time.monotonic() + BOUNDARY_SCHEDULER_RELOAD_MINUTES * 60
+      while True:
+         self.__wakeup.clear()
+         timeout = next_reload - time.monotonic()
+         if self.__heap:
+            timeout = min(timeout, (self.__heap[0][0] - datetime.now()).total_seconds())
+         if timeout > 0:
+            try:
+               await asyncio.wait_for(self.__wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+               pass
+
+         try:
+            if time.monotonic() >= next_reload:
+               next_reload = time.monotonic() + BOUNDARY_SCHEDULER_RELOAD_MINUTES * 60
+               await self.__reload()
+            await self.__flip_due()
+         except asyncio.CancelledError:
+            raise
+         except Exception as e:
+            # the popped boundaries are not lost for good, the next reload reconciles them
+            print(f"❌ Boundary scheduler failed: {e}")
+
+
+   async def __flip(self, session: AsyncSession, model, condition, now: datetime) -> List[LiveChange]:
+      live = _live_expression(model, now)
+      entity = _ENTITY_COLUMNS[model]
+      columns = [model.id, model.is_live] + ([entity] if entity is not None else [])
+      statement = (
+         update(model)
+         .where(condition, model.is_live != live)
+         .values(is_live= live)
+         .returning(*columns)
+         .execution_options(synchronize_session= False)
+      )
+      result = await session.execute(statement)
+      return [
+         LiveChange(model, row[0], row[2] if entity is not None else None, row[1])
+         for row in result.all()
+      ]
+
+
+   async def __flip_due(self) -> None:
+      now = datetime.now()
+      due: Dict[type, List[UUID]] = {}
+      while self.__heap and self.__heap[0][0] <= now:
+         _, _, model, id = heapq.heappop(self.__heap)
+         due.setdefault(model, []).append(id)
+      if not due:
+         return
+
+      async with AsyncSessionLocal() as session: # type: ignore
+         changes: List[LiveChange] = []
+         for model, ids in due.items():
+            changes += await self.__flip(session, model, model.id.in_(ids), now)
+         await session.commit()
+      await self.__publish(changes)
+
+
+   async def __reload(self) -> None:
+      """ flip every row whose is_live is out of date, then refill the heap up to the horizon """
+      now = datetime.now()
+      horizon = now + timedelta(hours= BOUNDARY_SCHEDULER_HORIZON_HOURS)
+      entries: Set[Tuple[datetime, type, UUID]] = set()
+      changes: List[LiveChange] = []
+      async with AsyncSessionLocal() as session: # type: ignore
+         for model in _ENTITY_COLUMNS:
+            changes += await self.__flip(session, model, true(), now)
+            starts = await session.execute(
+               select(model.id, model.start_at)
+               .where(model.is_active == True, model.start_at > now, model.start_at <= horizon)
+            )
+            entries.update((start_at, model, id) for id, start_at in starts.all())
+            ends = await session.execute(
+               select(model.id, model.end_at)
+               .where(model.is_active == True, model.end_at >= now, model.end_at <= horizon)
+            )
+            entries.update((end_at + _END_DELAY, model, id) for id, end_at in ends.all())
+         await session.commit()
+
+      # rows scheduled by writes while the reload ran are kept
+      entries.update((at, model, id) for at, _, model, id in self.__heap)
+      self.__heap = [(at, next(self.__counter), model, id) for at, model, id in entries]
+      heapq.heapify(self.__heap)
+      await self.__publish(changes)
+
+
+   async def __publish(self, changes: List[LiveChange]) -> None:
+      if not changes:
+         return
+      for listener in self.__listeners:
+         try:
+            await listener(changes)
+         except Exception as e:
+            print(f"❌ Boundary listener failed: {e}")
+
+
+boundary_scheduler = BoundaryScheduler()
@@ -0,0 +1,109 @@
+## BULK IMPORT / EXPORT FORMATS ##
+import codecs
+import csv
+import io
+import json
+from typing import Any, AsyncIterator, Dict, Iterable, NamedTuple, Optional
+
+from app.enums.enums import Bulk_Format
+
+MEDIA_TYPES = {
+   Bulk_Format.CSV: "text/csv",
+   Bulk_Format.NDJSON: "application/x-ndjson",
+}
+
+
+class ImportRecord(NamedTuple):
+   row: int
+   values: Optional[Dict[str, Any]]
+   error: Optional[str] = None
+
+
+def format_from_content_type(content_type: str) -> Optional[Bulk_Format]:
+   media_type = content_type.split(";")[0].strip().lower()
+   if media_type in ("text/csv", "application/csv"):
+      return Bulk_Format.CSV
+   if media_type in ("application/x-ndjson", "application/ndjson", "application/jsonl"):
+      return Bulk_Format.NDJSON
+   return None
+
+
+async def _iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+   """Split a byte stream into text lines, keeping the line ends. A leading BOM is dropped"""
+   decoder = codecs.getincrementaldecoder("utf-8-sig")()
+   buffer = ""
+   async for chunk in chunks:
+      buffer += decoder.decode(chunk)
+      lines = buffer.split("\n")
+      buffer = lines.pop()
+      for line in lines:
+         yield line + "\n"
+   buffer += decoder.decode(b"", final=True)
+   if buffer:
+      yield buffer
+
+
+async def iter_csv_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[ImportRecord]:
+   """Records of a CSV stream keyed by its header row, quoted values may span lines"""
+   header: Optional[list] = None
+   pending: list = []
+   quotes = 0
+   row = 0
+   async for line in _iter_lines(chunks):
+      pending.append(line)
+      quotes += line.count('"')
+      if quotes % 2:
+         # inside a quoted value, the record goes on in the next line
+         continue
+
+      values = next(csv.reader(pending), [])
+      pending, quotes = [], 0
+      if not any(value.strip() for value in values):
+         continue
+      if header is None:
+         header = [name.strip() for name in values]
+         continue
+
+      row += 1
+      if len(values) != len(header):
+         yield ImportRecord(row, None, f"Expected {len(header)} columns, got {len(values)}")
+      else:
+         yield ImportRecord(row, dict(zip(header, values)))
+
+   if pending:
+      yield ImportRecord(row + 1, None, "Unterminated quoted value")
+
+
+async def iter_ndjson_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[ImportRecord]:
+   """One JSON object per non blank line"""
+   row = 0
+   async for line in _iter_lines(chunks):
+      if not line.strip():
+         continue
+      row += 1
+      try:
+         values = json.loads(line)
+      except ValueError:
+         yield ImportRecord(row, None, "Invalid JSON")
+         continue
+      if not isinstance(values, dict):
+         yield ImportRecord(row, None, "Expected a JSON object")
+         continue
+      yield ImportRecord(row, values)
+
+
+def iter_records(chunks: AsyncIterator[bytes], bulk_format: Bulk_Format) -> AsyncIterator[ImportRecord]:
+   if bulk_format == Bulk_Format.CSV:
+      return iter_csv_records(chunks)
+   return iter_ndjson_records(chunks)
+
+
+def csv_line(values: Iterable[Any]) -> str:
+   output = io.StringIO()
+   csv.writer(output, lineterminator="\n").writerow(values)
+   return output.getvalue()
+
+
+def ndjson_line(values: Dict[str, Any]) -> str:
+   # decimals and uuids are written as strings, they read back exactly
+   return json.dumps(values, default=str, separators=(",", ":")) + "\n"
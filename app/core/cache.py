@@ -0,0 +1,54 @@
+## IN-PROCESS CACHES ##
+import time
+from collections import OrderedDict
+from typing import Generic, Hashable, Optional, Tuple, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class TTLCache(Generic[K, V]):
+   """
+   Size bounded LRU cache whose entries expire after ttl_seconds.
+   It lives in one worker process, so other workers only see a change once their entry expires.
+   """
+
+   def __init__(self, maxsize: int, ttl_seconds: float):
+      self.maxsize = maxsize
+      self.ttl_seconds = ttl_seconds
+      self.__entries: "OrderedDict[K, Tuple[float, V]]" = OrderedDict()
+
+
+   def get(self, key: K) -> Optional[V]:
+      entry = self.__entries.get(key)
+      if entry is None:
+         return None
+
+      expires_at, value = entry
+      if expires_at <= time.monotonic():
+         del self.__entries[key]
+         return None
+
+      self.__entries.move_to_end(key)
+      return value
+
+
+   def set(self, key: K, value: V) -> None:
+      if self.maxsize <= 0 or self.ttl_seconds <= 0:
+         return
+      self.__entries[key] = (time.monotonic() + self.ttl_seconds, value)
+      self.__entries.move_to_end(key)
+      while len(self.__entries) > self.maxsize:
+         self.__entries.popitem(last=False)
+
+
+   def invalidate(self, key: K) -> None:
+      self.__entries.pop(key, None)
+
+
+   def clear(self) -> None:
+      self.__entries.clear()
+
+
+   def __len__(self) -> int:
+      return len(self.__entries)
@@ -6,8 +6,80 @@ from app import main
 UPLOAD_DIRECTORY = "uploads/images"
 ALLOWED_MIME_TYPES = ["image/jpeg",  "image/jpg", "image/png", "image/webp"]
 MAX_FILE_SIZE = 5 * 1024 * 1024  ## 5MB
+UPLOAD_CHUNK_SIZE = 256 * 1024  ## uploads are streamed to disk in chunks of this size
 MAX_IMAGES_PER_PRODUCT = 10
 ALLOWED_ENTITES = ["product", "category", "user_profile", "seller_profile"]
 
+## resized webp copies made at upload time, name -> longest side in pixels
+IMAGE_VARIANTS = {"thumbnail": 160, "card": 480, "full": 1280}
+IMAGE_VARIANT_QUALITY = 80
+IMAGE_VARIANT_WORKERS = 2
+## uploaded files are named by content and never rewritten, so they can be cached for good
+UPLOAD_CACHE_CONTROL = "public, max-age=31536000, immutable"
 
-MAIN_URL = "http://127.0.0.1:8000"
\ No newline at end of file
+
+## STOCK RESERVATION CONSTANTS ##
+# cart lines hold their units this long after the last change, checkout re-reserves expired ones
+STOCK_RESERVATION_TTL_MINUTES = 15
+# how often expired reservations are given back to stock
+STOCK_RESERVATION_SWEEP_INTERVAL_SECONDS = 60
+
+
+## IDEMPOTENCY CONSTANTS ##
+# stored responses are replayed for this long
+IDEMPOTENCY_KEY_TTL_HOURS = 24
+# a claim whose request has not finished after this is taken over by the next retry
+IDEMPOTENCY_LOCK_SECONDS = 60
+# a duplicate waits this long for the first request to finish before answering 409
+IDEMPOTENCY_WAIT_SECONDS = 10
+# bodies are buffered to be hashed, larger idempotent requests are refused
+IDEMPOTENCY_MAX_BODY_BYTES = 1024 * 1024
+IDEMPOTENCY_PURGE_INTERVAL_MINUTES = 60
+
+
+## ORDER CONSTANTS ##
+# shard rows per status in order_status_counts, more shards means less contention between checkouts
+ORDER_STATUS_COUNT_SHARDS = 8
+
+
+## BULK PRODUCT IMPORT / EXPORT CONSTANTS ##
+# rows validated, resolved and upserted per statement, each chunk commits on its own
+PRODUCT_IMPORT_CHUNK_SIZE = 1000
+# an import keeps going past bad rows, only the first ones are described in the result
+PRODUCT_IMPORT_MAX_ERRORS = 100
+# rows fetched per round trip by the export's server side cursor
+PRODUCT_EXPORT_BATCH_SIZE = 1000
+
+
+## STREAMED LIST CONSTANTS ##
+# rows fetched per round trip and written per chunk by streamed list responses
+STREAM_BATCH_SIZE = 500
+
+
+## EFFECTIVE PRICE CONSTANTS ##
+# how often product prices whose discount started or ended are recomputed, a discount boundary
+# shows up in product reads at most this late
+PRICE_REFRESH_INTERVAL_SECONDS = 30
+
+
+## BOUNDARY SCHEDULER CONSTANTS ##
+# coupon and discount boundaries further out than this are not held in memory yet
+BOUNDARY_SCHEDULER_HORIZON_HOURS = 24
+# how often the scheduler extends its horizon and reconciles is_live with the database,
+# which also picks up rows written by other worker processes
+BOUNDARY_SCHEDULER_RELOAD_MINUTES = 10
+
+
+## COUPON CACHE CONSTANTS ##
+# validation snapshots of hot coupon codes, per worker. A redemption that uses up a coupon or an
+# admin change drops the entry, other workers see the change within the ttl, checkout re-checks anyway
+COUPON_SNAPSHOT_CACHE_SIZE = 1000
+COUPON_SNAPSHOT_CACHE_TTL_SECONDS = 30
+
+
+MAIN_URL = "http://127.0.0.1:8000"
+
+
+## SEARCH CONSTANTS ##
+# minimum pg_trgm word similarity for a trigram search hit, lower tolerates more typos
+TRIGRAM_SIMILARITY_THRESHOLD = 0.3
@@ -0,0 +1,183 @@
+## IDEMPOTENCY KEYS ##
+import asyncio
+import hashlib
+import time
+from typing import List, Optional
+from uuid import UUID
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.authentication.auth_configuration import decode_token
+from app.core.constants import IDEMPOTENCY_MAX_BODY_BYTES, IDEMPOTENCY_WAIT_SECONDS
+from app.db.database import AsyncSessionLocal
+from app.repositories.idempotency_repository import IdempotencyRepository
+
+IDEMPOTENCY_KEY_HEADER = "idempotency-key"
+IDEMPOTENT_REPLAY_HEADER = "idempotent-replayed"
+IDEMPOTENT_METHODS = frozenset({"POST", "PATCH"})
+# conflicts and rate limits can pass on their own, a retry with the key runs the request again
+TRANSIENT_STATUS_CODES = frozenset({409, 429})
+MAX_KEY_LENGTH = 255
+# streamed uploads, buffering them would cap them at IDEMPOTENCY_MAX_BODY_BYTES. The import upserts
+# by name, running it again with the same body gives the same catalog
+STREAMED_PATHS = frozenset({"/api/v1/products/import"})
+
+
+def _caller(headers: Headers) -> Optional[str]:
+   """Keys are scoped to the user of a valid access token, anonymous requests are not deduplicated"""
+   scheme, _, token = headers.get("authorization", "").partition(" ")
+   if scheme.lower() != "bearer" or not token:
+      return None
+   payload = decode_token(token)
+   if payload.get("type") != "access" or payload.get("sub") is None:
+      return None
+   return str(payload["sub"])
+
+
+async def _read_body(receive: Receive) -> Optional[bytes]:
+   """The whole request body, None when it is over IDEMPOTENCY_MAX_BODY_BYTES"""
+   body = bytearray()
+   more_body = True
+   while more_body:
+      message = await receive()
+      if message["type"] != "http.request":
+         break
+      body += message.get("body", b"")
+      if len(body) > IDEMPOTENCY_MAX_BODY_BYTES:
+         return None
+      more_body = message.get("more_body", False)
+   return bytes(body)
+
+
+def _request_hash(scope: Scope, body: bytes) -> str:
+   digest = hashlib.sha256()
+   digest.update(scope["method"].encode())
+   digest.update(b"\0" + scope["path"].encode())
+   digest.update(b"\0" + scope.get("query_string", b""))
+   digest.update(b"\0" + body)
+   return digest.hexdigest()
+
+
+class IdempotencyMiddleware:
+   """
+   A POST or PATCH sent with an Idempotency-Key header runs once per key and caller. The response is
+   stored and later requests with the same key get it back without reaching the route. A duplicate that
+   arrives while the first request still runs waits for its response instead of running in parallel.
+   Server errors, conflicts and rate limits are not stored, the key is released so the client can retry
+   """
+
+   def __init__(self, app: ASGIApp) -> None:
+      self.app = app
+
+
+   async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+      if scope["type"] != "http" or scope["method"] not in IDEMPOTENT_METHODS or scope["path"] in STREAMED_PATHS:
+         await self.app(scope, receive, send)
+         return
+
+      headers = Headers(scope=scope)
+      key = headers.get(IDEMPOTENCY_KEY_HEADER)
+      caller = _caller(headers) if key is not None else None
+      if key is None or caller is None:
+         await self.app(scope, receive, send)
+         return
+
+      if not key or len(key) > MAX_KEY_LENGTH:
+         await JSONResponse({"detail": "Invalid Idempotency-Key"}, status_code= 400)(scope, receive, send)
+         return
+
+      body = await _read_body(receive)
+      if body is None:
+         await JSONResponse({"detail": "Request body too large for an Idempotency-Key"}, status_code= 413)(scope, receive, send)
+         return
+      request_hash = _request_hash(scope, body)
+
+      async with AsyncSessionLocal() as session: # type: ignore
+         repository = IdempotencyRepository(session)
+         deadline = time.monotonic() + IDEMPOTENCY_WAIT_SECONDS
+         delay = 0.05
+         while True:
+            claim_id = await repository.claim(caller, key, request_hash)
+            if claim_id is not None:
+               await self.__run(repository, claim_id, body, scope, receive, send)
+               return
+
+            stored = await repository.get(caller, key)
+            if stored is None:
+               # released by a failed request in between, claim it again
+               continue
+            if stored.request_hash != request_hash:
+               await JSONResponse(
+                  {"detail": "Idempotency-Key was already used for a different request"}, status_code= 422
+               )(scope, receive, send)
+               return
+            if stored.status_code is not None:
+               await self.__replay(stored.status_code, stored.response_headers or [], stored.response_body or b"", send)
+               return
+            if time.monotonic() >= deadline:
+               await JSONResponse(
+                  {"detail": "A request with this Idempotency-Key is still in progress"}, status_code= 409
+               )(scope, receive, send)
+               return
+
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.5)
+
+
+   async def __run(
+      self,
+      repository: IdempotencyRepository,
+      claim_id: UUID,
+      body: bytes,
+      scope: Scope,
+      receive: Receive,
+      send: Send
+   ) -> None:
+      body_sent = False
+
+      async def receive_buffered() -> Message:
+         nonlocal body_sent
+         if not body_sent:
+            body_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+         return await receive()
+
+      status_code: Optional[int] = None
+      response_headers: List[List[str]] = []
+      chunks: List[bytes] = []
+
+      async def send_recorded(message: Message) -> None:
+         nonlocal status_code, response_headers
+         if message["type"] == "http.response.start":
+            status_code = message["status"]
+            response_headers = [
+               [name.decode("latin-1"), value.decode("latin-1")]
+               for name, value in message.get("headers", [])
+               if name.lower() != b"content-length"
+            ]
+         elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+         await send(message)
+
+      try:
+         await self.app(scope, receive_buffered, send_recorded)
+      except BaseException:
+         await asyncio.shield(repository.release(claim_id))
+         raise
+
+      if status_code is None or status_code >= 500 or status_code in TRANSIENT_STATUS_CODES:
+         await repository.release(claim_id)
+      else:
+         await repository.complete(claim_id, status_code, response_headers, b"".join(chunks))
+
+
+   async def __replay(self, status_code: int, stored_headers: List[List[str]], body: bytes, send: Send) -> None:
+      # the first response's headers (Location, Set-Cookie, ..), middleware outside this one adds its own again
+      headers = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in stored_headers]
+      headers += [
+         (b"content-length", str(len(body)).encode()),
+         (IDEMPOTENT_REPLAY_HEADER.encode(), b"true")
+      ]
+      await send({"type": "http.response.start", "status": status_code, "headers": headers})
+      await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,65 @@
+## IMAGE VARIANTS ##
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+from PIL import Image as PILImage, ImageOps, UnidentifiedImageError
+
+from app.core.constants import IMAGE_VARIANT_QUALITY, IMAGE_VARIANT_WORKERS, IMAGE_VARIANTS
+
+VARIANT_MIME_TYPE = "image/webp"
+
+# pillow releases the GIL while decoding, resizing and encoding, so threads are enough
+_variant_executor = ThreadPoolExecutor(max_workers=IMAGE_VARIANT_WORKERS, thread_name_prefix="image-variants")
+
+
+def variant_file_name(file_name: str, variant: str) -> str:
+   return f"{os.path.splitext(file_name)[0]}_{variant}.webp"
+
+
+def _generate_variants(directory: str, file_name: str) -> Dict[str, Dict[str, Any]]:
+   variants: Dict[str, Dict[str, Any]] = {}
+   try:
+      with PILImage.open(os.path.join(directory, file_name)) as source:
+         source = ImageOps.exif_transpose(source)
+         if source.mode not in ("RGB", "RGBA"):
+            source = source.convert("RGBA" if "A" in source.getbands() else "RGB")
+
+         for variant, max_side in IMAGE_VARIANTS.items():
+            resized = source.copy()
+            # thumbnail keeps the aspect ratio and never upscales
+            resized.thumbnail((max_side, max_side), PILImage.Resampling.LANCZOS)
+
+            name = variant_file_name(file_name, variant)
+            path = os.path.join(directory, name)
+            resized.save(path, "WEBP", quality=IMAGE_VARIANT_QUALITY, method=4)
+            variants[variant] = {
+               "file_name": name,
+               "width": resized.width,
+               "height": resized.height,
+               "file_size": os.path.getsize(path),
+               "mime_type": VARIANT_MIME_TYPE
+            }
+   except (UnidentifiedImageError, OSError):
+      # not decodable, the original is still served
+      _remove_variant_files(directory, variants)
+      return {}
+   return variants
+
+
+async def generate_variants(directory: str, file_name: str) -> Dict[str, Dict[str, Any]]:
+   """Write the resized webp variants of an uploaded file, returns their metadata by variant name"""
+   loop = asyncio.get_running_loop()
+   return await loop.run_in_executor(_variant_executor, _generate_variants, directory, file_name)
+
+
+def _remove_variant_files(directory: str, variants: Dict[str, Dict[str, Any]]) -> None:
+   for variant in variants.values():
+      try:
+         os.remove(os.path.join(directory, variant["file_name"]))
+      except OSError:
+         pass
+
+
+def variant_paths(directory: str, variants: Dict[str, Dict[str, Any]]) -> List[str]:
+   return [os.path.join(directory, variant["file_name"]).replace("\\", "/") for variant in variants.values()]
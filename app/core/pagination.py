@@ -0,0 +1,40 @@
+## KEYSET PAGINATION HELPERS ##
+import base64
+import json
+from datetime import datetime
+from typing import Any, Callable, Sequence, Tuple
+from uuid import UUID
+from fastapi import HTTPException, status
+
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def _to_json_value(value: Any) -> Any:
+   if isinstance(value, UUID):
+      return str(value)
+   if isinstance(value, datetime):
+      return value.isoformat()
+   return value
+
+
+def encode_cursor(key: Sequence[Any]) -> str:
+   """Encode the sort key of the last row of a page into an opaque cursor"""
+   raw = json.dumps([_to_json_value(value) for value in key], separators=(",", ":"))
+   return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, *parsers: Callable[[Any], Any]) -> Tuple[Any, ...]:
+   """Decode a cursor back into its sort key, converting each value with the matching parser"""
+   try:
+      raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+      values = json.loads(raw)
+      if not isinstance(values, list) or len(values) != len(parsers):
+         raise ValueError("cursor has the wrong shape")
+      return tuple(parse(value) for parse, value in zip(parsers, values))
+   except (ValueError, TypeError):
+      raise HTTPException(
+         status_code= status.HTTP_400_BAD_REQUEST,
+         detail= "Invalid cursor"
+      )
@@ -0,0 +1,26 @@
+## PERIODIC BACKGROUND JOBS ##
+import asyncio
+from typing import Any, Awaitable, Callable, List
+
+
+async def run_periodically(name: str, interval_seconds: float, job: Callable[[], Awaitable[Any]]) -> None:
+   """Run job every interval_seconds until cancelled, a failing run is logged and retried next interval"""
+   while True:
+      await asyncio.sleep(interval_seconds)
+      try:
+         await job()
+      except asyncio.CancelledError:
+         raise
+      except Exception as e:
+         print(f"❌ Periodic job '{name}' failed: {e}")
+
+
+def start_periodic(tasks: List["asyncio.Task[None]"], name: str, interval_seconds: float, job: Callable[[], Awaitable[Any]]) -> None:
+   tasks.append(asyncio.create_task(run_periodically(name, interval_seconds, job), name=name))
+
+
+async def stop_periodic(tasks: List["asyncio.Task[None]"]) -> None:
+   for task in tasks:
+      task.cancel()
+   await asyncio.gather(*tasks, return_exceptions=True)
+   tasks.clear()
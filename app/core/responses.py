@@ -0,0 +1,16 @@
+## JSON RESPONSES ##
+from typing import Any
+from fastapi.responses import JSONResponse
+from pydantic_core import to_json
+
+
+class PydanticJSONResponse(JSONResponse):
+   """
+   JSON response rendered by pydantic_core in one pass. Models and lists of models are written
+   straight to bytes with their own serializers (Money fields included), so a route that returns
+   PydanticJSONResponse(schemas) skips FastAPI's second validation and its jsonable dict copy.
+   As the default response class it also renders what other routes return, in place of json.dumps
+   """
+
+   def render(self, content: Any) -> bytes:
+      return to_json(content)
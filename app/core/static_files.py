@@ -0,0 +1,25 @@
+## STATIC FILES ##
+import os
+from fastapi.staticfiles import StaticFiles
+from starlette.responses import Response
+from starlette.types import Scope
+
+from app.core.constants import UPLOAD_CACHE_CONTROL
+
+
+class ImmutableStaticFiles(StaticFiles):
+   """
+   Serves uploads with far future cache headers.
+   Uploaded files are named by their content hash and never rewritten, a changed image gets a new url.
+   """
+
+   def file_response(
+         self,
+         full_path: "os.PathLike[str] | str",
+         stat_result: os.stat_result,
+         scope: Scope,
+         status_code: int = 200
+         ) -> Response:
+      response = super().file_response(full_path, stat_result, scope, status_code)
+      response.headers["Cache-Control"] = UPLOAD_CACHE_CONTROL
+      return response
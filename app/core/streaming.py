@@ -0,0 +1,46 @@
+## STREAMED LIST RESPONSES ##
+from typing import AsyncIterator, Callable, Sequence
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.db.database import stream_with_session
+from app.enums.enums import Stream_Format
+
+STREAM_MEDIA_TYPES = {
+   Stream_Format.NDJSON: "application/x-ndjson",
+   Stream_Format.JSON: "application/json",
+}
+
+Batches = AsyncIterator[Sequence[BaseModel]]
+
+
+async def _ndjson(batches: Batches) -> AsyncIterator[bytes]:
+   async for batch in batches:
+      if batch:
+         yield b"".join(item.model_dump_json().encode() + b"\n" for item in batch)
+
+
+async def _json_array(batches: Batches) -> AsyncIterator[bytes]:
+   yield b"["
+   separator = b""
+   async for batch in batches:
+      if batch:
+         yield separator + b",".join(item.model_dump_json().encode() for item in batch)
+         separator = b","
+   yield b"]"
+
+
+def streaming_list_response(
+   session_factory: sessionmaker,
+   produce: Callable[[AsyncSession], Batches],
+   stream_format: Stream_Format
+) -> StreamingResponse:
+   """
+   Write a list one batch at a time as NDJSON or as a JSON array. produce gets a session of its own
+   and yields batches of schemas, so memory holds one batch however long the list is
+   """
+   batches = stream_with_session(session_factory, produce)
+   body = _ndjson(batches) if stream_format == Stream_Format.NDJSON else _json_array(batches)
+   return StreamingResponse(body, media_type= STREAM_MEDIA_TYPES[stream_format])
@@ -0,0 +1,57 @@
+import time
+from typing import Any, Dict
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, PoolProxiedConnection
+
+
+class PoolMetrics:
+    """Counters of how long checkouts waited for a connection, kept per worker process"""
+
+    def __init__(self) -> None:
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+
+    def record(self, waited_seconds: float, timed_out: bool) -> None:
+        if timed_out:
+            self.timeouts += 1
+        else:
+            self.checkouts += 1
+        self.wait_seconds_total += waited_seconds
+        self.wait_seconds_max = max(self.wait_seconds_max, waited_seconds)
+
+
+class MeteredAsyncQueuePool(AsyncAdaptedQueuePool):
+    """The default asyncio pool, timing every checkout including pre ping and new connections"""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+
+    def connect(self) -> PoolProxiedConnection:
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.metrics.record(time.perf_counter() - started, timed_out=True)
+            raise
+        self.metrics.record(time.perf_counter() - started, timed_out=False)
+        return connection
+
+
+    def stats(self) -> Dict[str, Any]:
+        metrics = self.metrics
+        return {
+            "pool_size": self.size(),
+            "max_overflow": self._max_overflow,
+            "in_use": self.checkedout(),
+            "idle": self.checkedin(),
+            "overflow": max(0, self.overflow()),
+            "checkouts": metrics.checkouts,
+            "checkout_timeouts": metrics.timeouts,
+            "checkout_wait_avg_ms": round(1000 * metrics.wait_seconds_total / max(1, metrics.checkouts + metrics.timeouts), 3),
+            "checkout_wait_max_ms": round(1000 * metrics.wait_seconds_max, 3),
+        }
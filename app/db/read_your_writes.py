@@ -0,0 +1,63 @@
+import time
+from typing import Optional
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.requests import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.cache import TTLCache
+from app.db.db_configuration import READ_YOUR_WRITES_CACHE_SIZE, READ_YOUR_WRITES_SECONDS
+
+READ_PRIMARY_COOKIE = "read_primary_until"
+SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+# bearer tokens that wrote recently. A cookie carries the same mark to the other workers, clients
+# that drop cookies stay on the primary only on the worker that served their write
+_recent_writers: TTLCache[str, bool] = TTLCache(READ_YOUR_WRITES_CACHE_SIZE, READ_YOUR_WRITES_SECONDS)
+
+
+def _bearer_token(headers: Headers) -> Optional[str]:
+    scheme, _, token = headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    # not verified, marking a forged token only sends its own reads to the primary
+    return token
+
+
+def reads_primary(request: Request) -> bool:
+    """True while the caller is inside the read-your-writes window of its last write"""
+    until = request.cookies.get(READ_PRIMARY_COOKIE)
+    if until:
+        try:
+            if float(until) > time.time():
+                return True
+        except ValueError:
+            pass
+    token = _bearer_token(request.headers)
+    return token is not None and _recent_writers.get(token) is not None
+
+
+class ReadYourWritesMiddleware:
+    """Marks the caller of every successful unsafe request so its next reads skip the replicas"""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS or READ_YOUR_WRITES_SECONDS <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_marked(message: Message) -> None:
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                token = _bearer_token(Headers(scope=scope))
+                if token is not None:
+                    _recent_writers.set(token, True)
+                until = time.time() + READ_YOUR_WRITES_SECONDS
+                MutableHeaders(scope=message).append(
+                    "set-cookie",
+                    f"{READ_PRIMARY_COOKIE}={until:.3f}; Max-Age={int(READ_YOUR_WRITES_SECONDS) + 1}; Path=/; HttpOnly; SameSite=Lax"
+                )
+            await send(message)
+
+        await self.app(scope, receive, send_marked)
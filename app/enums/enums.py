@@ -47,4 +47,26 @@ class Gender(str, Enum):
     FEMALE = "female"
 
     def __str__(self):
-        return self.value
\ No newline at end of file
+        return self.value
+
+class Search_Algorithm(str, Enum):
+    ILIKE = "ilike"
+    FULL_TEXT = "full_text"
+    TRIGRAM = "trigram"
+
+    def __str__(self):
+        return self.value
+
+class Bulk_Format(str, Enum):
+    CSV = "csv"
+    NDJSON = "ndjson"
+
+    def __str__(self):
+        return self.value
+
+class Stream_Format(str, Enum):
+    NDJSON = "ndjson"
+    JSON = "json"
+
+    def __str__(self):
+        return self.value
@@ -2,51 +2,108 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI, File, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
 import os
+from typing import List
 from dotenv import load_dotenv  # Add this import
 
 # Load environment variables from .env file
 load_dotenv()  # Add this line at the top
 
-from app.db.database import engine
+from app.db.database import AsyncSessionLocal, engine, pool_stats, read_engines
+from app.db.read_your_writes import ReadYourWritesMiddleware
 from app.db.seeder import seed_database
 from sqlmodel import SQLModel
-
-
-from fastapi.staticfiles import StaticFiles
+from sqlalchemy import text
 
 
 
 # Import all your models...
 from app.models.user import User
+from app.models.refresh_token import RefreshToken
+from app.models.idempotency_key import IdempotencyKey
 from app.models.user_profile import UserProfile
 from app.models.seller_profile import SellerProfile
 from app.models.address import Address
 from app.models.category import Category
 from app.models.product import Product
+from app.models.product_price import ProductPrice
 from app.models.product_category import ProductCategoryLink
 from app.models.product_review import ProductReview
 from app.models.product_discount import ProductDiscount
 from app.models.cart import Cart
 from app.models.cart_item import CartItem
+from app.models.stock_reservation import StockReservation
 from app.models.coupon import Coupon
 from app.models.coupon_usage import CouponUsage
 from app.models.order import Order
 from app.models.order_item import OrderItem
+from app.models.order_status_count import OrderStatusCount
 from app.models.shipment import Shipment
 from app.models.shipment_discount import ShipmentDiscount
 from app.models.category_discount import CategoryDiscount
 
 from app.routers import api_router
+from app.authentication.auth_configuration import REFRESH_TOKEN_PURGE_INTERVAL_MINUTES
+from app.core.boundary_scheduler import LiveChange, boundary_scheduler
+from app.core.periodic import start_periodic, stop_periodic
+from app.core.static_files import ImmutableStaticFiles
+from app.core.constants import (
+    IDEMPOTENCY_PURGE_INTERVAL_MINUTES,
+    PRICE_REFRESH_INTERVAL_SECONDS,
+    STOCK_RESERVATION_SWEEP_INTERVAL_SECONDS
+)
+from app.core.idempotency import IdempotencyMiddleware
+from app.core.responses import PydanticJSONResponse
+from app.repositories.auth_repository import AuthRepository
+from app.repositories.idempotency_repository import IdempotencyRepository
+from app.repositories.price_repository import PriceRepository
+from app.repositories.stock_reservation_repository import StockReservationRepository
+
+
+async def purge_expired_refresh_tokens():
+    async with AsyncSessionLocal() as session: # type: ignore
+        await AuthRepository(session).purge_expired_refresh_tokens()
+
+
+async def release_expired_stock_reservations():
+    async with AsyncSessionLocal() as session: # type: ignore
+        await StockReservationRepository(session).release_expired()
+
+
+async def purge_expired_idempotency_keys():
+    async with AsyncSessionLocal() as session: # type: ignore
+        await IdempotencyRepository(session).purge_expired()
+
+
+async def refresh_due_prices():
+    async with AsyncSessionLocal() as session: # type: ignore
+        await PriceRepository(session).refresh_due()
+
+
+async def refresh_prices_at_boundaries(changes: List[LiveChange]):
+    """Effective prices follow a product or category discount the moment it starts or ends"""
+    product_ids = [change.entity_id for change in changes if change.model is ProductDiscount]
+    category_ids = {change.entity_id for change in changes if change.model is CategoryDiscount}
+    if not product_ids and not category_ids:
+        return
+    async with AsyncSessionLocal() as session: # type: ignore
+        repository = PriceRepository(session)
+        await repository.refresh_products(product_ids) # type: ignore
+        for category_id in category_ids:
+            await repository.refresh_category(category_id) # type: ignore
+        await session.commit()
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Lifespan context manager to handle startup and shutdown events"""
     # Startup
+    periodic_tasks = []
     try:
         print("🚀 Starting E-commerce API...")
         
-        # Create database tables
+        # Create database tables, the trigram indexes need pg_trgm
         async with engine.begin() as conn:
+            await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
             await conn.run_sync(SQLModel.metadata.create_all)
         
         print("✅ Database tables created successfully")
@@ -59,6 +116,40 @@ async def lifespan(app: FastAPI):
             await seed_database()
         else:
             print("🌱 Database seeding disabled (set SEED_DATABASE=true to enable)")
+
+        # effective prices of products that have none yet
+        async with AsyncSessionLocal() as session: # type: ignore
+            await PriceRepository(session).refresh_missing()
+
+        # coupon and discount is_live flips at start_at / end_at
+        boundary_scheduler.subscribe(refresh_prices_at_boundaries)
+        await boundary_scheduler.start()
+        
+        # Background jobs
+        start_periodic(
+            periodic_tasks,
+            "purge_expired_refresh_tokens",
+            REFRESH_TOKEN_PURGE_INTERVAL_MINUTES * 60,
+            purge_expired_refresh_tokens
+        )
+        start_periodic(
+            periodic_tasks,
+            "release_expired_stock_reservations",
+            STOCK_RESERVATION_SWEEP_INTERVAL_SECONDS,
+            release_expired_stock_reservations
+        )
+        start_periodic(
+            periodic_tasks,
+            "purge_expired_idempotency_keys",
+            IDEMPOTENCY_PURGE_INTERVAL_MINUTES * 60,
+            purge_expired_idempotency_keys
+        )
+        start_periodic(
+            periodic_tasks,
+            "refresh_due_prices",
+            PRICE_REFRESH_INTERVAL_SECONDS,
+            refresh_due_prices
+        )
         
         print("🎉 E-commerce API startup complete!")
         
@@ -70,16 +161,25 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     print("👋 E-commerce API shutting down...")
+    await stop_periodic(periodic_tasks)
+    await boundary_scheduler.stop()
 
 # Create FastAPI app
 app = FastAPI(
     title="E-commerce API",
     description="A comprehensive e-commerce API built with FastAPI and SQLModel",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=PydanticJSONResponse
 )
 
-# Add CORS middleware
+# Retried POST / PATCH requests carrying an Idempotency-Key get the stored response
+app.add_middleware(IdempotencyMiddleware)
+
+# After a write the caller reads from the primary for a moment, see get_read_db
+app.add_middleware(ReadYourWritesMiddleware)
+
+# Added last so it is the outermost, responses written by the middleware above get the CORS headers too
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # Configure this properly for production
@@ -110,6 +210,14 @@ async def health_check():
         "message": "E-commerce API is running successfully"
     }
 
+@app.get("/health/db")
+async def database_health():
+    """Connection pool usage of this worker, size pools so workers x (pool_size + max_overflow) fits max_connections"""
+    return {
+        "primary": pool_stats(engine),
+        "replicas": [pool_stats(read_engine) for read_engine in read_engines]
+    }
+
 
 
 # @app.post("/uploadfile/")
@@ -119,4 +227,4 @@ async def health_check():
 
 
 
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
\ No newline at end of file
+app.mount("/uploads", ImmutableStaticFiles(directory="uploads"), name="uploads")
\ No newline at end of file
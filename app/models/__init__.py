@@ -5,6 +5,8 @@ SQLModel database models with careful import order
 
 # Import independent models first
 from .user import User, UserBase
+from .refresh_token import RefreshToken, RefreshTokenBase
+from .idempotency_key import IdempotencyKey, IdempotencyKeyBase
 from .category import Category, CategoryBase
 
 from .image import Image, ImageBase
@@ -19,12 +21,14 @@ from .address import Address, AddressBase
 
 # Import models with relationships
 from .product import Product, ProductBase
+from .product_price import ProductPrice
 from .coupon import Coupon, CouponBase
 from .shipment import Shipment, ShipmentBase
 
 # Import models that depend on many others
 from .cart import Cart, CartBase
 from .cart_item import CartItem, CartItemBase
+from .stock_reservation import StockReservation, StockReservationBase
 from .product_review import ProductReview, ProductReviewBase
 from .coupon_usage import CouponUsage, CouponUsageBase
 
@@ -36,15 +40,17 @@ from .shipment_discount import ShipmentDiscount
 # Import complex models last
 from .order import Order, OrderBase
 from .order_item import OrderItem, OrderItemBase
+from .order_status_count import OrderStatusCount
 
 __all__ = [
     "User", "UserBase", "UserProfile", "UserProfileBase",
     "SellerProfile", "SellerProfileBase", "Address", "AddressBase",
-    "Category", "CategoryBase", "Product", "ProductBase", "ProductCategoryLink",
+    "Category", "CategoryBase", "Product", "ProductBase", "ProductPrice", "ProductCategoryLink",
     "ProductReview", "ProductReviewBase", "ProductDiscount",
     "CategoryDiscount", "Cart", "CartBase",
-    "CartItem", "CartItemBase", "Coupon", "CouponBase",
+    "CartItem", "CartItemBase", "StockReservation", "StockReservationBase", "Coupon", "CouponBase",
     "CouponUsage", "CouponUsageBase", "Shipment", "ShipmentBase",
     "ShipmentDiscount", "Order", "OrderBase",
-    "OrderItem", "OrderItemBase", "Image", "ImageBase"
+    "OrderItem", "OrderItemBase", "OrderStatusCount", "Image", "ImageBase",
+    "RefreshToken", "RefreshTokenBase", "IdempotencyKey", "IdempotencyKeyBase"
 ]
\ No newline at end of file
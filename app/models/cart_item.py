@@ -1,5 +1,6 @@
 
 from decimal import Decimal
+from sqlalchemy import UniqueConstraint
 from sqlmodel import Field, Relationship
 from typing import TYPE_CHECKING
 from uuid import UUID
@@ -28,6 +29,10 @@ class CartItemBase(BaseModel, table=False):
 
 class CartItem(CartItemBase, table=True):
    __tablename__ = "cart_items" # type: ignore
+   __table_args__ = (
+      # one line per product, adding a product again upserts onto it
+      UniqueConstraint("cart_id", "product_id", name="uq_cart_items_cart_id_product_id"),
+   )
 
    cart: "Cart" =  Relationship(back_populates="cart_items")
    product: "Product" = Relationship(back_populates="cart_items")
@@ -1,7 +1,9 @@
 
 
+from sqlalchemy import Column, Computed, Index
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlmodel import Field, Relationship
-from typing import List, TYPE_CHECKING
+from typing import List, Optional, TYPE_CHECKING
 from uuid import UUID
 
 from app.models.base_model import BaseModel
@@ -20,11 +22,26 @@ class CategoryBase(BaseModel, table=False):
 
 class Category(CategoryBase, table=True):
     __tablename__ = "categories" # type: ignore
+    __table_args__ = (
+        Index("ix_categories_search_vector", "search_vector", postgresql_using="gin"),
+        # pg_trgm indexes, serve trigram search and the ILIKE '%text%' fallback
+        Index("ix_categories_name_trgm", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}),
+        Index("ix_categories_description_trgm", "description", postgresql_using="gin", postgresql_ops={"description": "gin_trgm_ops"}),
+    )
+
+    # generated by postgres from name and description, used by full text search
+    search_vector: Optional[str] = Field(
+        default= None,
+        sa_column= Column(
+            TSVECTOR,
+            Computed("to_tsvector('english', coalesce(name, '') || ' ' || coalesce(description, ''))", persisted=True)
+        )
+    )
 
     products: List["Product"] = Relationship(
         back_populates= "categories", 
         link_model= ProductCategoryLink,
-        sa_relationship_kwargs= {'lazy': 'selectin'}
+        sa_relationship_kwargs= {'lazy': 'raise'}
         )
 
     category_discounts: List["CategoryDiscount"] = Relationship(
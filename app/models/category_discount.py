@@ -1,4 +1,5 @@
 
+from sqlalchemy import Index
 from sqlmodel import Field, Relationship
 from typing import TYPE_CHECKING
 from uuid import UUID
@@ -11,7 +12,11 @@ if TYPE_CHECKING:
 
 class CategoryDiscount(DiscountBase, table=True):
    __tablename__ = "category_discounts" # type: ignore
-   category_id: UUID = Field(foreign_key="categories.id", index=True)
+   __table_args__ = (
+      # running discounts of the categories a product belongs to, plain category_id lookups use it too
+      Index("ix_category_discounts_category_id_active_window", "category_id", "is_active", "start_at", "end_at"),
+   )
+   category_id: UUID = Field(foreign_key="categories.id")
    category : "Category" = Relationship(back_populates="category_discounts")
 
 
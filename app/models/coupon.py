@@ -20,6 +20,8 @@ class CouponBase(BaseModel, table=False):
     end_at: datetime
 
     is_active: bool = Field(default=True, index=True)
+    # is_active and inside the window, kept by app.core.boundary_scheduler
+    is_live: bool = Field(default=False, index=True)
 
     @property
     def is_currently_active(self) -> bool:
@@ -33,10 +35,12 @@ class CouponBase(BaseModel, table=False):
 class Coupon(CouponBase, table=True):
     __tablename__ = "coupons" # type: ignore
 
+    # can grow to one row per order, never loaded with the coupon. CouponRepository.delete
+    # removes them with one statement
     coupon_usages: List["CouponUsage"] = Relationship(
         back_populates="coupon",
         cascade_delete=True,
-        sa_relationship_kwargs={"lazy": "selectin"}
+        sa_relationship_kwargs={"lazy": "raise", "passive_deletes": True}
     )
     orders: List["Order"] = Relationship(back_populates="coupon")
     carts: List["Cart"] = Relationship(back_populates="coupon")
@@ -7,6 +7,8 @@ from app.models.base_model import BaseModel
 class DiscountBase(BaseModel, table=False):
     discount_amount: int
     is_active: bool = Field(default=True, index=True)
+    # is_active and inside the window, kept by app.core.boundary_scheduler
+    is_live: bool = Field(default=False, index=True)
 
     start_at: datetime
     end_at: datetime
@@ -0,0 +1,32 @@
+from datetime import datetime
+from typing import List, Optional
+from sqlalchemy import Column, LargeBinary, UniqueConstraint
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlmodel import Field
+
+from app.models.base_model import BaseModel
+
+
+class IdempotencyKeyBase(BaseModel, table=False):
+   # client chosen Idempotency-Key header, unique per caller (user id, or anonymous)
+   key: str = Field(max_length=255)
+   scope: str = Field(max_length=64)
+   # sha256 of method, path and body, a key reused for another request is rejected
+   request_hash: str = Field(max_length=64)
+
+   # the stored response, status_code is None while the first request still runs
+   status_code: Optional[int] = None
+   # [name, value] pairs as sent, content-length is recomputed on replay
+   response_headers: Optional[List[List[str]]] = Field(default=None, sa_column=Column(JSONB))
+   response_body: Optional[bytes] = Field(default=None, sa_column=Column(LargeBinary))
+
+   # an in flight claim older than this is taken over, its request is assumed dead
+   locked_until: datetime
+   expires_at: datetime = Field(index=True)
+
+
+class IdempotencyKey(IdempotencyKeyBase, table=True):
+   __tablename__ = "idempotency_keys" # type: ignore
+   __table_args__ = (
+      UniqueConstraint("scope", "key", name="uq_idempotency_keys_scope_key"),
+   )
@@ -1,7 +1,8 @@
-from typing import TYPE_CHECKING, Optional
+from typing import TYPE_CHECKING, Any, Dict, Optional
 from uuid import UUID
 from sqlmodel import Field, Relationship
-from sqlalchemy import Uuid, table
+from sqlalchemy import Column, Uuid, table, text
+from sqlalchemy.dialects.postgresql import JSONB
 from app.models.base_model import BaseModel
 
 if TYPE_CHECKING:
@@ -12,6 +13,14 @@ class ImageBase(BaseModel, table= False):
    original_file_name: str
    file_size: int = Field(ge=0) # in bytes
    mime_type: str
+   # sha256 of the bytes, the file is named after it and shared by every row with the same content.
+   # rows stored before content addressing have none and own their file
+   content_hash: Optional[str] = Field(default= None, max_length=64, index= True)
+   # resized webp copies by variant name (thumbnail, card, full), see app.core.image_variants
+   variants: Dict[str, Any] = Field(
+      default_factory= dict,
+      sa_column= Column(JSONB, nullable=False, server_default=text("'{}'::jsonb"))
+   )
 
    ## foreign keys ##
    product_id: Optional[UUID] = Field(default= None, foreign_key="products.id", index= True)
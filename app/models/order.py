@@ -1,5 +1,6 @@
 
 from decimal import Decimal
+from sqlalchemy import Index
 from sqlmodel import Field, Relationship
 from typing import TYPE_CHECKING, List, Optional
 from datetime import date
@@ -44,6 +45,10 @@ class OrderBase(BaseModel, table=False):
 
 class Order(OrderBase, table=True):
     __tablename__ = "orders" # type: ignore
+    # status queues are read oldest first, see OrderRepository.get_by_status
+    __table_args__ = (
+        Index("ix_orders_status_created_at_id", "status", "created_at", "id"),
+    )
     
     address: "Address" = Relationship(back_populates="orders")
     user_profile: "UserProfile" = Relationship(back_populates="orders")
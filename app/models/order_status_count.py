@@ -0,0 +1,16 @@
+from sqlmodel import Field, SQLModel
+
+from app.enums.enums import Order_Status
+
+
+class OrderStatusCount(SQLModel, table=True):
+   """
+   Number of orders per status, kept up to date by OrderRepository in the transaction that changes them.
+   Each status is spread over a few shard rows so concurrent checkouts do not queue on one counter row,
+   the count of a status is the sum of its shards
+   """
+   __tablename__ = "order_status_counts" # type: ignore
+
+   status: Order_Status = Field(primary_key=True)
+   shard: int = Field(primary_key=True)
+   count: int = Field(default=0)
@@ -1,6 +1,8 @@
 
+from sqlalchemy import Column, Computed, Index
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlmodel import Field, Relationship
-from typing import TYPE_CHECKING, List
+from typing import TYPE_CHECKING, List, Optional
 from uuid import UUID
 from decimal import Decimal
 
@@ -8,11 +10,12 @@ from app.models.base_model import BaseModel
 from app.models.product_category import ProductCategoryLink
 
 if TYPE_CHECKING:
-    from app.models import CartItem, ProductReview, Category, SellerProfile, OrderItem, ProductDiscount, Image
+    from app.models import CartItem, ProductReview, Category, SellerProfile, OrderItem, ProductDiscount, Image, ProductPrice
 
 
 class ProductBase(BaseModel, table=False):
-    name: str = Field(index=True)
+    # unique, bulk imports upsert on it
+    name: str = Field(index=True, unique=True)
     price: Decimal = Field(gt=0.00)
     stock_quantity: int = Field(default=0, ge=0)
     description: str
@@ -21,17 +24,35 @@ class ProductBase(BaseModel, table=False):
 
 class Product(ProductBase, table=True):
     __tablename__ = "products" # type: ignore
-    
+    __table_args__ = (
+        # keyset pagination walks products by (name, id)
+        Index("ix_products_name_id", "name", "id"),
+        Index("ix_products_search_vector", "search_vector", postgresql_using="gin"),
+        # pg_trgm indexes, serve trigram search and the ILIKE '%text%' fallback
+        Index("ix_products_name_trgm", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}),
+        Index("ix_products_description_trgm", "description", postgresql_using="gin", postgresql_ops={"description": "gin_trgm_ops"}),
+    )
+
+    # generated by postgres from name and description, used by full text search
+    search_vector: Optional[str] = Field(
+        default= None,
+        sa_column= Column(
+            TSVECTOR,
+            Computed("to_tsvector('english', coalesce(name, '') || ' ' || coalesce(description, ''))", persisted=True)
+        )
+    )
+
+    # collections raise on access, queries load them through app.repositories.load_plans
     product_reviews: List["ProductReview"] = Relationship(
         back_populates= "product", 
         cascade_delete= True,
-        sa_relationship_kwargs= {'lazy': 'selectin'}
+        sa_relationship_kwargs= {'lazy': 'raise'}
     )
     
     categories: List["Category"] = Relationship(
         back_populates= "products", 
         link_model= ProductCategoryLink,
-        sa_relationship_kwargs= {'lazy': 'selectin'}
+        sa_relationship_kwargs= {'lazy': 'raise'}
         )
 
     order_items: List["OrderItem"] = Relationship(back_populates="product")
@@ -44,7 +65,7 @@ class Product(ProductBase, table=True):
     product_discounts: List["ProductDiscount"] = Relationship(
         back_populates= "product",
         cascade_delete= True,
-        sa_relationship_kwargs= {'lazy': 'selectin'}
+        sa_relationship_kwargs= {'lazy': 'raise'}
         )
 
     seller_profile: "SellerProfile" = Relationship(back_populates="products")
@@ -52,9 +73,18 @@ class Product(ProductBase, table=True):
     images: List["Image"] = Relationship(
         back_populates= "product",
         cascade_delete= True,
-        sa_relationship_kwargs= {'lazy':'selectin'}
+        sa_relationship_kwargs= {'lazy': 'raise'}
+    )
+
+    # maintained with SQL by PriceRepository, never written through the ORM
+    pricing: Optional["ProductPrice"] = Relationship(
+        sa_relationship_kwargs= {'lazy': 'raise', 'uselist': False, 'viewonly': True}
     )
 
 
+    @property
+    def effective_price(self) -> Decimal:
+        return self.pricing.effective_price if self.pricing else self.price
+
 
 
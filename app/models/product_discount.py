@@ -1,5 +1,6 @@
 
 from typing import TYPE_CHECKING
+from sqlalchemy import Index
 from sqlmodel import Field, Relationship
 from uuid import UUID
 from app.models.discount_base import DiscountBase
@@ -10,7 +11,11 @@ if TYPE_CHECKING:
 
 class ProductDiscount(DiscountBase, table=True):
    __tablename__ = "product_discounts" # type: ignore
-   product_id: UUID = Field(foreign_key="products.id", index=True)
+   __table_args__ = (
+      # active window lookups for the products of a cart or a price refresh, plain product_id lookups use it too
+      Index("ix_product_discounts_product_id_active_window", "product_id", "is_active", "start_at", "end_at"),
+   )
+   product_id: UUID = Field(foreign_key="products.id")
    product : "Product" = Relationship(back_populates="product_discounts")
 
 
@@ -0,0 +1,21 @@
+from datetime import datetime
+from decimal import Decimal
+from typing import Optional
+from uuid import UUID
+from sqlmodel import Field, SQLModel
+
+
+class ProductPrice(SQLModel, table=True):
+   """
+   Effective price of a product: its price less the best discount currently running on the product
+   or one of its categories. Kept by PriceRepository in the transactions that change prices,
+   discounts or category links, and recomputed by a sweep once valid_until has passed
+   """
+   __tablename__ = "product_prices" # type: ignore
+
+   product_id: UUID = Field(foreign_key="products.id", primary_key=True, ondelete="CASCADE")
+   discount_percent: int = Field(default=0)
+   effective_price: Decimal
+   # the next start_at / end_at of the product's discounts, None when no discount is scheduled
+   valid_until: Optional[datetime] = Field(default=None, index=True)
+   refreshed_at: datetime
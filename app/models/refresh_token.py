@@ -0,0 +1,26 @@
+from datetime import datetime
+from typing import TYPE_CHECKING, Optional
+from uuid import UUID
+from sqlmodel import Field, Relationship
+from app.models.base_model import BaseModel
+
+if TYPE_CHECKING:
+   from app.models import User
+
+
+class RefreshTokenBase(BaseModel, table=False):
+   # sha256 hex digest of the jwt, the token itself is never stored
+   token_hash: str = Field(max_length=64, unique=True, index=True)
+   # every login starts a family, rotation keeps it, reusing a rotated token revokes the family
+   family_id: UUID = Field(index=True)
+   expires_at: datetime = Field(index=True)
+   revoked_at: Optional[datetime] = None
+
+   ## foreign keys ##
+   user_id: UUID = Field(foreign_key="users.id", index=True)
+
+
+class RefreshToken(RefreshTokenBase, table=True):
+   __tablename__ = "refresh_tokens" # type: ignore
+
+   user: "User" = Relationship(back_populates="refresh_tokens")
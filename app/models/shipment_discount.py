@@ -1,6 +1,7 @@
 
 from typing import TYPE_CHECKING
 from uuid import UUID
+from sqlalchemy import Index
 from sqlmodel import Field, Relationship
 from app.models.discount_base import DiscountBase
 
@@ -11,7 +12,11 @@ if TYPE_CHECKING:
 
 class ShipmentDiscount(DiscountBase, table=True):
    __tablename__ = "shipment_discounts" # type: ignore
-   shipment_id: UUID = Field(foreign_key="shipments.id", index=True)
+   __table_args__ = (
+      # the running discount of the shipment picked at checkout, plain shipment_id lookups use it too
+      Index("ix_shipment_discounts_shipment_id_active_window", "shipment_id", "is_active", "start_at", "end_at"),
+   )
+   shipment_id: UUID = Field(foreign_key="shipments.id")
    shipment : "Shipment" = Relationship(back_populates="shipment_discounts")
 
 
@@ -0,0 +1,24 @@
+from datetime import datetime
+from sqlalchemy import UniqueConstraint
+from sqlmodel import Field
+from uuid import UUID
+
+from app.models.base_model import BaseModel
+
+
+class StockReservationBase(BaseModel, table=False):
+   # units taken out of products.stock_quantity for one cart line, given back when the line
+   # goes or the reservation expires, kept by the order at checkout
+   quantity: int = Field(gt=0)
+   expires_at: datetime = Field(index=True)
+
+   ## foreign keys ##
+   cart_id: UUID = Field(foreign_key="carts.id", index=True, ondelete="CASCADE")
+   product_id: UUID = Field(foreign_key="products.id", index=True, ondelete="CASCADE")
+
+
+class StockReservation(StockReservationBase, table=True):
+   __tablename__ = "stock_reservations" # type: ignore
+   __table_args__ = (
+      UniqueConstraint("cart_id", "product_id", name="uq_stock_reservations_cart_id_product_id"),
+   )
@@ -9,7 +9,7 @@ from app.models.base_model import BaseModel
 
 
 if TYPE_CHECKING:
-   from app.models import SellerProfile, Address, CouponUsage, Cart, UserProfile, Category
+   from app.models import SellerProfile, Address, CouponUsage, Cart, UserProfile, Category, RefreshToken
 
 def generate_user_name(full_name: str) -> str:
     clean_name = "".join(full_name.split()).lower()
@@ -27,7 +27,6 @@ class UserBase(BaseModel, table=False):
    is_active: bool = Field(default=True)
    is_verified: bool = Field(default=False)
    role: UserRole = Field(default= UserRole.USER)
-   refresh_token: Optional[str] = None
 
 
 
@@ -49,6 +48,7 @@ class User(UserBase, table=True):
    seller_profile: Optional["SellerProfile"] = Relationship(back_populates="user", cascade_delete=True)
    user_profile: Optional["UserProfile"] = Relationship(back_populates="user", cascade_delete=True)
    categories: List["Category"] = Relationship(back_populates="user")
+   refresh_tokens: List["RefreshToken"] = Relationship(back_populates="user", cascade_delete=True)
 
 
 
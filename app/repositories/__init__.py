@@ -11,11 +11,15 @@ from .seller_profile_repository import SellerProfileRepository
 from .auth_repository import AuthRepository
 from .order_repository import OrderRepository
 from .image_repository import ImageRepository
+from .stock_reservation_repository import StockReservationRepository
+from .idempotency_repository import IdempotencyRepository
+from .price_repository import PriceRepository
 
 
 __all__ = [
    "AddressRepository",
    "CartRepository",
+   "StockReservationRepository",
    "CategoryRepository",
    "CouponRepository",
    "DiscountRepository",
@@ -26,5 +30,7 @@ __all__ = [
    "SellerProfileRepository",
    "AuthRepository",
    "OrderRepository",
-   "ImageRepository"
+   "ImageRepository",
+   "IdempotencyRepository",
+   "PriceRepository"
 ]
\ No newline at end of file
@@ -1,9 +1,13 @@
 from __future__ import annotations
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import Optional
-from uuid import UUID
+from uuid import UUID, uuid4
 from sqlmodel import select
+from sqlalchemy import delete, update
 from sqlalchemy.ext.asyncio import AsyncSession
+from app.authentication.auth_configuration import REFRESH_TOKEN_EXPIRE_DAYS, hash_token, user_snapshot_cache
+from app.authentication.auth_schema import UserSnapshot
+from app.models.refresh_token import RefreshToken
 from app.models.user import User
 
 
@@ -25,6 +29,23 @@ class AuthRepository:
         return result.scalar_one_or_none()
     
 
+    async def get_user_snapshot(self, user_id: UUID) -> Optional[UserSnapshot]:
+        """Get the auth snapshot of a user, from the cache or from the users columns only."""
+        snapshot = user_snapshot_cache.get(user_id)
+        if snapshot:
+            return snapshot
+        
+        statement = select(User.id, User.role, User.is_active, User.is_verified).where(User.id == user_id)
+        result = await self.db.execute(statement)
+        row = result.one_or_none()
+        if row is None:
+            return None
+        
+        snapshot = UserSnapshot(id=row.id, role=row.role, is_active=row.is_active, is_verified=row.is_verified)
+        user_snapshot_cache.set(user_id, snapshot)
+        return snapshot
+    
+
     async def create_user(self, user: User) -> User:
         """Create a new user."""
         self.db.add(user)
@@ -38,35 +59,88 @@ class AuthRepository:
         user.updated_at = datetime.utcnow()
         self.db.add(user)
         await self.db.commit()
+        # verify_user also goes through here
+        user_snapshot_cache.invalidate(user.id)
         await self.db.refresh(user)
         return user
     
 
-    async def save_refresh_token(self, user_id: UUID, refresh_token: str) -> bool:
-        """Save refresh token for a user."""
-        user = await self.get_user_by_id(user_id)
-        if user:
-            user.refresh_token = refresh_token
-            await self.update_user(user)
-            return True
-        return False
+    async def save_refresh_token(self, user_id: UUID, refresh_token: str, family_id: Optional[UUID] = None) -> RefreshToken:
+        """Store the digest of a refresh token, a new family is started when none is given."""
+        token = RefreshToken(
+            token_hash=hash_token(refresh_token),
+            family_id=family_id or uuid4(),
+            expires_at=datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+            user_id=user_id
+        )
+        self.db.add(token)
+        await self.db.commit()
+        return token
     
 
-    async def get_user_by_refresh_token(self, refresh_token: str) -> Optional[User]:
-        """Get user by refresh token."""
-        statement = select(User).where(User.refresh_token == refresh_token)
+    async def get_refresh_token(self, refresh_token: str) -> Optional[RefreshToken]:
+        """Get a stored refresh token by the digest of the token."""
+        statement = select(RefreshToken).where(RefreshToken.token_hash == hash_token(refresh_token))
         result = await self.db.execute(statement)
         return result.scalar_one_or_none()
     
 
+    async def rotate_refresh_token(self, current: RefreshToken, new_refresh_token: str) -> bool:
+        """Revoke the current token and store its successor in the same family.
+        Returns False if the current token was already used, e.g. by a concurrent refresh."""
+        now = datetime.utcnow()
+        statement = (
+            update(RefreshToken)
+            .where(RefreshToken.id == current.id, RefreshToken.revoked_at.is_(None)) # type: ignore
+            .values(revoked_at=now, updated_at=now)
+        )
+        result = await self.db.execute(statement)
+        if result.rowcount == 0:
+            await self.db.rollback()
+            return False
+        
+        self.db.add(RefreshToken(
+            token_hash=hash_token(new_refresh_token),
+            family_id=current.family_id,
+            expires_at=now + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+            user_id=current.user_id
+        ))
+        await self.db.commit()
+        return True
+    
+
+    async def revoke_refresh_token_family(self, family_id: UUID) -> bool:
+        """Revoke every token of a family, one device session."""
+        now = datetime.utcnow()
+        statement = (
+            update(RefreshToken)
+            .where(RefreshToken.family_id == family_id, RefreshToken.revoked_at.is_(None)) # type: ignore
+            .values(revoked_at=now, updated_at=now)
+        )
+        await self.db.execute(statement)
+        await self.db.commit()
+        return True
+    
+
     async def revoke_refresh_token(self, user_id: UUID) -> bool:
-        """Revoke user's refresh token."""
-        user = await self.get_user_by_id(user_id)
-        if user:
-            user.refresh_token = None
-            await self.update_user(user)
-            return True
-        return False
+        """Revoke the refresh tokens of a user on every device."""
+        now = datetime.utcnow()
+        statement = (
+            update(RefreshToken)
+            .where(RefreshToken.user_id == user_id, RefreshToken.revoked_at.is_(None)) # type: ignore
+            .values(revoked_at=now, updated_at=now)
+        )
+        await self.db.execute(statement)
+        await self.db.commit()
+        return True
+    
+
+    async def purge_expired_refresh_tokens(self) -> int:
+        """Delete expired refresh tokens, revoked ones are kept until then to detect reuse."""
+        statement = delete(RefreshToken).where(RefreshToken.expires_at < datetime.utcnow())
+        result = await self.db.execute(statement)
+        await self.db.commit()
+        return result.rowcount
     
 
     async def verify_user(self, user_id: UUID) -> bool:
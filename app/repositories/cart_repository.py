@@ -1,10 +1,11 @@
 from datetime import datetime
-from decimal import Decimal
+from decimal import ROUND_HALF_UP, Decimal
 from operator import le
 from typing import List, Optional
 from uuid import UUID
 import uuid
-from sqlalchemy import true
+from sqlalchemy import delete, func, true, update
+from sqlalchemy.dialects.postgresql import insert
 from sqlmodel import select
 from sqlalchemy.orm import selectinload
 
@@ -14,7 +15,11 @@ from app.models.cart import Cart
 from app.models.cart_item import CartItem
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models.coupon import Coupon
+from app.models.user_profile import UserProfile
+from app.models.product import Product
+from app.schemas.coupon import CouponSnapshot
+from app.repositories.load_plans import CART_ITEM_WITH_PRODUCT, CART_WITH_ITEMS
+from app.repositories.stock_reservation_repository import StockReservationRepository
 
 
 
@@ -23,39 +28,28 @@ from app.models.coupon import Coupon
 class CartRepository:
    def __init__(self, db: AsyncSession):
       self.db = db
+      self.reservation_repository = StockReservationRepository(db)
 
 
-   async def __update_cart_total(self, cart_id: UUID) -> Cart:
-      self.db.expire_all()
-      query = (
-         select(Cart)
-         .options(selectinload(Cart.cart_items))
+   async def __refresh_cart_total(self, cart_id: UUID) -> None:
+      """ recompute the stored total from the items in one statement, inside the caller's transaction """
+      items_total = (
+         select(func.coalesce(func.sum(CartItem.unit_price * CartItem.quantity), 0))
+         .where(CartItem.cart_id == cart_id)
+         .scalar_subquery()
+      )
+      statement = (
+         update(Cart)
          .where(Cart.id == cart_id)
+         .values(total= items_total, updated_at= datetime.utcnow())
       )
-      result = await self.db.execute(query)
-      cart = result.scalar_one_or_none()
-      if not cart:
-         raise 
-
-      total = Decimal("0.00")
-      for item in cart.cart_items:
-         if item.total:
-            total += item.total
-
-      cart.total = total
-      cart.updated_at = datetime.utcnow()
-
-      self.db.add(cart)
-      return cart
+      await self.db.execute(statement)
 
 
    async def get_cart_by_id(self, cart_id: UUID) -> Optional[Cart]:
       statement = (
          select(Cart)
-         .options(
-            selectinload(Cart.cart_items)
-            .selectinload(CartItem.product)
-            )
+         .options(*CART_WITH_ITEMS)
          .where(Cart.id == cart_id)
       )
       result = await self.db.execute(statement)
@@ -65,22 +59,43 @@ class CartRepository:
    async def get_cart_by_user_id(self, user_id: UUID) -> Optional[Cart]:
       statement = (
          select(Cart)
-         .options(
-            selectinload(Cart.cart_items)
-            .selectinload(CartItem.product)
-            )
+         .options(*CART_WITH_ITEMS)
          .where(Cart.user_id == user_id)
       )
       result = await self.db.execute(statement)
       return result.scalar_one_or_none()
 
 
+   async def get_cart_for_checkout(self, user_profile_id: UUID) -> Optional[Cart]:
+      """ the cart of the profile's user with its items, the cart row stays locked so one cart checks out once """
+      statement = (
+         select(Cart)
+         .join(UserProfile, UserProfile.user_id == Cart.user_id) # type: ignore
+         .options(selectinload(Cart.cart_items))
+         .where(UserProfile.id == user_profile_id)
+         .with_for_update(of= Cart)
+         .execution_options(populate_existing= True)
+      )
+      result = await self.db.execute(statement)
+      return result.scalar_one_or_none()
+
+
+   async def empty_after_checkout(self, cart_id: UUID) -> None:
+      """ inside the checkout transaction, the reservations were consumed by the order """
+      await self.db.execute(delete(CartItem).where(CartItem.cart_id == cart_id))
+      statement = (
+         update(Cart)
+         .where(Cart.id == cart_id)
+         .values(total= Decimal("0.00"), coupon_id= None, coupon_amount= Decimal("0.00"), updated_at= datetime.utcnow())
+         .execution_options(synchronize_session= False)
+      )
+      await self.db.execute(statement)
+
+
    async def get_cart_items_by_cart_id(self, cart_id: UUID) -> List[CartItem]:
       statement = (
          select(CartItem)
-         .options(
-            selectinload(CartItem.product)
-         )
+         .options(*CART_ITEM_WITH_PRODUCT)
          .where(CartItem.cart_id == cart_id)
       )
       result = await self.db.execute(statement)
@@ -97,53 +112,102 @@ class CartRepository:
    async def get_cart_item_by_id(self, cart_item_id: UUID) -> Optional[CartItem]:
       statement = (
          select(CartItem)
-         .options(selectinload(CartItem.product))
+         .options(*CART_ITEM_WITH_PRODUCT)
          .where(CartItem.id == cart_item_id)
       )
       result = await self.db.execute(statement)
       return result.scalar_one_or_none()
 
-   async def add_cart_item(self, cart_item: CartItem) -> CartItem:
-      self.db.add(cart_item)
-      
-      cart = await self.__update_cart_total(cart_item.cart_id)
+   async def upsert_cart_item(
+         self,
+         cart_id: UUID,
+         product_id: UUID,
+         quantity: int,
+         unit_price: Decimal
+         ) -> Optional[CartItem]:
+      """
+      Add quantity to the cart line of the product, creating the line when missing, reserve the stock
+      for the whole line and refresh the cart total, all in one transaction.
+      Returns None and changes nothing when the stock can not cover the line
+      """
+      now = datetime.utcnow()
+      statement = insert(CartItem).values(
+         id= uuid.uuid4(),
+         created_at= now,
+         updated_at= now,
+         cart_id= cart_id,
+         product_id= product_id,
+         quantity= quantity,
+         unit_price= unit_price
+      )
+      # an existing line keeps the price it was added at
+      statement = statement.on_conflict_do_update(
+         constraint= "uq_cart_items_cart_id_product_id",
+         set_= {
+            "quantity": CartItem.quantity + statement.excluded.quantity,
+            "updated_at": statement.excluded.updated_at
+         }
+      ).returning(CartItem)
+
+      result = await self.db.execute(statement, execution_options={"populate_existing": True})
+      cart_item = result.scalar_one()
+      # the line row lock taken above serializes changes to the same line, stock goes last so
+      # the product row is locked only until the commit right after
+      await self.__refresh_cart_total(cart_id)
+      if not await self.reservation_repository.reserve(cart_id, product_id, cart_item.quantity):
+         await self.db.rollback()
+         return None
 
       await self.db.commit()
-      await self.db.refresh(cart_item)
       return cart_item
-   
 
-   async def update_cart_item(self, cart_item: CartItem) -> CartItem:
-      self.db.add(cart_item)
 
-      await self.db.flush()
+   async def set_cart_item_quantity(self, cart_item_id: UUID, quantity: int) -> Optional[CartItem]:
+      """ returns None and changes nothing when the item is missing or the stock can not cover quantity """
+      statement = (
+         update(CartItem)
+         .where(CartItem.id == cart_item_id)
+         .values(quantity= quantity, updated_at= datetime.utcnow())
+         .returning(CartItem)
+      )
+      result = await self.db.execute(statement, execution_options={"populate_existing": True})
+      cart_item = result.scalar_one_or_none()
+      if cart_item is None:
+         return None
 
-      await self.__update_cart_total(cart_item.cart_id)
+      await self.__refresh_cart_total(cart_item.cart_id)
+      if not await self.reservation_repository.reserve(cart_item.cart_id, cart_item.product_id, quantity):
+         await self.db.rollback()
+         return None
 
-      
       await self.db.commit()
-      await self.db.refresh(cart_item)
-
       return cart_item
 
 
    async def remove_cart_item(self, cart_item_id: UUID) -> bool:
-      cart_item = await self.get_cart_item_by_id(cart_item_id)
-      if cart_item:
-         cart_id = cart_item.cart_id
-         await self.db.delete(cart_item)
-         
-         await self.__update_cart_total(cart_id)
-
-         await self.db.commit()
+      statement = (
+         delete(CartItem)
+         .where(CartItem.id == cart_item_id)
+         .returning(CartItem.cart_id, CartItem.product_id)
+      )
+      result = await self.db.execute(statement)
+      removed = result.one_or_none()
+      if removed is None:
+         return False
 
-         return True
-      return False
+      cart_id, product_id = removed
+      await self.__refresh_cart_total(cart_id)
+      await self.reservation_repository.release(cart_id, [product_id])
+      await self.db.commit()
+      return True
 
 
-   async def apply_coupon_to_cart(self, coupon: Coupon, cart: Cart) ->  Cart:
+   async def apply_coupon_to_cart(self, coupon: CouponSnapshot, cart: Cart) ->  Cart:
       cart.coupon_id = coupon.id
-      cart.coupon_amount = coupon.discount_amount * (cart.total or Decimal(0.00) / Decimal("100.00"))
+      # preview only, checkout prices the coupon again and counts its use
+      cart.coupon_amount = ((cart.total or Decimal("0.00")) * coupon.discount_amount / Decimal("100")).quantize(
+         Decimal("0.01"), rounding= ROUND_HALF_UP
+      )
       
       cart.updated_at = datetime.utcnow()
 
@@ -156,17 +220,10 @@ class CartRepository:
 
 
    async def clear_cart(self, cart_id: UUID) -> bool:
-      cart_items = await self.get_cart_items_by_cart_id(cart_id)
-      if not cart_items:
-         return True
-
-      for item in cart_items:
-            await self.db.delete(item)
-
-      await self.__update_cart_total(cart_id)
-
+      await self.db.execute(delete(CartItem).where(CartItem.cart_id == cart_id))
+      await self.__refresh_cart_total(cart_id)
+      await self.reservation_repository.release(cart_id)
       await self.db.commit()
-      
       return True
 
 
@@ -1,22 +1,25 @@
 from __future__ import annotations
 from datetime import datetime
-from typing import Optional, List
+from typing import Dict, Optional, List, Set, Tuple
 from uuid import UUID
 from sqlmodel import select, and_, func
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
-from sqlalchemy import text, or_
+from sqlalchemy import literal_column, or_
+from app.core.constants import TRIGRAM_SIMILARITY_THRESHOLD
 from app.models.category import Category
+from app.repositories.load_plans import CATEGORY_DELETE, CATEGORY_WITH_PRODUCTS, LoadPlan
+from app.repositories.price_repository import PriceRepository
 
 
 
 class CategoryRepository:
    def __init__(self, db: AsyncSession):
       self.db = db
+      self.price_repository = PriceRepository(db)
    
 
-   async def get_by_id(self, id:UUID) -> Optional[Category]:
-      statement = select(Category).where(Category.id == id)
+   async def get_by_id(self, id:UUID, plan: LoadPlan = ()) -> Optional[Category]:
+      statement = select(Category).options(*plan).where(Category.id == id)
       result = await self.db.execute(statement)
       return result.scalar_one_or_none()
 
@@ -36,7 +39,7 @@ class CategoryRepository:
    async def get_all_with_products(self) -> List[Category]:
       statement = (
          select(Category)
-         .options(selectinload(Category.products))
+         .options(*CATEGORY_WITH_PRODUCTS)
          .order_by(Category.name)
       )
       result = await self.db.execute(statement)
@@ -46,7 +49,7 @@ class CategoryRepository:
    async def get_with_products(self, category_id: UUID) -> Optional[Category]:
     statement = (
         select(Category)
-        .options(selectinload(Category.products))
+        .options(*CATEGORY_WITH_PRODUCTS)
         .where(Category.id == category_id)
     )
     result = await self.db.execute(statement)
@@ -69,32 +72,45 @@ class CategoryRepository:
    
 
    async def full_text_search(self, search_text: str) -> List[Category]:
-    # Prepare the search term for prefix matching
-    search_terms = " & ".join(
-        f"{term}:*" for term in search_text.strip().split()
-    )
+      # Prepare the search term for prefix matching
+      search_terms = " & ".join(
+         f"{term}:*" for term in search_text.strip().split()
+      )
+      query = func.to_tsquery(literal_column("'english'"), search_terms)
 
-    statement = (
-        select(Category)
-        .where(
-            text("""
-                to_tsvector('english', coalesce(name, '') || ' ' || coalesce(description, ''))
-                @@ to_tsquery('english', :search)
-            """)
-        )
-        .params(search=search_terms)
-        .order_by(
-            text("""
-                ts_rank(
-                    to_tsvector('english', coalesce(name, '') || ' ' || coalesce(description, '')),
-                    to_tsquery('english', :search)
-                ) DESC
-            """)
-        )
-    )
+      statement = (
+         select(Category)
+         .where(Category.search_vector.op("@@")(query))
+         .order_by(func.ts_rank(Category.search_vector, query).desc())
+      )
 
-    result = await self.db.execute(statement)
-    return list(result.scalars().all())
+      result = await self.db.execute(statement)
+      return list(result.scalars().all())
+
+
+   async def trigram_search(self, search_text: str, threshold: float = TRIGRAM_SIMILARITY_THRESHOLD) -> List[Category]:
+      # word similarity ranking with typo tolerance, served by the gin_trgm_ops indexes
+      await self.db.execute(
+         select(func.set_config("pg_trgm.word_similarity_threshold", str(threshold), True))
+      )
+      rank = func.greatest(
+         func.word_similarity(search_text, Category.name),
+         func.word_similarity(search_text, Category.description)
+      )
+
+      statement = (
+         select(Category)
+         .where(
+            or_(
+               Category.name.op("%>")(search_text),
+               Category.description.op("%>")(search_text)
+            )
+         )
+         .order_by(rank.desc(), Category.name)
+      )
+
+      result = await self.db.execute(statement)
+      return list(result.scalars().all())
 
 
    async def create(self, category:Category) -> Category:
@@ -113,9 +129,12 @@ class CategoryRepository:
    
 
    async def delete(self, id: UUID) -> bool:
-      category = await self.get_by_id(id)
+      category = await self.get_by_id(id, CATEGORY_DELETE)
       if category:
+         # its products lose the category's discounts with the link rows
+         product_ids = [product.id for product in category.products]
          await self.db.delete(category)
+         await self.price_repository.refresh_products(product_ids)
          await self.db.commit()
          return True
       return False
@@ -136,6 +155,42 @@ class CategoryRepository:
       result = await self.db.execute(statement)
       return list(result.scalars().all())
 
+
+   async def get_ids_by_refs(self, refs: List[str]) -> Tuple[Dict[str, UUID], Set[str]]:
+      """
+      id of each ref that is a category id or name, in one query. Unknown refs are left out.
+      Names are not unique, one that matches several categories is left out too and returned
+      in the second set, the caller asks for the id instead
+      """
+      ids: Dict[str, UUID] = {}
+      names: List[str] = []
+      for ref in refs:
+         try:
+            ids[ref] = UUID(ref)
+         except ValueError:
+            names.append(ref)
+
+      statement = (
+         select(Category.id, Category.name)
+         .where(or_(Category.id.in_(list(ids.values())), Category.name.in_(names)))
+      )
+      result = await self.db.execute(statement)
+      found_ids = set()
+      by_name: Dict[str, List[UUID]] = {}
+      for category_id, name in result.all():
+         found_ids.add(category_id)
+         by_name.setdefault(name, []).append(category_id)
+
+      resolved = {ref: category_id for ref, category_id in ids.items() if category_id in found_ids}
+      ambiguous = set()
+      for name in names:
+         matches = by_name.get(name, [])
+         if len(matches) == 1:
+            resolved[name] = matches[0]
+         elif matches:
+            ambiguous.add(name)
+      return resolved, ambiguous
+
    
 
 
@@ -1,12 +1,20 @@
 from datetime import datetime
-from typing import List, Optional
+from decimal import Decimal
+from typing import AsyncIterator, List, Optional, Sequence
 from uuid import UUID
+from sqlalchemy import delete, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import or_, select, desc
+from app.core.boundary_scheduler import boundary_scheduler, is_live_now
+from app.core.cache import TTLCache
+from app.core.constants import COUPON_SNAPSHOT_CACHE_SIZE, COUPON_SNAPSHOT_CACHE_TTL_SECONDS, STREAM_BATCH_SIZE
 from app.models.coupon import Coupon
 from app.models.coupon_usage import CouponUsage
 from app.schemas import coupon
+from app.schemas.coupon import CouponSnapshot
 
+# validation snapshots by coupon code, dropped by the methods below that change a coupon
+coupon_snapshot_cache: TTLCache[UUID, CouponSnapshot] = TTLCache(COUPON_SNAPSHOT_CACHE_SIZE, COUPON_SNAPSHOT_CACHE_TTL_SECONDS)
 
 
 class CouponRepository:
@@ -29,6 +37,32 @@ class CouponRepository:
       return result.scalar_one_or_none()
 
 
+   async def get_snapshot_by_code(self, code: UUID) -> Optional[CouponSnapshot]:
+      """ from the cache or from the coupons columns only """
+      snapshot = coupon_snapshot_cache.get(code)
+      if snapshot:
+         return snapshot
+
+      statement = select(
+         Coupon.id,
+         Coupon.code,
+         Coupon.discount_amount,
+         Coupon.min_order_amount,
+         Coupon.start_at,
+         Coupon.end_at,
+         Coupon.is_active,
+         (Coupon.max_uses - Coupon.used_count).label("remaining_uses")
+      ).where(Coupon.code == code)
+      result = await self.db.execute(statement)
+      row = result.one_or_none()
+      if row is None:
+         return None
+
+      snapshot = CouponSnapshot.model_validate(row._mapping)
+      coupon_snapshot_cache.set(code, snapshot)
+      return snapshot
+
+
    async def get_by_id(self, id: UUID) -> Optional[Coupon]:
       statement = (
          select(Coupon)
@@ -49,16 +83,13 @@ class CouponRepository:
 
 
    async def get_coupons_by_active_status(self, is_active: bool) -> List[Coupon]:
-      now = datetime.now()
-
+      # is_live covers is_active and the date window, the boundary scheduler keeps it
       if is_active:
-          statement = (
+         statement = (
             select(Coupon)
             .where(
-               Coupon.is_active == True,
-               Coupon.used_count < Coupon.max_uses,
-               Coupon.start_at <= now,
-               Coupon.end_at > now
+               Coupon.is_live == True,
+               Coupon.used_count < Coupon.max_uses
             )
             .order_by(desc(Coupon.created_at))
          )
@@ -68,10 +99,8 @@ class CouponRepository:
             select(Coupon)
             .where(
                or_(
-                  Coupon.is_active == False,
-                  Coupon.used_count >= Coupon.max_uses,
-                  Coupon.start_at > now,
-                  Coupon.end_at < now
+                  Coupon.is_live == False,
+                  Coupon.used_count >= Coupon.max_uses
                )
             )
             .order_by(desc(Coupon.created_at))
@@ -81,20 +110,25 @@ class CouponRepository:
       return list(result.scalars().all())
 
    async def create(self, coupon: Coupon) -> Coupon:
+      coupon.is_live = is_live_now(coupon)
       self.db.add(coupon)
 
       await self.db.commit()
       await self.db.refresh(coupon)
+      boundary_scheduler.schedule(coupon)
 
       return coupon
 
 
    async def update(self, coupon: Coupon) -> Coupon:
       coupon.updated_at = datetime.utcnow()
+      coupon.is_live = is_live_now(coupon)
       self.db.add(coupon)
       await self.db.commit()
 
       await self.db.refresh(coupon)
+      boundary_scheduler.schedule(coupon)
+      coupon_snapshot_cache.invalidate(coupon.code)
 
       return coupon
 
@@ -102,8 +136,10 @@ class CouponRepository:
    async def delete(self, id: UUID) -> bool:
       coupon = await self.get_by_id(id)
       if coupon:
+         await self.db.execute(delete(CouponUsage).where(CouponUsage.coupon_id == id)) # type: ignore
          await self.db.delete(coupon)
          await self.db.commit()
+         coupon_snapshot_cache.invalidate(coupon.code)
 
          return True
       return False
@@ -115,9 +151,55 @@ class CouponRepository:
          return False
       
       coupon.is_active = coupon_set_status.is_active
+      coupon.is_live = is_live_now(coupon)
       self.db.add(coupon)
       await self.db.commit()
+      boundary_scheduler.schedule(coupon)
+      coupon_snapshot_cache.invalidate(coupon.code)
+
+      return True
+
+
+   async def get_discount_amount(self, coupon_id: UUID) -> Optional[int]:
+      statement = select(Coupon.discount_amount).where(Coupon.id == coupon_id)
+      result = await self.db.execute(statement)
+      return result.scalar_one_or_none()
 
+
+   async def redeem(self, coupon_id: UUID, user_id: UUID, order_total: Decimal, discount_amount: int) -> bool:
+      """
+      Count one use of the coupon if it can be used right now for order_total at discount_amount percent,
+      and record the usage. The conditional update makes the used_count < max_uses check and the
+      increment one step, so concurrent checkouts can not use it more than max_uses times. Runs inside
+      the caller's transaction and locks the coupon row until it commits, so call it last
+      """
+      now = datetime.now()
+      statement = (
+         update(Coupon)
+         .where(
+            Coupon.id == coupon_id,
+            Coupon.is_active == True,
+            Coupon.used_count < Coupon.max_uses,
+            Coupon.start_at <= now,
+            Coupon.end_at >= now,
+            Coupon.min_order_amount <= order_total,
+            # the percent the order was priced with, unless the coupon was edited since
+            Coupon.discount_amount == discount_amount
+         )
+         .values(used_count= Coupon.used_count + 1, updated_at= datetime.utcnow())
+         .returning(Coupon.code, Coupon.used_count, Coupon.max_uses)
+         .execution_options(synchronize_session= False)
+      )
+      result = await self.db.execute(statement)
+      redeemed = result.one_or_none()
+      if redeemed is None:
+         return False
+      if redeemed.used_count >= redeemed.max_uses:
+         # the last use, cached snapshots must stop accepting it. Other uses leave the cache alone,
+         # a hot coupon would otherwise be read again on every checkout
+         coupon_snapshot_cache.invalidate(redeemed.code)
+
+      self.db.add(CouponUsage(user_id= user_id, coupon_id= coupon_id))
       return True
 
 
@@ -126,6 +208,18 @@ class CouponRepository:
       result = await self.db.execute(statement)
       return list(result.scalars().all())
 
+
+   async def stream_coupon_usages(self) -> AsyncIterator[Sequence[CouponUsage]]:
+      """ get_coupon_usages in batches through a server side cursor """
+      statement = (
+         select(CouponUsage)
+         .order_by(desc(CouponUsage.used_at))
+         .execution_options(yield_per= STREAM_BATCH_SIZE)
+      )
+      result = await self.db.stream_scalars(statement)
+      async for batch in result.partitions():
+         yield batch
+
    
    async def get_coupon_usages_by_coupon_id(self, coupon_id: UUID) -> List[CouponUsage]:
       statement = (
@@ -1,21 +1,59 @@
 from datetime import datetime
-from gc import disable
-from typing import List, Optional
+from typing import Dict, List, NamedTuple, Optional
 from uuid import UUID
 from fastapi import HTTPException
+from sqlalchemy import and_, func, literal, union_all
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import desc, select
 
+from app.core.boundary_scheduler import boundary_scheduler, is_live_now
 from app.enums.enums import Discount_Model_Type
 from app.models.category_discount import CategoryDiscount
+from app.models.product_category import ProductCategoryLink
 from app.models.product_discount import ProductDiscount
 from app.models.shipment_discount import ShipmentDiscount
+from app.repositories.price_repository import PriceRepository
 from app.schemas.base_schema import DiscountSetStatus
 
+DISCOUNT_MODELS = {
+   Discount_Model_Type.CATEGORY: CategoryDiscount,
+   Discount_Model_Type.PRODUCT: ProductDiscount,
+   Discount_Model_Type.SHIPMENT: ShipmentDiscount,
+}
+
+ENTITY_COLUMNS = {
+   Discount_Model_Type.CATEGORY: CategoryDiscount.category_id,
+   Discount_Model_Type.PRODUCT: ProductDiscount.product_id,
+   Discount_Model_Type.SHIPMENT: ShipmentDiscount.shipment_id,
+}
+
+
+class ActiveDiscount(NamedTuple):
+   discount_type: Discount_Model_Type
+   id: UUID
+   entity_id: UUID
+   discount_amount: int
+   start_at: datetime
+   end_at: datetime
+
+
+def _running(model, now: datetime) -> tuple:
+   """ the columns of the (entity id, is_active, start_at, end_at) indexes, in their order """
+   return (model.is_active == True, model.start_at <= now, model.end_at >= now)
+
 
 class DiscountRepository:
    def __init__(self, db:AsyncSession):
       self.db = db
+      self.price_repository = PriceRepository(db)
+
+
+   async def __refresh_prices(self, discount: ProductDiscount | CategoryDiscount | ShipmentDiscount) -> None:
+      """ recompute the effective prices the discount takes part in, before the write commits """
+      if isinstance(discount, ProductDiscount):
+         await self.price_repository.refresh_products([discount.product_id])
+      elif isinstance(discount, CategoryDiscount):
+         await self.price_repository.refresh_category(discount.category_id)
 
    
    async def get_all(self, type: Discount_Model_Type) -> List[CategoryDiscount] | List[ProductDiscount] | List[ShipmentDiscount]:
@@ -31,28 +69,13 @@ class DiscountRepository:
 
    
    async def get_by_active_status(self, type: Discount_Model_Type, is_active: bool) -> List[CategoryDiscount] | List[ProductDiscount] | List[ShipmentDiscount]:
-      now = datetime.now()
+      """ is_live is kept at the start_at / end_at boundaries by the boundary scheduler, no date math here """
       if type == Discount_Model_Type.CATEGORY:
-         statement = select(CategoryDiscount).order_by(desc(CategoryDiscount.created_at))
-         if is_active:
-            
-            statement = statement.where(CategoryDiscount.is_active == True and CategoryDiscount.start_at <= now and CategoryDiscount.end_at >= now)
-         else:
-            statement = statement.where(CategoryDiscount.is_active == False and CategoryDiscount.start_at > now and CategoryDiscount.end_at < now)
-
+         statement = select(CategoryDiscount).where(CategoryDiscount.is_live == is_active).order_by(desc(CategoryDiscount.created_at))
       elif type == Discount_Model_Type.PRODUCT:
-         statement = select(ProductDiscount).order_by(desc(ProductDiscount.created_at))
-         if is_active:
-            statement = statement.where(ProductDiscount.is_active == True and ProductDiscount.start_at <= now and ProductDiscount.end_at >= now)
-         else:
-            statement = statement.where(ProductDiscount.is_active == False and CategoryDiscount.start_at > now and CategoryDiscount.end_at < now)
-
+         statement = select(ProductDiscount).where(ProductDiscount.is_live == is_active).order_by(desc(ProductDiscount.created_at))
       elif type == Discount_Model_Type.SHIPMENT:
-         statement = select(ShipmentDiscount).order_by(desc(ShipmentDiscount.created_at))
-         if is_active:
-            statement = statement.where(ShipmentDiscount.is_active == True and ShipmentDiscount.start_at <= now and ShipmentDiscount.end_at >= now)
-         else:
-            statement = statement.where(ShipmentDiscount.is_active == False and ShipmentDiscount.start_at > now and ShipmentDiscount.end_at < now)
+         statement = select(ShipmentDiscount).where(ShipmentDiscount.is_live == is_active).order_by(desc(ShipmentDiscount.created_at))
       
       result = await self.db.execute(statement)
       return list(result.scalars().all())
@@ -83,30 +106,90 @@ class DiscountRepository:
 
 ## ex get category active discounts for a spesefic category by category id
    async def get_active_discounts_by_entity_id(self, id:UUID, type: Discount_Model_Type) -> List[CategoryDiscount] | List[ProductDiscount] | List[ShipmentDiscount]:
-      if type == Discount_Model_Type.CATEGORY:
-         statement = select(CategoryDiscount).where(CategoryDiscount.category_id == id and CategoryDiscount.is_active == True).order_by(desc(CategoryDiscount.created_at))
-      elif type == Discount_Model_Type.PRODUCT:
-         statement = select(ProductDiscount).where(ProductDiscount.product_id == id and ProductDiscount.is_active == True).order_by(desc(ProductDiscount.created_at))
-      elif type == Discount_Model_Type.SHIPMENT:
-         statement = select(ShipmentDiscount).where(ShipmentDiscount.shipment_id == id and ShipmentDiscount.is_active == True).order_by(desc(ShipmentDiscount.created_at))
-      
+      model = DISCOUNT_MODELS[type]
+      statement = (
+         select(model)
+         .where(ENTITY_COLUMNS[type] == id, *_running(model, datetime.now()))
+         .order_by(desc(model.created_at))
+      )
       result = await self.db.execute(statement)
       return list(result.scalars().all())
 
 
+   async def get_active_discounts_by_entity_ids(self, entity_ids: Dict[Discount_Model_Type, List[UUID]]) -> Dict[UUID, List[ActiveDiscount]]:
+      """
+      Running discounts of many products, categories and shipments at once, grouped by entity id.
+      One UNION ALL query, each branch an index range scan on (entity id, is_active, start_at, end_at)
+      """
+      now = datetime.now()
+      branches = [
+         select(
+            literal(type.value).label("discount_type"),
+            DISCOUNT_MODELS[type].id.label("id"),
+            ENTITY_COLUMNS[type].label("entity_id"),
+            DISCOUNT_MODELS[type].discount_amount.label("discount_amount"),
+            DISCOUNT_MODELS[type].start_at.label("start_at"),
+            DISCOUNT_MODELS[type].end_at.label("end_at")
+         )
+         .where(ENTITY_COLUMNS[type].in_(ids), *_running(DISCOUNT_MODELS[type], now))
+         for type, ids in entity_ids.items() if ids
+      ]
+      if not branches:
+         return {}
+
+      result = await self.db.execute(union_all(*branches))
+      discounts: Dict[UUID, List[ActiveDiscount]] = {}
+      for row in result.all():
+         discount = ActiveDiscount(Discount_Model_Type(row.discount_type), *row[1:])
+         discounts.setdefault(discount.entity_id, []).append(discount)
+      return discounts
+
+
+   async def get_best_product_discounts(self, product_ids: List[UUID]) -> Dict[UUID, int]:
+      """ highest active discount percent per product, from its own discounts and its categories', one query """
+      if not product_ids:
+         return {}
+      now = datetime.now()
+      product_level = (
+         select(ProductDiscount.product_id.label("product_id"), ProductDiscount.discount_amount.label("discount_amount")) # type: ignore
+         .where(ProductDiscount.product_id.in_(product_ids), *_running(ProductDiscount, now)) # type: ignore
+      )
+      category_level = (
+         select(ProductCategoryLink.product_id, CategoryDiscount.discount_amount)
+         .join(CategoryDiscount, and_(
+            CategoryDiscount.category_id == ProductCategoryLink.category_id,
+            *_running(CategoryDiscount, now)
+         ))
+         .where(ProductCategoryLink.product_id.in_(product_ids)) # type: ignore
+      )
+      discounts = union_all(product_level, category_level).subquery()
+      statement = (
+         select(discounts.c.product_id, func.max(discounts.c.discount_amount))
+         .group_by(discounts.c.product_id)
+      )
+      result = await self.db.execute(statement)
+      return {product_id: discount_amount for product_id, discount_amount in result.all()}
+
+
    async def create(self, discount: ProductDiscount | CategoryDiscount | ShipmentDiscount) -> ProductDiscount | CategoryDiscount | ShipmentDiscount:
+      discount.is_live = is_live_now(discount)
       self.db.add(discount)
+      await self.__refresh_prices(discount)
       await self.db.commit()
       await self.db.refresh(discount)
+      boundary_scheduler.schedule(discount)
 
       return discount
    
 
    async def update(self, discount: ProductDiscount | CategoryDiscount | ShipmentDiscount) -> ProductDiscount | CategoryDiscount | ShipmentDiscount:
       discount.updated_at = datetime.utcnow()
+      discount.is_live = is_live_now(discount)
       self.db.add(discount)
+      await self.__refresh_prices(discount)
       await self.db.commit()
       await self.db.refresh(discount)
+      boundary_scheduler.schedule(discount)
 
       return discount
 
@@ -117,6 +200,7 @@ class DiscountRepository:
          return False
       
       await self.db.delete(discount)
+      await self.__refresh_prices(discount)
       await self.db.commit()
 
       return True
@@ -128,8 +212,11 @@ class DiscountRepository:
          return False
       
       discount.is_active = status.is_active
+      discount.is_live = is_live_now(discount)
       self.db.add(discount)
+      await self.__refresh_prices(discount)
       await self.db.commit()
+      boundary_scheduler.schedule(discount)
       
       return True
 
@@ -0,0 +1,102 @@
+from datetime import datetime, timedelta
+from typing import List, Optional
+from uuid import UUID
+import uuid
+from sqlalchemy import delete, or_, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from app.core.constants import IDEMPOTENCY_KEY_TTL_HOURS, IDEMPOTENCY_LOCK_SECONDS
+from app.models.idempotency_key import IdempotencyKey
+
+
+class IdempotencyRepository:
+   """
+   Each method is its own short transaction, nothing is held open while the claimed request runs.
+   A claim is a row without a status_code, the duplicates of its key wait for the status to appear
+   """
+
+   def __init__(self, db: AsyncSession):
+      self.db = db
+
+
+   async def claim(self, scope: str, key: str, request_hash: str) -> Optional[UUID]:
+      """
+      Take the key for a request about to run, returns the claim id or None when the key is already
+      taken. A claim whose request died (past locked_until) or an expired response is taken over
+      """
+      now = datetime.utcnow()
+      statement = insert(IdempotencyKey).values(
+         id= uuid.uuid4(),
+         created_at= now,
+         updated_at= now,
+         scope= scope,
+         key= key,
+         request_hash= request_hash,
+         locked_until= now + timedelta(seconds= IDEMPOTENCY_LOCK_SECONDS),
+         expires_at= now + timedelta(hours= IDEMPOTENCY_KEY_TTL_HOURS)
+      )
+      statement = statement.on_conflict_do_update(
+         constraint= "uq_idempotency_keys_scope_key",
+         set_= {
+            "id": statement.excluded.id,
+            "created_at": statement.excluded.created_at,
+            "updated_at": statement.excluded.updated_at,
+            "request_hash": statement.excluded.request_hash,
+            "status_code": None,
+            "response_headers": None,
+            "response_body": None,
+            "locked_until": statement.excluded.locked_until,
+            "expires_at": statement.excluded.expires_at
+         },
+         where= or_(
+            IdempotencyKey.expires_at < now,
+            IdempotencyKey.status_code.is_(None) & (IdempotencyKey.locked_until < now) # type: ignore
+         )
+      ).returning(IdempotencyKey.id)
+      result = await self.db.execute(statement)
+      await self.db.commit()
+      return result.scalar_one_or_none()
+
+
+   async def get(self, scope: str, key: str) -> Optional[IdempotencyKey]:
+      statement = select(IdempotencyKey).where(
+         IdempotencyKey.scope == scope,
+         IdempotencyKey.key == key
+      ).execution_options(populate_existing= True)
+      result = await self.db.execute(statement)
+      idempotency_key = result.scalar_one_or_none()
+      # end the read so the next poll sees newer commits
+      await self.db.commit()
+      return idempotency_key
+
+
+   async def complete(self, claim_id: UUID, status_code: int, response_headers: List[List[str]], response_body: bytes) -> None:
+      statement = (
+         update(IdempotencyKey)
+         .where(IdempotencyKey.id == claim_id) # type: ignore
+         .values(
+            status_code= status_code,
+            response_headers= response_headers,
+            response_body= response_body,
+            updated_at= datetime.utcnow()
+         )
+         .execution_options(synchronize_session= False)
+      )
+      await self.db.execute(statement)
+      await self.db.commit()
+
+
+   async def release(self, claim_id: UUID) -> None:
+      """Give the key back after a failed request, the next retry runs it again"""
+      statement = delete(IdempotencyKey).where(IdempotencyKey.id == claim_id) # type: ignore
+      await self.db.execute(statement)
+      await self.db.commit()
+
+
+   async def purge_expired(self) -> int:
+      statement = delete(IdempotencyKey).where(IdempotencyKey.expires_at < datetime.utcnow()) # type: ignore
+      result = await self.db.execute(statement)
+      await self.db.commit()
+      return result.rowcount
@@ -1,5 +1,6 @@
-from typing import List, Optional, Union
+from typing import Iterable, List, Optional, Union
 from uuid import UUID
+from sqlalchemy import func
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import select
 
@@ -47,6 +48,13 @@ class ImageRepository:
       return image
 
 
+   async def create_many(self, images: List[Image]) -> List[Image]:
+      """ all images of one upload are stored in a single transaction """
+      self.db.add_all(images)
+      await self.db.commit()
+      return images
+
+
    async def update(self, image: Image) -> Image:
       self.db.add(image)
       await self.db.commit()
@@ -63,6 +71,26 @@ class ImageRepository:
       return True
 
 
+   async def lock_content_hashes(self, content_hashes: Iterable[str]) -> None:
+      """ transaction scoped advisory locks, adding or dropping references to the same stored file is serialized """
+      # a fixed order, so two uploads sharing files can not deadlock
+      for content_hash in sorted(set(content_hashes)):
+         await self.db.execute(select(func.pg_advisory_xact_lock(func.hashtextextended(content_hash, 0))))
+
+
+   async def get_by_content_hash(self, content_hash: str) -> Optional[Image]:
+      statement = select(Image).where(Image.content_hash == content_hash).limit(1)
+      result = await self.db.execute(statement)
+      return result.scalar_one_or_none()
+
+
+   async def count_by_content_hash(self, content_hash: str) -> int:
+      """ the reference count of a stored file is the number of image rows pointing at it """
+      statement = select(func.count()).select_from(Image).where(Image.content_hash == content_hash)
+      result = await self.db.execute(statement)
+      return result.scalar_one()
+
+
    async def count_images_by_product(self, product_id: UUID) -> int:
       statement = select(Image).where(Image.product_id == product_id)
       result = await self.db.execute(statement)
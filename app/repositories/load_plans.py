@@ -0,0 +1,80 @@
+## LOAD PLANS ##
+# Product relationships and Category.products are declared with lazy='raise', so nothing is
+# loaded behind a query's back. Each repository method passes the plan that matches the
+# schema it is read into, anything outside the plan raises instead of issuing a query.
+from typing import Tuple
+from sqlalchemy.orm import defer, joinedload, selectinload
+from sqlalchemy.sql.base import ExecutableOption
+
+from app.models.cart import Cart
+from app.models.cart_item import CartItem
+from app.models.category import Category
+from app.models.product import Product
+
+LoadPlan = Tuple[ExecutableOption, ...]
+
+
+# columns only, for existence / stock / price checks. search_vector is only read inside
+# postgres, so product plans never fetch it
+BARE: LoadPlan = (
+   defer(Product.search_vector),
+)
+
+# ProductRead, the effective price comes along in the same row
+PRODUCT_READ: LoadPlan = BARE + (
+   selectinload(Product.images),
+   joinedload(Product.pricing),
+)
+
+# ProductWithCategories
+PRODUCT_WITH_CATEGORIES: LoadPlan = PRODUCT_READ + (
+   selectinload(Product.categories).selectinload(Category.images),
+)
+
+# ProductRead after replacing categories, the old collection is needed to diff the link rows
+PRODUCT_UPDATE: LoadPlan = PRODUCT_READ + (
+   selectinload(Product.categories),
+)
+
+# everything the delete cascade and the category link table have to visit
+PRODUCT_DELETE: LoadPlan = (
+   selectinload(Product.images),
+   selectinload(Product.product_reviews),
+   selectinload(Product.product_discounts),
+   selectinload(Product.categories),
+   selectinload(Product.cart_items),
+)
+
+# CategoryWithProducts
+CATEGORY_WITH_PRODUCTS: LoadPlan = (
+   selectinload(Category.products).options(
+      defer(Product.search_vector),
+      selectinload(Product.images),
+      joinedload(Product.pricing)
+   ),
+)
+
+# the link rows of a category are removed with it
+CATEGORY_DELETE: LoadPlan = (
+   selectinload(Category.products),
+)
+
+# CartItemWithProduct
+CART_ITEM_WITH_PRODUCT: LoadPlan = (
+   selectinload(CartItem.product).options(
+      defer(Product.search_vector),
+      selectinload(Product.images),
+      joinedload(Product.pricing)
+   ),
+)
+
+# CartWithItems
+CART_WITH_ITEMS: LoadPlan = (
+   selectinload(Cart.cart_items)
+   .selectinload(CartItem.product)
+   .options(
+      defer(Product.search_vector),
+      selectinload(Product.images),
+      joinedload(Product.pricing)
+   ),
+)
@@ -1,11 +1,19 @@
 from datetime import datetime
-from typing import List, Optional
+import random
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Tuple
 from fastapi import FastAPI
+from sqlalchemy import func, tuple_
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import raiseload
 from sqlmodel import desc, select
 from uuid import UUID
+from app.core.constants import ORDER_STATUS_COUNT_SHARDS, STREAM_BATCH_SIZE
 from app.enums.enums import Order_Status
 from app.models.order import Order
+from app.models.order_status_count import OrderStatusCount
+
+QueueKey = Tuple[datetime, UUID]
 
 
 class OrderRepository:
@@ -19,6 +27,19 @@ class OrderRepository:
       return list(result.scalars().all())
 
 
+   async def stream_all(self) -> AsyncIterator[Sequence[Order]]:
+      """ get_all in batches through a server side cursor, for OrderRead so items are not loaded """
+      statement = (
+         select(Order)
+         .options(raiseload(Order.order_items))
+         .order_by(desc(Order.created_at))
+         .execution_options(yield_per= STREAM_BATCH_SIZE)
+      )
+      result = await self.db.stream_scalars(statement)
+      async for batch in result.partitions():
+         yield batch
+
+
    async def get_by_id(self, id: UUID) -> Optional[Order]:
       statement = select(Order).where(Order.id == id)
       result = await self.db.execute(statement)
@@ -31,19 +52,77 @@ class OrderRepository:
       return result.scalar_one_or_none()
 
 
-   async def get_by_status(self, status: Order_Status) -> List[Order]:
-      statement = select(Order).order_by(desc(Order.status == status))
+   async def get_by_status(
+         self,
+         status: Order_Status,
+         limit: int,
+         after: Optional[QueueKey] = None
+         ) -> Tuple[List[Order], Optional[QueueKey]]:
+      """ oldest first keyset page of one status queue, an index range scan on (status, created_at, id) """
+      statement = (
+         select(Order)
+         .options(raiseload(Order.order_items))
+         .where(Order.status == status)
+         .order_by(Order.created_at, Order.id)
+         .limit(limit + 1)
+      )
+      if after:
+         statement = statement.where(tuple_(Order.created_at, Order.id) > tuple_(*after))
+
       result = await self.db.execute(statement)
-      return list(result.scalars().all())
+      orders = list(result.scalars().all())
+      if len(orders) <= limit:
+         return orders, None
+
+      orders = orders[:limit]
+      return orders, (orders[-1].created_at, orders[-1].id)
+
+
+   async def get_status_counts(self) -> Dict[Order_Status, int]:
+      statement = (
+         select(OrderStatusCount.status, func.sum(OrderStatusCount.count))
+         .group_by(OrderStatusCount.status)
+      )
+      result = await self.db.execute(statement)
+      counts = {order_status: 0 for order_status in Order_Status}
+      counts.update({order_status: int(count) for order_status, count in result.all()})
+      return counts
+
+
+   async def __adjust_status_counts(self, changes: Dict[Order_Status, int]) -> None:
+      """ inside the transaction that changes the orders, one upsert into a random shard """
+      changes = {order_status: delta for order_status, delta in changes.items() if delta}
+      if not changes:
+         return
+      shard = random.randrange(ORDER_STATUS_COUNT_SHARDS)
+      statement = insert(OrderStatusCount).values([
+         {"status": order_status, "shard": shard, "count": delta}
+         # same row order in every transaction, two opposite transitions cannot deadlock
+         for order_status, delta in sorted(changes.items())
+      ])
+      statement = statement.on_conflict_do_update(
+         index_elements= [OrderStatusCount.status, OrderStatusCount.shard],
+         set_= {"count": OrderStatusCount.count + statement.excluded.count}
+      )
+      await self.db.execute(statement)
 
 
    async def create(self, order: Order) -> Order:
       self.db.add(order)
+      await self.__adjust_status_counts({order.status: 1})
       await self.db.commit()
       await self.db.refresh(order)
       return order
    
 
+   async def add_with_items(self, order: Order) -> Order:
+      """ inside the caller's transaction, the caller commits """
+      self.db.add(order)
+      await self.db.flush()
+      await self.__adjust_status_counts({order.status: 1})
+      return order
+
+
    async def update(self, order: Order) -> Order:
       order.updated_at = datetime.utcnow()
       self.db.add(order)
@@ -57,15 +136,21 @@ class OrderRepository:
       if not order:
          return False
       await self.db.delete(order)
+      await self.__adjust_status_counts({order.status: -1})
       await self.db.commit()
       return True
    
 
    async def update_status(self, id: UUID, status: Order_Status) -> Optional[Order]:
-      order = await self.get_by_id(id)
+      # locked so two status changes of one order count the transition they really made
+      statement = select(Order).where(Order.id == id).with_for_update()
+      result = await self.db.execute(statement)
+      order = result.scalar_one_or_none()
       if not order:
          return None
       
+      if order.status != status:
+         await self.__adjust_status_counts({order.status: -1, status: 1})
       order.status = status
       order.updated_at = datetime.utcnow()
       await self.db.commit()
@@ -0,0 +1,136 @@
+from datetime import datetime
+from typing import List, Union
+from uuid import UUID
+from sqlalchemy import Select, case, func, literal, union_all
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+from sqlmodel import select
+
+from app.models.category_discount import CategoryDiscount
+from app.models.product import Product
+from app.models.product_category import ProductCategoryLink
+from app.models.product_discount import ProductDiscount
+from app.models.product_price import ProductPrice
+
+ProductScope = Union[List[UUID], Select, None]
+
+
+class PriceRepository:
+   """
+   Keeps product_prices. A refresh recomputes a set of products with one INSERT .. SELECT statement:
+   the best running discount of the product and its categories (they do not stack, the same rule as
+   checkout) and the next discount boundary. The refresh_* methods run inside the caller's transaction,
+   next to the write that changes a price, so both commit together. The sweeps commit on their own
+   """
+
+   def __init__(self, db: AsyncSession):
+      self.db = db
+
+
+   async def __refresh(self, scope: ProductScope) -> int:
+      """ scope is a list or a select of product ids, None recomputes every product """
+      # discount windows are naive local times, the same clock as DiscountBase.is_currently_active
+      now = datetime.now()
+      product_level = (
+         select(
+            ProductDiscount.product_id.label("product_id"), # type: ignore
+            ProductDiscount.discount_amount.label("discount_amount"), # type: ignore
+            ProductDiscount.start_at.label("start_at"), # type: ignore
+            ProductDiscount.end_at.label("end_at") # type: ignore
+         )
+         .where(ProductDiscount.is_active == True, ProductDiscount.end_at >= now)
+      )
+      category_level = (
+         select(
+            ProductCategoryLink.product_id,
+            CategoryDiscount.discount_amount,
+            CategoryDiscount.start_at,
+            CategoryDiscount.end_at
+         )
+         .join(CategoryDiscount, CategoryDiscount.category_id == ProductCategoryLink.category_id) # type: ignore
+         .where(CategoryDiscount.is_active == True, CategoryDiscount.end_at >= now)
+      )
+      if scope is not None:
+         # postgres does not push the outer filter into the grouped union, so repeat it on each side
+         product_level = product_level.where(ProductDiscount.product_id.in_(scope)) # type: ignore
+         category_level = category_level.where(ProductCategoryLink.product_id.in_(scope)) # type: ignore
+      discounts = union_all(product_level, category_level).subquery()
+
+      # only discounts that have not ended are left, the next boundary is the closest
+      # start of a scheduled one or end of any of them
+      best = (
+         select(
+            discounts.c.product_id,
+            func.max(case((discounts.c.start_at <= now, discounts.c.discount_amount), else_= 0)).label("discount_percent"),
+            func.least(
+               func.min(case((discounts.c.start_at > now, discounts.c.start_at))),
+               func.min(discounts.c.end_at)
+            ).label("valid_until")
+         )
+         .group_by(discounts.c.product_id)
+         .subquery()
+      )
+      percent = func.least(func.greatest(func.coalesce(best.c.discount_percent, 0), 0), 100)
+      prices = (
+         select(
+            Product.id,
+            percent,
+            func.round(Product.price * (100 - percent) / 100, 2),
+            best.c.valid_until,
+            literal(datetime.utcnow())
+         )
+         .outerjoin(best, best.c.product_id == Product.id)
+      )
+      if scope is not None:
+         prices = prices.where(Product.id.in_(scope)) # type: ignore
+
+      statement = insert(ProductPrice).from_select(
+         ["product_id", "discount_percent", "effective_price", "valid_until", "refreshed_at"],
+         prices
+      )
+      statement = statement.on_conflict_do_update(
+         index_elements= [ProductPrice.product_id],
+         set_= {
+            "discount_percent": statement.excluded.discount_percent,
+            "effective_price": statement.excluded.effective_price,
+            "valid_until": statement.excluded.valid_until,
+            "refreshed_at": statement.excluded.refreshed_at
+         }
+      )
+      # pending discounts, links and prices have to be in the database before they are read back
+      await self.db.flush()
+      result = await self.db.execute(statement)
+      return result.rowcount
+
+
+   async def refresh_products(self, product_ids: List[UUID]) -> None:
+      if product_ids:
+         await self.__refresh(list(product_ids))
+
+
+   async def refresh_category(self, category_id: UUID) -> None:
+      await self.__refresh(
+         select(ProductCategoryLink.product_id).where(ProductCategoryLink.category_id == category_id)
+      )
+
+
+   async def refresh_due(self) -> int:
+      """ recompute the products whose discount started or ended since their last refresh """
+      refreshed = await self.__refresh(
+         select(ProductPrice.product_id).where(ProductPrice.valid_until <= datetime.now()) # type: ignore
+      )
+      await self.db.commit()
+      return refreshed
+
+
+   async def refresh_missing(self) -> int:
+      """ products without a price row, written before product_prices existed """
+      # aliased, so the scope is not correlated with the products of the outer statement
+      missing = aliased(Product)
+      refreshed = await self.__refresh(
+         select(missing.id).where(~select(ProductPrice.product_id).where(ProductPrice.product_id == missing.id).exists())
+      )
+      await self.db.commit()
+      return refreshed
+
@@ -1,139 +1,252 @@
 from datetime import datetime
-from typing import List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
 from uuid import UUID
-from sqlalchemy import or_, text
+import uuid
+from sqlalchemy import Row, Select, String, and_, cast, delete, func, literal_column, or_, tuple_
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import select
-from sqlalchemy.orm import selectinload
+from app.core.constants import PRODUCT_EXPORT_BATCH_SIZE, TRIGRAM_SIMILARITY_THRESHOLD
 from app.models.product import Product
+from app.models.product_category import ProductCategoryLink
+from app.repositories.load_plans import PRODUCT_DELETE, PRODUCT_READ, PRODUCT_WITH_CATEGORIES, LoadPlan
+from app.repositories.price_repository import PriceRepository
+from app.repositories.stock_reservation_repository import held_quantity
+
+NameKey = Tuple[str, UUID]
+RankKey = Tuple[float, UUID]
+
 
 class ProductRepository:
    def __init__(self, db: AsyncSession):
       self.db = db
+      self.price_repository = PriceRepository(db)
+
 
-   async def get_all(self, only_available: bool =False) -> List[Product]:
-      statement = select(Product).order_by(Product.name)
+   async def __paginate_by_name(
+         self,
+         statement: Select,
+         limit: Optional[int],
+         after: Optional[NameKey]
+         ) -> Tuple[List[Product], Optional[NameKey]]:
+      """ keyset page over (name, id), fetches one extra row to know if there is a next page """
+      if after:
+         statement = statement.where(tuple_(Product.name, Product.id) > tuple_(*after))
+      if limit:
+         statement = statement.limit(limit + 1)
+
+      result = await self.db.execute(statement)
+      products = list(result.scalars().all())
+      if not limit or len(products) <= limit:
+         return products, None
+
+      products = products[:limit]
+      return products, (products[-1].name, products[-1].id)
+
+
+   async def __paginate_by_rank(
+         self,
+         statement: Select,
+         rank,
+         limit: Optional[int],
+         after: Optional[RankKey]
+         ) -> Tuple[List[Product], Optional[RankKey]]:
+      """ keyset page over (rank desc, id), statement has to select (Product, rank) """
+      if after:
+         # ranks go down while ids go up, so a row comparison can not be used here
+         after_rank, after_id = after
+         statement = statement.where(
+            or_(rank < after_rank, and_(rank == after_rank, Product.id > after_id))
+         )
+      if limit:
+         statement = statement.limit(limit + 1)
+
+      result = await self.db.execute(statement)
+      rows = result.all()
+      if not limit or len(rows) <= limit:
+         return [row[0] for row in rows], None
+
+      rows = rows[:limit]
+      return [row[0] for row in rows], (rows[-1][1], rows[-1][0].id)
+
+
+   async def get_all(
+         self,
+         only_available: bool =False,
+         limit: Optional[int] = None,
+         after: Optional[NameKey] = None
+         ) -> Tuple[List[Product], Optional[NameKey]]:
+      statement = select(Product).options(*PRODUCT_READ).order_by(Product.name, Product.id)
       if only_available:
          statement = statement.where(Product.stock_quantity > 0)
-      result = await self.db.execute(statement)
-      return list(result.scalars().all())
+      return await self.__paginate_by_name(statement, limit, after)
 
 
-   async def get_by_id(self, id: UUID) -> Optional[Product]:
-      statement = select(Product).where(Product.id == id)
+   async def get_by_id(self, id: UUID, plan: LoadPlan = PRODUCT_READ) -> Optional[Product]:
+      statement = select(Product).options(*plan).where(Product.id == id)
       result = await self.db.execute(statement)
       return result.scalar_one_or_none()
    
 
    async def get_with_categories(self, id: UUID) -> Optional[Product]:   
-      statement = (
-         select(Product)
-         .options(selectinload(Product.categories))
-         .where(Product.id == id)
-      )
-      result = await self.db.execute(statement)
-      return result.scalar_one_or_none()
+      return await self.get_by_id(id, PRODUCT_WITH_CATEGORIES)
 
 
    async def get_by_name(self, name: str) -> Optional[Product]:
-      statement = select(Product).where(Product.name == name)
+      statement = select(Product).options(*PRODUCT_READ).where(Product.name == name)
       result = await self.db.execute(statement)
       return result.scalar_one_or_none()
    
 
-   async def get_by_category_id(self, category_id: UUID, only_available: bool = False) -> List[Product]:
+   async def get_by_category_id(
+         self,
+         category_id: UUID,
+         only_available: bool = False,
+         limit: Optional[int] = None,
+         after: Optional[NameKey] = None
+         ) -> Tuple[List[Product], Optional[NameKey]]:
       statement = (
          select(Product)
-         .join(Product.categories)
+         .options(*PRODUCT_READ)
          .where(Product.categories.any(id=category_id))
-         .order_by(Product.name)
+         .order_by(Product.name, Product.id)
       )
       if only_available:
          statement = statement.where(Product.stock_quantity > 0)
+      return await self.__paginate_by_name(statement, limit, after)
 
-      result = await self.db.execute(statement)
-      return list(result.scalars().all())
 
-
-   async def get_by_seller_id(self, seller_id: UUID, only_available: bool = False) -> List[Product]:
+   async def get_by_seller_id(
+         self,
+         seller_id: UUID,
+         only_available: bool = False,
+         limit: Optional[int] = None,
+         after: Optional[NameKey] = None
+         ) -> Tuple[List[Product], Optional[NameKey]]:
       statement = (
          select(Product)
+         .options(*PRODUCT_READ)
          .where(Product.seller_profile_id == seller_id)
-         .order_by(Product.name)
+         .order_by(Product.name, Product.id)
       )
       if only_available:
          statement = statement.where(Product.stock_quantity > 0)
-
-      result = await self.db.execute(statement)
-      return list(result.scalars().all())
+      return await self.__paginate_by_name(statement, limit, after)
    
 
-   async def search(self, text: str, only_available: bool = False) -> List[Product]:
+   async def search(
+         self,
+         text: str,
+         only_available: bool = False,
+         limit: Optional[int] = None,
+         after: Optional[NameKey] = None
+         ) -> Tuple[List[Product], Optional[NameKey]]:
       statement = (
          select(Product)
+         .options(*PRODUCT_READ)
          .where(
             or_(
                Product.name.ilike(f"%{text}%"),
                Product.description.ilike(f"%{text}%")
             )
          )
-         .order_by(Product.name)
+         .order_by(Product.name, Product.id)
       )
       if only_available:
          statement = statement.where(Product.stock_quantity > 0)
+      return await self.__paginate_by_name(statement, limit, after)
 
-      result = await self.db.execute(statement)
-      return list(result.scalars().all())
-
-
-   async def full_text_search(self, search_text: str, only_available: bool =False) -> List[Product]:
-        # Prepare the search term for prefix matching
-        search_terms = " & ".join(
-            f"{term}:*" for term in search_text.strip().split()
-        )
-        statement = (
-            select(Product)
-            .where(
-                text("""
-                    to_tsvector('english', coalesce(name, '') || ' ' || coalesce(description, ''))
-                    @@ to_tsquery('english', :search)
-                """)
-            )
-            .params(search=search_terms)
-            .order_by(
-                text("""
-                    ts_rank(
-                        to_tsvector('english', coalesce(name, '') || ' ' || coalesce(description, '')),
-                        to_tsquery('english', :search)
-                    ) DESC
-                """)
+
+   async def full_text_search(
+         self,
+         search_text: str,
+         only_available: bool =False,
+         limit: Optional[int] = None,
+         after: Optional[RankKey] = None
+         ) -> Tuple[List[Product], Optional[RankKey]]:
+      # Prepare the search term for prefix matching
+      search_terms = " & ".join(
+         f"{term}:*" for term in search_text.strip().split()
+      )
+      query = func.to_tsquery(literal_column("'english'"), search_terms)
+      rank = func.ts_rank(Product.search_vector, query)
+
+      statement = (
+         select(Product, rank.label("rank"))
+         .options(*PRODUCT_READ)
+         .where(Product.search_vector.op("@@")(query))
+         .order_by(rank.desc(), Product.id)
+      )
+      if only_available:
+         statement = statement.where(Product.stock_quantity > 0)
+      return await self.__paginate_by_rank(statement, rank, limit, after)
+
+
+   async def trigram_search(
+         self,
+         search_text: str,
+         only_available: bool = False,
+         limit: Optional[int] = None,
+         after: Optional[RankKey] = None,
+         threshold: float = TRIGRAM_SIMILARITY_THRESHOLD
+         ) -> Tuple[List[Product], Optional[RankKey]]:
+      # %> is word_similarity >= pg_trgm.word_similarity_threshold, it matches inside longer
+      # text, tolerates typos and is served by the gin_trgm_ops indexes
+      await self.db.execute(
+         select(func.set_config("pg_trgm.word_similarity_threshold", str(threshold), True))
+      )
+      rank = func.greatest(
+         func.word_similarity(search_text, Product.name),
+         func.word_similarity(search_text, Product.description)
+      )
+
+      statement = (
+         select(Product, rank.label("rank"))
+         .options(*PRODUCT_READ)
+         .where(
+            or_(
+               Product.name.op("%>")(search_text),
+               Product.description.op("%>")(search_text)
             )
-        )
-        if only_available:
-         statement = statement.where(Product.stock_quantity > 0) 
+         )
+         .order_by(rank.desc(), Product.id)
+      )
+      if only_available:
+         statement = statement.where(Product.stock_quantity > 0)
+      return await self.__paginate_by_rank(statement, rank, limit, after)
 
-        result = await self.db.execute(statement)
-        return list(result.scalars().all())
+
+   async def __reload(self, id: UUID, plan: LoadPlan = PRODUCT_READ) -> Product:
+      """ refresh() leaves raise-loaded collections unloaded, so re-select with the plan instead """
+      statement = (
+         select(Product)
+         .options(*plan)
+         .where(Product.id == id)
+         .execution_options(populate_existing=True)
+      )
+      result = await self.db.execute(statement)
+      return result.scalar_one()
 
 
    async def create(self, product: Product) -> Product:
 
       self.db.add(product)
+      await self.price_repository.refresh_products([product.id])
       await self.db.commit()
-      await self.db.refresh(product)
-      return product
+      return await self.__reload(product.id)
 
 
    async def update(self, product: Product) -> Product:
       product.updated_at = datetime.utcnow()
       self.db.add(product)
+      # price and categories both move the effective price
+      await self.price_repository.refresh_products([product.id])
       await self.db.commit()
-      await self.db.refresh(product)
-      return product
+      return await self.__reload(product.id)
    
 
    async def delete(self, id: UUID) -> bool:
-      product = await self.get_by_id(id)
+      product = await self.get_by_id(id, PRODUCT_DELETE)
       if product:
          await self.db.delete(product)
          await self.db.commit()
@@ -142,7 +255,7 @@ class ProductRepository:
 
 
    async def exists_by_name(self, name: str, exclude_id: Optional[UUID] = None) -> bool:
-      statement = select(Product).where(Product.name == name)
+      statement = select(Product.id).where(Product.name == name)
       if exclude_id:
          statement = statement.where(Product.id != exclude_id)
 
@@ -151,6 +264,113 @@ class ProductRepository:
       return product is not None
 
 
+   async def lock_held_quantity(self, product_id: UUID) -> int:
+      """
+      Lock the product row and return what carts hold of it. A seller writes the total stock on hand,
+      stock_quantity is what is left free, total less held. Reservations change the product row,
+      so once it is locked the held quantity can not move until the caller commits
+      """
+      await self.db.execute(select(Product.id).where(Product.id == product_id).with_for_update())
+      result = await self.db.execute(select(held_quantity(product_id)))
+      return result.scalar_one()
+
+
+   async def lock_by_names(self, names: List[str]) -> Dict[str, Tuple[UUID, int]]:
+      """ lock_held_quantity for the existing products of upsert_many, name to (seller_profile_id, held) """
+      if not names:
+         return {}
+      # in id order, so two imports of the same names do not deadlock
+      await self.db.execute(
+         select(Product.id).where(Product.name.in_(names)).order_by(Product.id).with_for_update() # type: ignore
+      )
+      result = await self.db.execute(
+         select(Product.name, Product.seller_profile_id, held_quantity(Product.id))
+         .where(Product.name.in_(names)) # type: ignore
+      )
+      return {name: (seller_profile_id, held) for name, seller_profile_id, held in result.all()}
+
+
+   async def upsert_many(self, seller_profile_id: UUID, rows: List[Dict[str, Any]]) -> Dict[str, Tuple[UUID, bool]]:
+      """
+      Insert or update products by name with one multi row statement, inside the caller's transaction.
+      Names must be distinct and locked with lock_by_names first. stock_quantity is the total on hand,
+      an existing product keeps what carts hold of it. A name that belongs to another seller, or whose
+      total is below what carts hold, is left alone and missing from the result, the others map to (id, created)
+      """
+      now = datetime.utcnow()
+      statement = insert(Product).values([
+         {
+            **row,
+            "id": uuid.uuid4(),
+            "created_at": now,
+            "updated_at": now,
+            "seller_profile_id": seller_profile_id
+         }
+         for row in rows
+      ])
+      statement = statement.on_conflict_do_update(
+         index_elements= [Product.name],
+         set_= {
+            "price": statement.excluded.price,
+            "stock_quantity": statement.excluded.stock_quantity - held_quantity(Product.id),
+            "description": statement.excluded.description,
+            "updated_at": statement.excluded.updated_at
+         },
+         where= and_(
+            Product.seller_profile_id == statement.excluded.seller_profile_id,
+            statement.excluded.stock_quantity >= held_quantity(Product.id)
+         )
+      ).returning(Product.id, Product.name, Product.created_at)
+      result = await self.db.execute(statement)
+      # an updated row keeps its created_at
+      return {name: (product_id, created_at == now) for product_id, name, created_at in result.all()}
+
+
+   async def replace_categories(self, links: Dict[UUID, List[UUID]]) -> None:
+      """
+      set the categories of many products in two statements, inside the caller's transaction.
+      Their effective prices are recomputed, which also covers prices written by upsert_many
+      """
+      if not links:
+         return
+      await self.db.execute(
+         delete(ProductCategoryLink).where(ProductCategoryLink.product_id.in_(list(links))) # type: ignore
+      )
+      rows = [
+         {"product_id": product_id, "category_id": category_id}
+         for product_id, category_ids in links.items()
+         for category_id in dict.fromkeys(category_ids)
+      ]
+      if rows:
+         await self.db.execute(insert(ProductCategoryLink).values(rows))
+      await self.price_repository.refresh_products(list(links))
 
 
+   async def stream_for_export(self, seller_profile_id: Optional[UUID] = None) -> AsyncIterator[Sequence[Row]]:
+      """
+      Export columns in (name, id) order, in batches read through a server side cursor,
+      so memory does not grow with the catalog. Each row carries its category ids, names are not unique.
+      stock_quantity is the total on hand, free plus held in carts, the number the import writes
+      """
+      category_ids = (
+         select(func.array_agg(cast(ProductCategoryLink.category_id, String)))
+         .where(ProductCategoryLink.product_id == Product.id)
+         .scalar_subquery()
+      )
+      statement = (
+         select(
+            Product.name,
+            Product.price,
+            (Product.stock_quantity + held_quantity(Product.id)).label("stock_quantity"),
+            Product.description,
+            category_ids.label("categories")
+         )
+         .order_by(Product.name, Product.id)
+         .execution_options(yield_per= PRODUCT_EXPORT_BATCH_SIZE)
+      )
+      if seller_profile_id:
+         statement = statement.where(Product.seller_profile_id == seller_profile_id)
 
+      result = await self.db.stream(statement)
+      async for batch in result.partitions():
+         yield batch
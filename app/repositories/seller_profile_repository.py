@@ -1,11 +1,12 @@
 from datetime import datetime
-from typing import List, Optional
+from typing import AsyncIterator, List, Optional, Sequence
 from unittest import result
 from uuid import UUID
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import desc, select
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import raiseload, selectinload
 
+from app.core.constants import STREAM_BATCH_SIZE
 from app.models.seller_profile import SellerProfile
 
 
@@ -23,6 +24,19 @@ class SellerProfileRepository:
       return list(result.scalars().all())
 
 
+   async def stream_all(self) -> AsyncIterator[Sequence[SellerProfile]]:
+      """ get_all in batches through a server side cursor, with the images SellerProfileRead shows.
+      products and addresses would otherwise be selectin loaded for every profile """
+      statement = (
+         select(SellerProfile)
+         .options(raiseload(SellerProfile.products), raiseload(SellerProfile.addresses))
+         .execution_options(yield_per= STREAM_BATCH_SIZE)
+      )
+      result = await self.db.stream_scalars(statement)
+      async for batch in result.partitions():
+         yield batch
+
+
    async def get_by_id(self, id: UUID) -> Optional[SellerProfile]:
       statement = select(SellerProfile).where(SellerProfile.id == id)
       result = await self.db.execute(statement)
@@ -0,0 +1,197 @@
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from uuid import UUID
+import uuid
+from sqlalchemy import Integer, Uuid, column, delete, func, update, values
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from app.core.constants import STOCK_RESERVATION_TTL_MINUTES
+from app.models.product import Product
+from app.models.stock_reservation import StockReservation
+
+
+def held_quantity(product_id):
+   """ units of a product that carts hold, already taken out of its stock_quantity """
+   return (
+      select(func.coalesce(func.sum(StockReservation.quantity), 0))
+      .where(StockReservation.product_id == product_id)
+      .correlate_except(StockReservation)
+      .scalar_subquery()
+   )
+
+
+class StockReservationRepository:
+   """
+   products.stock_quantity is the stock still free to reserve. Units move out of it with a conditional
+   decrement that fails rather than oversell, and back in when a reservation is released or expires.
+   Methods run inside the caller's transaction, the caller commits, so keep what follows short:
+   the product row stays locked until then
+   """
+
+   def __init__(self, db: AsyncSession):
+      self.db = db
+
+
+   async def get_held_quantity(self, cart_id: UUID, product_id: UUID, for_update: bool = False) -> int:
+      statement = select(StockReservation.quantity).where(
+         StockReservation.cart_id == cart_id,
+         StockReservation.product_id == product_id
+      )
+      if for_update:
+         statement = statement.with_for_update()
+      result = await self.db.execute(statement)
+      return result.scalar_one_or_none() or 0
+
+
+   async def __take_stock(self, product_id: UUID, quantity: int) -> bool:
+      statement = (
+         update(Product)
+         .where(Product.id == product_id, Product.stock_quantity >= quantity)
+         .values(stock_quantity= Product.stock_quantity - quantity)
+         .returning(Product.stock_quantity)
+         .execution_options(synchronize_session= False)
+      )
+      result = await self.db.execute(statement)
+      return result.scalar_one_or_none() is not None
+
+
+   async def __give_back_stock(self, product_id: UUID, quantity: int) -> None:
+      statement = (
+         update(Product)
+         .where(Product.id == product_id)
+         .values(stock_quantity= Product.stock_quantity + quantity)
+         .execution_options(synchronize_session= False)
+      )
+      await self.db.execute(statement)
+
+
+   async def reserve(self, cart_id: UUID, product_id: UUID, quantity: int) -> bool:
+      """
+      Hold exactly quantity units of the product for the cart line and restart its ttl.
+      Only the difference to what the line already holds touches the product row.
+      Returns False, leaving the transaction to be rolled back, when the stock can not cover it
+      """
+      # the lock keeps the sweeper from giving back this reservation while it is adjusted
+      held = await self.get_held_quantity(cart_id, product_id, for_update= True)
+      difference = quantity - held
+      if difference > 0 and not await self.__take_stock(product_id, difference):
+         return False
+      if difference < 0:
+         await self.__give_back_stock(product_id, -difference)
+
+      expires_at = datetime.utcnow() + timedelta(minutes= STOCK_RESERVATION_TTL_MINUTES)
+      statement = insert(StockReservation).values(
+         id= uuid.uuid4(),
+         created_at= datetime.utcnow(),
+         updated_at= datetime.utcnow(),
+         cart_id= cart_id,
+         product_id= product_id,
+         quantity= quantity,
+         expires_at= expires_at
+      )
+      statement = statement.on_conflict_do_update(
+         constraint= "uq_stock_reservations_cart_id_product_id",
+         set_= {
+            "quantity": statement.excluded.quantity,
+            "expires_at": statement.excluded.expires_at,
+            "updated_at": statement.excluded.updated_at
+         }
+      )
+      await self.db.execute(statement)
+      return True
+
+
+   async def __release_where(self, *criteria) -> int:
+      # one statement: delete the reservations and add their units back, summed per product
+      released = (
+         delete(StockReservation)
+         .where(*criteria)
+         .returning(StockReservation.product_id, StockReservation.quantity)
+         .cte("released")
+      )
+      restored = (
+         select(released.c.product_id, func.sum(released.c.quantity).label("quantity"))
+         .group_by(released.c.product_id)
+         .subquery("restored")
+      )
+      statement = (
+         update(Product)
+         .where(Product.id == restored.c.product_id)
+         .values(stock_quantity= Product.stock_quantity + restored.c.quantity)
+         .execution_options(synchronize_session= False)
+      )
+      result = await self.db.execute(statement)
+      return result.rowcount # type: ignore
+
+
+   async def release(self, cart_id: UUID, product_ids: Optional[List[UUID]] = None) -> None:
+      """ give back what the cart holds, for the given products or all of them """
+      criteria = [StockReservation.cart_id == cart_id]
+      if product_ids is not None:
+         criteria.append(StockReservation.product_id.in_(product_ids)) # type: ignore
+      await self.__release_where(*criteria)
+
+
+   async def release_expired(self) -> int:
+      """ sweeper, gives back every expired reservation in its own transaction, returns the products restocked """
+      restocked = await self.__release_where(StockReservation.expires_at < datetime.utcnow())
+      await self.db.commit()
+      return restocked
+
+
+   async def consume(self, cart_id: UUID, quantities: Dict[UUID, int]) -> List[UUID]:
+      """
+      Checkout: the cart's reservations become sold stock. Lines whose reservation expired or differs
+      from the line settle the difference now, one conditional update for all products, in id order
+      so concurrent checkouts lock shared products the same way round.
+      Returns the products the stock could not cover, the caller rolls back then
+      """
+      statement = (
+         select(StockReservation.product_id, StockReservation.quantity)
+         .where(StockReservation.cart_id == cart_id)
+         .with_for_update()
+      )
+      result = await self.db.execute(statement)
+      held = {product_id: quantity for product_id, quantity in result.all()}
+
+      differences = {
+         product_id: quantity - held.get(product_id, 0)
+         for product_id, quantity in quantities.items()
+      }
+      # held for products no longer in the cart goes back
+      differences.update({product_id: -quantity for product_id, quantity in held.items() if product_id not in quantities})
+      differences = {product_id: difference for product_id, difference in differences.items() if difference != 0}
+
+      short: List[UUID] = []
+      if differences:
+         product_ids = sorted(differences)
+         changes = values(
+            column("product_id", Uuid), column("quantity", Integer), name="changes"
+         ).data([(product_id, differences[product_id]) for product_id in product_ids])
+         locked = (
+            select(Product.id)
+            .where(Product.id.in_(product_ids)) # type: ignore
+            .order_by(Product.id)
+            .with_for_update()
+            .cte("locked")
+         )
+         statement = (
+            update(Product)
+            .where(
+               Product.id == changes.c.product_id,
+               Product.id == locked.c.id,
+               Product.stock_quantity >= changes.c.quantity
+            )
+            .values(stock_quantity= Product.stock_quantity - changes.c.quantity)
+            .returning(Product.id)
+            .execution_options(synchronize_session= False)
+         )
+         result = await self.db.execute(statement)
+         covered = set(result.scalars().all())
+         short = [product_id for product_id in product_ids if product_id not in covered]
+
+      if not short:
+         await self.db.execute(delete(StockReservation).where(StockReservation.cart_id == cart_id))
+      return short
@@ -1,9 +1,11 @@
 from datetime import datetime
-from typing import List, Optional
+from typing import AsyncIterator, List, Optional, Sequence
 from uuid import UUID
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import select
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import raiseload, selectinload
+from app.authentication.auth_configuration import user_snapshot_cache
+from app.core.constants import STREAM_BATCH_SIZE
 from app.models.user import User
 
 
@@ -19,6 +21,19 @@ class UserRepository:
       return list(result.scalars().all())
 
 
+   async def stream_all(self) -> AsyncIterator[Sequence[User]]:
+      """ get_all in batches through a server side cursor, for UserRead so addresses are not loaded """
+      statement = (
+         select(User)
+         .options(raiseload(User.addresses))
+         .order_by(User.user_name)
+         .execution_options(yield_per= STREAM_BATCH_SIZE)
+      )
+      result = await self.db.stream_scalars(statement)
+      async for batch in result.partitions():
+         yield batch
+
+
    async def get_by_id(self, id: UUID) -> Optional[User]:
       statement = select(User).where(User.id == id)
       result = await self.db.execute(statement)
@@ -67,6 +82,7 @@ class UserRepository:
       user.updated_at = datetime.utcnow()
       self.db.add(user)
       await self.db.commit()
+      user_snapshot_cache.invalidate(user.id)
       await self.db.refresh(user)
       return user
 
@@ -77,6 +93,7 @@ class UserRepository:
          return False
       await self.db.delete(user)
       await self.db.commit()
+      user_snapshot_cache.invalidate(id)
       return True
 
 
@@ -14,6 +14,7 @@ from .user_profile_router import router as user_profile_router
 from .seller_profile_router import router as seller_profile_router
 from .auth_router import router as auth_router
 from .image_router import router as image_router
+from .order_router import router as order_router
 
 # Create main API router
 api_router = APIRouter()
@@ -91,6 +92,12 @@ api_router.include_router(
    tags=["Images"]
 )
 
+api_router.include_router(
+   order_router,
+   prefix="/orders",
+   tags=["Orders"]
+)
+
 
 # Export the main router
 __all__ = ["api_router"]  # Fixed: Use double underscores
@@ -6,7 +6,7 @@ from fastapi import APIRouter
 from app.db.database import get_db
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models.user import User
+from app.authentication.auth_schema import UserSnapshot
 from app.schemas.address import AddressCreate, AddressRead, AddressUpdate
 from app.services.address_service import AddressService
 from app.authentication.auth_dependency import (
@@ -32,7 +32,7 @@ async def get_address_service(db: AsyncSession = Depends(get_db)) -> AddressServ
 @router.get("/", response_model=List[AddressRead], status_code= status.HTTP_200_OK)
 async def get_all_addresses(
    service: AddressService = Depends(get_address_service),
-   current_user: User = Depends(require_admin)
+   current_user: UserSnapshot = Depends(require_admin)
 ):
    return await service.get_all()
 
@@ -65,7 +65,7 @@ async def get_addresses_by_seller_id(
 async def create_address(
    address: AddressCreate,
    service: AddressService = Depends(get_address_service),
-   current_user: User = Depends(get_current_verified_user)
+   current_user: UserSnapshot = Depends(get_current_verified_user)
 ):
    ### should get user_id or seller_id from token sent
    return await service.create(current_user.id, address)
@@ -76,7 +76,7 @@ async def update_address(
    address_id: UUID,
    update_address: AddressUpdate,
    service: AddressService = Depends(get_address_service),
-   current_user: User = Depends(get_current_verified_user)
+   current_user: UserSnapshot = Depends(get_current_verified_user)
 ):
    return await service.update(address_id, update_address)
 
@@ -85,7 +85,7 @@ async def update_address(
 async def delete_address(
    address_id: UUID,
    service: AddressService = Depends(get_address_service),
-   current_user: User = Depends(get_current_verified_user)
+   current_user: UserSnapshot = Depends(get_current_verified_user)
 ):
    return await service.delete(address_id)
 
@@ -1,9 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import Dict
+from typing import Dict, Optional
 
 from app.db.database import get_db
-from app.models.user import User
+from app.authentication.auth_schema import UserSnapshot
 from app.services.auth_service import AuthService
 from app.authentication.auth_schema import (
     LoginRequestEmail, RegisterRequest, RefreshTokenRequest,
@@ -65,14 +65,20 @@ async def refresh_token(
 
 @router.post("/logout", response_model=Dict[str, str])
 async def logout(
-    current_user: User = Depends(get_current_active_user),
+    refresh_data: Optional[RefreshTokenRequest] = None,
+    current_user: UserSnapshot = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db)
 ):
     """
-    Logout current user by revoking refresh token.
+    Logout current user by revoking refresh tokens.
+    
+    - **refresh_token**: Optional, only logs out the device this token belongs to
     """
     service = AuthService(db)
-    success = await service.logout(current_user.id)
+    success = await service.logout(
+        current_user.id,
+        refresh_data.refresh_token if refresh_data else None
+    )
     
     if success:
         return {"message": "Successfully logged out"}
@@ -86,7 +92,7 @@ async def logout(
 @router.post("/change-password", response_model=Dict[str, str])
 async def change_password(
     change_data: ChangePasswordRequest,
-    current_user: User = Depends(get_current_active_user),
+    current_user: UserSnapshot = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -109,25 +115,28 @@ async def change_password(
 
 @router.get("/me", response_model=UserRead)
 async def get_current_user_info(
-    current_user: User = Depends(get_current_active_user)
+    current_user: UserSnapshot = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Get current user information.
     """
+    service = AuthService(db)
+    user = await service.get_current_user(current_user.id)
     return UserRead(
-        id=current_user.id,
-        user_name=current_user.user_name,
-        full_name=current_user.full_name,
-        email=current_user.email,
-        phone_number=current_user.phone_number or "",
-        created_at=current_user.created_at,
-        updated_at=current_user.updated_at
+        id=user.id,
+        user_name=user.user_name,
+        full_name=user.full_name,
+        email=user.email,
+        phone_number=user.phone_number or "",
+        created_at=user.created_at,
+        updated_at=user.updated_at
     )
 
 
 @router.post("/verify-email", response_model=Dict[str, str])
 async def verify_email(
-    current_user: User = Depends(get_current_active_user),
+    current_user: UserSnapshot = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -5,7 +5,7 @@ from fastapi import APIRouter, Query, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.database import get_db
-from app.models.user import User
+from app.authentication.auth_schema import UserSnapshot
 from app.services.cart_service import CartService
 from app.schemas.cart import CartCreate, CartRead, CartWithItems
 from app.schemas.cart_item import CartItemCreate, CartItemRead, CartItemUpdate, CartItemWithProduct
@@ -74,7 +74,7 @@ async def add_item_to_cart(
    cart_id: UUID,
    cart_item_data: CartItemCreate,
    service: CartService = Depends(get_cart_service),
-   current_user: User = Depends(require_user)
+   current_user: UserSnapshot = Depends(require_user)
 ):
    return await service.add_cart_item(cart_id= cart_id, cart_item_data= cart_item_data)
 
@@ -84,7 +84,7 @@ async def update_item_quantity(
    item_id: UUID,
    update_data: CartItemUpdate,
    service: CartService = Depends(get_cart_service),
-   current_user: User = Depends(get_current_active_user)
+   current_user: UserSnapshot = Depends(get_current_active_user)
 ):
    return await service.update_cart_item(cart_item_id= item_id, update_data= update_data)
 
@@ -93,7 +93,7 @@ async def update_item_quantity(
 async def remove_item_from_cart(
    item_id: UUID,
    service: CartService = Depends(get_cart_service),
-   current_user: User = Depends(get_current_active_user)
+   current_user: UserSnapshot = Depends(get_current_active_user)
 ):
    return await service.remove_cart_item(cart_item_id= item_id)
 
@@ -102,7 +102,7 @@ async def remove_item_from_cart(
 async def clear_cart(
    cart_id: UUID,
    service: CartService = Depends(get_cart_service),
-   current_user: User = Depends(get_current_active_user)
+   current_user: UserSnapshot = Depends(get_current_active_user)
 ):
    return await service.clear_cart(cart_id= cart_id)
 
@@ -1,8 +1,9 @@
 from __future__ import annotations
 from fastapi import HTTPException, APIRouter, Depends, Query, status
-from app.models.user import User
+from app.enums.enums import Search_Algorithm
+from app.authentication.auth_schema import UserSnapshot
 from app.services.category_service import CategoryService
-from app.db.database import get_db
+from app.db.database import get_db, get_read_db
 from app.schemas import CategoryCreate, CategoryRead, CategoryUpdate, CategoryWithProducts
 from uuid import UUID
 from typing import List, Optional
@@ -26,10 +27,15 @@ async def get_category_service(db: AsyncSession = Depends(get_db)) -> CategorySe
    return CategoryService(db)
 
 
+# catalog reads, served by a read replica
+async def get_read_category_service(db: AsyncSession = Depends(get_read_db)) -> CategoryService:
+   return CategoryService(db)
+
+
 @router.get("/", response_model=List[CategoryRead], status_code=status.HTTP_200_OK)
 async def get_categories(
     search: Optional[str] = Query(None, description="Search by name"),
-    service: CategoryService = Depends(get_category_service)
+    service: CategoryService = Depends(get_read_category_service)
 ):
     """Get all categories WITHOUT products (or search if query provided)"""
     if search:
@@ -39,7 +45,7 @@ async def get_categories(
 
 @router.get("/with-products", response_model=List[CategoryWithProducts], status_code=status.HTTP_200_OK)
 async def get_categories_with_products(
-    service: CategoryService = Depends(get_category_service)
+    service: CategoryService = Depends(get_read_category_service)
 ):
     """Get all categories WITH products"""
     return await service.get_all_categories_with_products()
@@ -49,17 +55,18 @@ async def get_categories_with_products(
 async def search_categories(
     q: str = Query(..., min_length=1, description="Search categories"),
     full_text: bool = Query(False, description="Use full text search"),
-    service: CategoryService = Depends(get_category_service)
+    algorithm: Optional[Search_Algorithm] = Query(None, description="ilike, full_text or trigram (typo tolerant), overrides full_text"),
+    service: CategoryService = Depends(get_read_category_service)
 ):
     """Search categories by name or description WITHOUT products"""
-    return await service.search_categories(q, full_text)
+    return await service.search_categories(q, algorithm or (Search_Algorithm.FULL_TEXT if full_text else Search_Algorithm.ILIKE))
 
 
 @router.get("/{category_id}", status_code=status.HTTP_200_OK)
 async def get_category(
     category_id: UUID,
     include_products: bool = Query(False, description="Include products in response"),
-    service: CategoryService = Depends(get_category_service)
+    service: CategoryService = Depends(get_read_category_service)
 ):
     """
     Get category by ID. 
@@ -71,7 +78,7 @@ async def get_category(
 @router.get("/name/{category_name}", response_model=CategoryRead, status_code=status.HTTP_200_OK)
 async def get_category_by_name(
     category_name: str,
-    service: CategoryService = Depends(get_category_service)
+    service: CategoryService = Depends(get_read_category_service)
 ):
     """Get category by name WITHOUT products"""
     return await service.get_category_by_name(category_name)
@@ -80,7 +87,7 @@ async def get_category_by_name(
 @router.post("/", response_model=CategoryRead, status_code=status.HTTP_201_CREATED)
 async def create_category(
     category: CategoryCreate,
-    current_user: User = Depends(require_admin),
+    current_user: UserSnapshot = Depends(require_admin),
     service: CategoryService = Depends(get_category_service)
 ):
     """Create a new category"""
@@ -91,7 +98,7 @@ async def create_category(
 async def update_category(
     category_id: UUID,
     category_update: CategoryUpdate,
-    current_user: User = Depends(require_admin),
+    current_user: UserSnapshot = Depends(require_admin),
     service: CategoryService = Depends(get_category_service)
 ):
     """Update category"""
@@ -101,7 +108,7 @@ async def update_category(
 @router.delete("/{category_id}", response_model= bool, status_code=status.HTTP_200_OK)
 async def delete_category(
     category_id: UUID,
-    current_user: User = Depends(require_admin),
+    current_user: UserSnapshot = Depends(require_admin),
     service: CategoryService = Depends(get_category_service)
 ):
     return await service.delete_category(category_id)
@@ -1,13 +1,15 @@
 from __future__ import annotations
-from typing import List
-from fastapi import HTTPException, APIRouter, Depends, Query, status
+from typing import List, Optional
+from fastapi import HTTPException, APIRouter, Depends, Query, Request, status
 from uuid import UUID
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models.user import User
+from app.authentication.auth_schema import UserSnapshot
 from app.routers.cart_router import get_cart_service
+from app.core.streaming import streaming_list_response
+from app.enums.enums import Stream_Format
 from app.services.coupon_service import CouponService
-from app.db.database import get_db
+from app.db.database import get_db, read_session_factory
 from app.schemas.coupon import CouponCreate, CouponRead, CouponUpdate, CouponSetStatus
 from app.schemas.coupon_usage import CouponUsageCreate, CouponUsageRead
 from app.authentication.auth_dependency import (
@@ -31,7 +33,7 @@ async def get_coupon_service(db: AsyncSession = Depends(get_db)) -> CouponServic
 async def get_coupons(
    is_active: bool = Query(None, description="return active or expire coupons"),
    service: CouponService = Depends(get_coupon_service),
-   current_user: User = Depends(require_admin)
+   current_user: UserSnapshot = Depends(require_admin)
 ):
    if is_active is not None:
       return await service.get_coupons_by_active_status(is_active)
@@ -41,9 +43,15 @@ async def get_coupons(
 
 @router.get("/coupon-usages", response_model= List[CouponUsageRead], status_code= status.HTTP_200_OK)
 async def get_all_coupon_usages(
+   request: Request,
+   stream: Optional[Stream_Format] = Query(None, description="ndjson or json, streams the list batch by batch"),
    service: CouponService = Depends(get_coupon_service),
-   current_user: User = Depends(require_admin)
+   current_user: UserSnapshot = Depends(require_admin)
 ):
+   if stream:
+      return streaming_list_response(
+         read_session_factory(request), lambda db: CouponService(db).stream_all_coupon_usages(), stream
+      )
    return await service.get_all_coupon_usages()
 
 
@@ -51,7 +59,7 @@ async def get_all_coupon_usages(
 async def get_coupon_by_code(
    code: UUID,
    service: CouponService = Depends(get_coupon_service),
-   current_user: User = Depends(require_admin)
+   current_user: UserSnapshot = Depends(require_admin)
 ):
    return await service.get_by_code(code)
 
@@ -60,7 +68,7 @@ async def get_coupon_by_code(
 async def get_coupon_by_id(
    coupon_id: UUID,
    service: CouponService = Depends(get_coupon_service),
-   current_user: User = Depends(require_admin)
+   current_user: UserSnapshot = Depends(require_admin)
 ):
    return await service.get_by_id(coupon_id)
 
@@ -69,7 +77,7 @@ async def get_coupon_by_id(
 async def get_coupon_usage_by_id(
    coupon_usage_id: UUID,
    service: CouponService = Depends(get_coupon_service),
-   current_user: User = Depends(require_admin)
+   current_user: UserSnapshot = Depends(require_admin)
 ):
    return await service.get_coupon_usage_by_id(coupon_usage_id)
 
@@ -78,7 +86,7 @@ async def get_coupon_usage_by_id(
 async def get_coupon_usages_by_coupon_id(
    coupon_id: UUID,
    service: CouponService = Depends(get_coupon_service),
-   current_user: User = Depends(require_admin)
+   current_user: UserSnapshot = Depends(require_admin)
 ):
    return await service.get_coupon_usages_by_coupon_id(coupon_id)
 
@@ -87,7 +95,7 @@ async def get_coupon_usages_by_coupon_id(
 async def get_coupon_usages_by_user_id(
    user_id: UUID,
    service: CouponService = Depends(get_coupon_service),
-   current_user: User = Depends(require_admin)
+   current_user: UserSnapshot = Depends(require_admin)
 ):
    return await service.get_coupon_usages_by_user_id(user_id)
 
@@ -98,7 +106,7 @@ async def set_coupon_active_status(
    coupon_set_status: CouponSetStatus,
    coupon_id: UUID,
    service: CouponService = Depends(get_coupon_service),
-   current_user: User = Depends(require_admin)
+   current_user: UserSnapshot = Depends(require_admin)
 ):
    return await service.set_coupon_active_status(coupon_id, coupon_set_status)
 
@@ -107,7 +115,7 @@ async def set_coupon_active_status(
 async def create_coupon(
    coupon: CouponCreate,
    service: CouponService = Depends(get_coupon_service),
-   current_user: User = Depends(require_admin)
+   current_user: UserSnapshot = Depends(require_admin)
 ):
    return await service.create_coupon(coupon)
 
@@ -117,7 +125,7 @@ async def update_coupon(
    coupon_id: UUID,
    coupon_update: CouponUpdate,
    service: CouponService = Depends(get_coupon_service),
-   current_user: User = Depends(require_admin)
+   current_user: UserSnapshot = Depends(require_admin)
 ):
    return await service.update_coupon(coupon_id, coupon_update)
 
@@ -126,7 +134,7 @@ async def update_coupon(
 async def delete_coupon(
    coupon_id: UUID,
    service: CouponService = Depends(get_coupon_service),
-   current_user: User = Depends(require_admin)
+   current_user: UserSnapshot = Depends(require_admin)
 ):
    return await service.delete_coupon(coupon_id)
 
@@ -8,7 +8,7 @@ from fastapi import HTTPException, status
 
 from app.db.database import get_db
 from app.enums.enums import Discount_Model_Type
-from app.models.user import User
+from app.authentication.auth_schema import UserSnapshot
 from app.services.discount_service import DiscountService
 from app.schemas.base_schema import DiscountSetStatus
 from app.schemas import CategoryDiscountCreate, CategoryDiscountRead, CategoryDiscountUpdate, ProductDiscountCreate, ProductDiscountRead, ProductDiscountUpdate, ShipmentDiscountCreate, ShipmentDiscountRead, ShipmentDiscountUpdate
@@ -76,7 +76,7 @@ async def get_discounts_by_entity_id(
 async def create(
    discount: CategoryDiscountCreate | ProductDiscountCreate | ShipmentDiscountCreate,
    service: DiscountService = Depends(get_discount_service),
-   current_user: User = Depends(require_admin)
+   current_user: UserSnapshot = Depends(require_admin)
 ):
    return await service.create(discount)
 
@@ -87,7 +87,7 @@ async def update(
    discount_id: UUID,
    update_data: CategoryDiscountUpdate | ProductDiscountUpdate | ShipmentDiscountUpdate,
    service: DiscountService = Depends(get_discount_service),
-   current_user: User = Depends(require_admin)
+   current_user: UserSnapshot = Depends(require_admin)
 ):
    return await service.update(discount_id, update_data, type)
 
@@ -97,7 +97,7 @@ async def delete(
    type: Discount_Model_Type,
    discount_id: UUID,
    service: DiscountService = Depends(get_discount_service),
-   current_user: User = Depends(require_admin)
+   current_user: UserSnapshot = Depends(require_admin)
 ):
    return await service.delete(discount_id, type)
 
@@ -108,7 +108,7 @@ async def set_discount_status(
    discount_id: UUID,
    discount_status: DiscountSetStatus,
    service: DiscountService = Depends(get_discount_service),
-   current_user: User = Depends(require_admin)
+   current_user: UserSnapshot = Depends(require_admin)
 ):
    return await service.set_discount_status(discount_id, discount_status, type)
 
@@ -7,8 +7,8 @@ from fastapi import File, HTTPException, status, UploadFile
 
 from fastapi import APIRouter, Depends
 
-from app.db.database import get_db
-from app.models.user import User
+from app.db.database import get_db, get_read_db
+from app.authentication.auth_schema import UserSnapshot
 from app.schemas.image import ImageRead, ImageUpdate
 from app.services.image_service import ImageService
 from app.authentication.auth_dependency import(
@@ -27,11 +27,16 @@ async def get_image_service(db: AsyncSession = Depends(get_db)) -> ImageService:
    return ImageService(db)
 
 
+# catalog reads, served by a read replica
+async def get_read_image_service(db: AsyncSession = Depends(get_read_db)) -> ImageService:
+   return ImageService(db)
+
+
 @router.get("/entity/{entity_type}/{entity_id}", response_model= List[ImageRead], status_code= status.HTTP_200_OK)
 async def get_images_by_entity(
    entity_id: UUID,
    entity_type: str,
-   service: ImageService = Depends(get_image_service)
+   service: ImageService = Depends(get_read_image_service)
 ):
    return await service.get_images_by_entity(entity_type, entity_id)
 
@@ -39,7 +44,7 @@ async def get_images_by_entity(
 @router.get("/{image_id}", response_model= ImageRead, status_code= status.HTTP_200_OK)
 async def get_image_by_id(
    image_id: UUID,
-   service: ImageService = Depends(get_image_service)
+   service: ImageService = Depends(get_read_image_service)
 ):
    return await service.get_image_by_id(image_id)
 
@@ -50,7 +55,7 @@ async def upload_images(
    entity_id: UUID,
    files: List[UploadFile] = File(..., description="Image files to upload"),
    service: ImageService = Depends(get_image_service),
-   current_user: User = Depends(require_seller)
+   current_user: UserSnapshot = Depends(require_seller)
 ):
    if not files:
         raise HTTPException(
@@ -83,7 +88,8 @@ async def update_image_by_id(
 @router.delete("/{image_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_image_by_id(
    image_id: UUID,
-   service: ImageService = Depends(require_seller),
+   service: ImageService = Depends(get_image_service),
+   current_user: UserSnapshot = Depends(require_seller)
 ):
    return await service.delete(image_id)
 
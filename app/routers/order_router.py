@@ -0,0 +1,32 @@
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Query, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.authentication.auth_schema import UserSnapshot
+from app.core.streaming import streaming_list_response
+from app.db.database import get_db, read_session_factory
+from app.enums.enums import Stream_Format
+from app.schemas.order import OrderRead
+from app.services.order_service import OrderService
+from app.authentication.auth_dependency import require_admin
+
+
+router = APIRouter(
+   responses={404: {"description": "Not found"}}
+)
+
+
+async def get_order_service(db: AsyncSession = Depends(get_db)) -> OrderService:
+   return OrderService(db)
+
+
+@router.get("/", response_model= List[OrderRead], status_code= status.HTTP_200_OK)
+async def get_all(
+   request: Request,
+   stream: Optional[Stream_Format] = Query(None, description="ndjson or json, streams the list batch by batch"),
+   service: OrderService = Depends(get_order_service),
+   current_user: UserSnapshot = Depends(require_admin)
+):
+   if stream:
+      return streaming_list_response(read_session_factory(request), lambda db: OrderService(db).stream_all(), stream)
+   return await service.get_all()
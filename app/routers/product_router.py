@@ -1,11 +1,16 @@
 from __future__ import annotations
-from typing import List, Optional
+from typing import List, Optional, Union
 from uuid import UUID
-from fastapi import HTTPException, APIRouter, Depends, Query, status
-from app.db.database import get_db
-
-from app.models.user import User
-from app.schemas.product import ProductRead, ProductCreate, ProductUpdate, ProductWithCategories
+from fastapi import HTTPException, APIRouter, Depends, Query, Request, status
+from fastapi.responses import StreamingResponse
+from app.core.bulk_io import MEDIA_TYPES, format_from_content_type
+from app.core.responses import PydanticJSONResponse
+from app.core.pagination import MAX_PAGE_SIZE
+from app.enums.enums import Bulk_Format, Search_Algorithm
+from app.db.database import get_db, get_read_db, read_session_factory, stream_with_session
+
+from app.authentication.auth_schema import UserSnapshot
+from app.schemas.product import ProductImportResult, ProductPage, ProductRead, ProductCreate, ProductUpdate, ProductWithCategories
 from app.services.product_service import ProductService
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.authentication.auth_dependency import (
@@ -26,33 +31,78 @@ async def get_product_service(db: AsyncSession = Depends(get_db)) -> ProductServ
    return ProductService(db)
 
 
+# catalog reads, served by a read replica
+async def get_read_product_service(db: AsyncSession = Depends(get_read_db)) -> ProductService:
+   return ProductService(db)
+
+
+## passing limit or after switches a list endpoint to cursor pagination ##
+ProductListResponse = Union[ProductPage, List[ProductRead]]
+
+## the catalog reads return PydanticJSONResponse, the service already built the response schemas
+## so they are written straight to JSON. response_model still documents them
 
-@router.get("/", response_model=List[ProductRead], status_code= status.HTTP_200_OK)
+
+
+@router.get("/", response_model=ProductListResponse, status_code= status.HTTP_200_OK)
 async def get_products(
    search: Optional[str] = Query(None, description= "Search products"),
    only_available: bool = Query(False, description="True return only available products"),
-   service: ProductService = Depends(get_product_service)
+   limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size, returns a page with next_cursor"),
+   after: Optional[str] = Query(None, description="next_cursor of the previous page"),
+   service: ProductService = Depends(get_read_product_service)
 ):
    if search:
-      return await service.search_products(text= search, only_available= only_available)
-   return await service.get_all_products(only_available= only_available)
+      return PydanticJSONResponse(
+         await service.search_products(text= search, only_available= only_available, limit= limit, after= after)
+      )
+   return PydanticJSONResponse(
+      await service.get_all_products(only_available= only_available, limit= limit, after= after)
+   )
 
 
-@router.get("/search", response_model=List[ProductRead], status_code= status.HTTP_200_OK)
+@router.get("/search", response_model=ProductListResponse, status_code= status.HTTP_200_OK)
 async def search_products(
    q: str = Query(..., min_length=1, description="Search products"),
    use_full_text: bool = Query(False, description="Use full text search algorithm"),
+   algorithm: Optional[Search_Algorithm] = Query(None, description="ilike, full_text or trigram (typo tolerant), overrides use_full_text"),
    only_available: bool = Query(False, description="True return only available products"),
-   service: ProductService = Depends(get_product_service)
+   limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size, returns a page with next_cursor"),
+   after: Optional[str] = Query(None, description="next_cursor of the previous page"),
+   service: ProductService = Depends(get_read_product_service)
 ):
-   return await service.search_products(text= q, use_full_text= use_full_text, only_available= only_available)
+   return PydanticJSONResponse(await service.search_products(
+      text= q,
+      algorithm= algorithm or (Search_Algorithm.FULL_TEXT if use_full_text else Search_Algorithm.ILIKE),
+      only_available= only_available,
+      limit= limit,
+      after= after
+   ))
+
+
+@router.get("/export", response_class= StreamingResponse, status_code= status.HTTP_200_OK)
+async def export_products(
+   request: Request,
+   format: Bulk_Format = Query(Bulk_Format.CSV, description="csv or ndjson, the formats /import reads"),
+   current_user: UserSnapshot = Depends(require_seller),
+   service: ProductService = Depends(get_read_product_service)
+):
+   seller_profile_id = await service.get_export_seller_id(current_user)
+   return StreamingResponse(
+      stream_with_session(
+         read_session_factory(request),
+         lambda db: ProductService(db).export_products(format, seller_profile_id)
+      ),
+      media_type= MEDIA_TYPES[format],
+      headers= {"Content-Disposition": f'attachment; filename="products.{format.value}"'}
+   )
 
 
 @router.get("/{product_id}", status_code= status.HTTP_200_OK)
 async def get_product_by_id(
    product_id: UUID,
    include_categories: bool = Query(False, description= "including categories"),
-   service: ProductService = Depends(get_product_service)
+   service: ProductService = Depends(get_read_product_service)
 ):
    return await service.get_product_by_id(product_id, include_categories = include_categories)
 
@@ -60,43 +110,72 @@ async def get_product_by_id(
 @router.get("/name/{product_name}", response_model= ProductRead, status_code= status.HTTP_200_OK)
 async def get_product_by_name(
    product_name: str,
-   service: ProductService = Depends(get_product_service)
+   service: ProductService = Depends(get_read_product_service)
 ):
    return await service.get_product_by_name(product_name)
 
 
-@router.get("/category/{category_id}", response_model= List[ProductRead], status_code= status.HTTP_200_OK)
+@router.get("/category/{category_id}", response_model= ProductListResponse, status_code= status.HTTP_200_OK)
 async def get_products_by_category_id(
    category_id: UUID,
    only_available: bool = Query(False, description="True return only available products"),
-   service: ProductService = Depends(get_product_service)
+   limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size, returns a page with next_cursor"),
+   after: Optional[str] = Query(None, description="next_cursor of the previous page"),
+   service: ProductService = Depends(get_read_product_service)
 ):
-   return await service.get_products_by_category_id(category_id= category_id, only_available= only_available)
+   return PydanticJSONResponse(
+      await service.get_products_by_category_id(category_id= category_id, only_available= only_available, limit= limit, after= after)
+   )
 
 
-@router.get("/seller/{seller_id}", response_model= List[ProductRead], status_code= status.HTTP_200_OK)
+@router.get("/seller/{seller_id}", response_model= ProductListResponse, status_code= status.HTTP_200_OK)
 async def get_products_by_seller_id(
    seller_id: UUID,
    only_available: bool = Query(False, description="True return only available products"),
-   service: ProductService = Depends(get_product_service)
+   limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size, returns a page with next_cursor"),
+   after: Optional[str] = Query(None, description="next_cursor of the previous page"),
+   service: ProductService = Depends(get_read_product_service)
 ):
-   return await service.get_products_by_seller_id(seller_id= seller_id, only_available= only_available)
+   return PydanticJSONResponse(
+      await service.get_products_by_seller_id(seller_id= seller_id, only_available= only_available, limit= limit, after= after)
+   )
 
 
 @router.post("/", response_model= ProductRead, status_code= status.HTTP_201_CREATED)
 async def create_product(
    product_data: ProductCreate,
-   current_user: User = Depends(require_seller),
+   current_user: UserSnapshot = Depends(require_seller),
    service: ProductService = Depends(get_product_service)
 ):
    return await service.create_product(current_user.id, product_data= product_data)
 
 
+@router.post("/import", response_model= ProductImportResult, status_code= status.HTTP_200_OK)
+async def import_products(
+   request: Request,
+   format: Optional[Bulk_Format] = Query(None, description="csv or ndjson, defaults to the Content-Type"),
+   current_user: UserSnapshot = Depends(require_seller),
+   service: ProductService = Depends(get_product_service)
+):
+   """
+   CSV with a header row or NDJSON, columns name, price, stock_quantity (total on hand, carts keep what they hold),
+   description, categories (ids, or names that belong to one category). The body is streamed, an Idempotency-Key
+   is ignored here, rows upsert by name so sending the same file again is safe
+   """
+   bulk_format = format or format_from_content_type(request.headers.get("content-type", ""))
+   if bulk_format is None:
+      raise HTTPException(
+         status_code= status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+         detail= "Send text/csv or application/x-ndjson, or pass format"
+      )
+   return await service.import_products(current_user.id, request.stream(), bulk_format)
+
+
 @router.put("/{product_id}", response_model= ProductRead, status_code= status.HTTP_200_OK)
 async def update_product(
    product_id: UUID,
    product_update: ProductUpdate,
-   current_user: User = Depends(get_current_verified_user),
+   current_user: UserSnapshot = Depends(get_current_verified_user),
    service: ProductService = Depends(get_product_service)
 ):
    ## here get product and check seller_id == product.seller_id
@@ -108,7 +187,7 @@ async def update_product(
 @router.delete("/{product_id}", response_model= bool, status_code= status.HTTP_200_OK)
 async def delete_product(
    product_id: UUID,
-   current_user: User = Depends(require_admin),
+   current_user: UserSnapshot = Depends(require_admin),
    service: ProductService = Depends(get_product_service)
 ):
    return await service.delete_product(product_id)
@@ -1,14 +1,16 @@
  
-from typing import List
+from typing import List, Optional
 from uuid import UUID
 from sqlalchemy.ext.asyncio import AsyncSession
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 
 from pydantic_extra_types.phone_numbers import PhoneNumber
 
-from app.models.user import User
+from app.authentication.auth_schema import UserSnapshot
 PhoneNumber.phone_format = 'E164'
-from app.db.database import get_db
+from app.core.streaming import streaming_list_response
+from app.db.database import get_db, read_session_factory
+from app.enums.enums import Stream_Format
 from app.services.seller_profile_service import SellerProfileService
 from app.schemas.seller_profile import SellerProfileCreate, SellerProfileRead, SellerProfileUpdate
 from app.authentication.auth_dependency import (
@@ -30,16 +32,22 @@ async def get_seller_profile_service(db: AsyncSession = Depends(get_db)) -> Sell
 
 @router.get("/", response_model= List[SellerProfileRead], status_code= status.HTTP_200_OK)
 async def get_all(
+   request: Request,
    is_active: bool = Query(None, description="For return profiles by active status"),
    is_verified: bool = Query(None, description="For return profiles by verify status"),
+   stream: Optional[Stream_Format] = Query(None, description="ndjson or json, streams the unfiltered list batch by batch"),
    service: SellerProfileService = Depends(get_seller_profile_service),
-   current_user: User = Depends(require_admin)
+   current_user: UserSnapshot = Depends(require_admin)
 ):
    if is_active is not None:
       return await service.get_all_active(is_active)
    elif is_verified is not None:
       return await service.get_all_verified(is_verified)
    
+   if stream:
+      return streaming_list_response(
+         read_session_factory(request), lambda db: SellerProfileService(db).stream_all(), stream
+      )
    return await service.get_all()
 
 
@@ -87,7 +95,7 @@ async def get_by_id(
 async def create(
    profile_data: SellerProfileCreate,
    service: SellerProfileService = Depends(get_seller_profile_service),
-   current_user: User = Depends(require_seller)
+   current_user: UserSnapshot = Depends(require_seller)
 ):
    return await service.create(profile_data)
 
@@ -97,7 +105,7 @@ async def update_by_user_id(
    user_id: UUID,
    update_data: SellerProfileUpdate,
    service: SellerProfileService = Depends(get_seller_profile_service),
-   current_user: User = Depends(get_current_active_user)
+   current_user: UserSnapshot = Depends(get_current_active_user)
 ):
    if current_user.id != user_id and current_user.role != "admin":
       raise HTTPException(403, "Not Authorized")
@@ -109,7 +117,7 @@ async def update(
    seller_id: UUID,
    update_data: SellerProfileUpdate,
    service: SellerProfileService = Depends(get_seller_profile_service),
-   current_user: User = Depends(get_current_active_user)
+   current_user: UserSnapshot = Depends(get_current_active_user)
 ):
    return await service.update(seller_id, update_data)
 
@@ -118,7 +126,7 @@ async def update(
 async def delete_by_user_id(
    user_id: UUID,
    service: SellerProfileService = Depends(get_seller_profile_service),
-   current_user: User = Depends(get_current_active_user)
+   current_user: UserSnapshot = Depends(get_current_active_user)
 ):
    if current_user.id != user_id and current_user.role != "admin":
       raise HTTPException(403, "Not Authorized")
@@ -129,7 +137,7 @@ async def delete_by_user_id(
 async def delete(
    seller_id: UUID,
    service: SellerProfileService = Depends(get_seller_profile_service),
-   current_user: User = Depends(get_current_active_user)
+   current_user: UserSnapshot = Depends(get_current_active_user)
 ):
    return await service.delete(seller_id)
 
@@ -138,7 +146,7 @@ async def delete(
 async def verify_seller(
    seller_id: UUID,
    service: SellerProfileService = Depends(get_seller_profile_service),
-   current_user: User = Depends(require_admin)
+   current_user: UserSnapshot = Depends(require_admin)
 ):
    return await service.verify_seller(seller_id)
 
@@ -147,7 +155,7 @@ async def verify_seller(
 async def activate_seller(
    seller_id: UUID,
    service: SellerProfileService = Depends(get_seller_profile_service),
-   current_user: User = Depends(require_admin)
+   current_user: UserSnapshot = Depends(require_admin)
 ):
    return await service.activate_seller(seller_id)
 
@@ -156,7 +164,7 @@ async def activate_seller(
 async def deactivate_seller(
    seller_id: UUID,
    service: SellerProfileService = Depends(get_seller_profile_service),
-   current_user: User = Depends(require_admin)
+   current_user: UserSnapshot = Depends(require_admin)
 ):
    return await service.deactivate_seller(seller_id)
 
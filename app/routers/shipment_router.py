@@ -5,9 +5,9 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import APIRouter, Depends, HTTPException, status
 
 from app.enums.enums import Province
-from app.models.user import User
+from app.authentication.auth_schema import UserSnapshot
 from app.schemas.shipment import ShipmentCreate, ShipmentRead, ShipmentUpdate
-from app.db.database import get_db
+from app.db.database import get_db, get_read_db
 from app.services.shipment_service import ShipmentService
 from app.authentication.auth_dependency import (
    require_admin,
@@ -26,9 +26,14 @@ async def get_shipment_service(db: AsyncSession = Depends(get_db)) -> ShipmentSe
    return ShipmentService(db)
 
 
+# catalog reads, served by a read replica
+async def get_read_shipment_service(db: AsyncSession = Depends(get_read_db)) -> ShipmentService:
+   return ShipmentService(db)
+
+
 @router.get("/", response_model= List[ShipmentRead], status_code= status.HTTP_200_OK)
 async def get_all(
-   service: ShipmentService = Depends(get_shipment_service)
+   service: ShipmentService = Depends(get_read_shipment_service)
 ):
    return await service.get_all()
 
@@ -36,7 +41,7 @@ async def get_all(
 @router.get("/{shipment_id}", response_model= ShipmentRead, status_code= status.HTTP_200_OK)
 async def get_by_id(
    shipment_id: UUID,
-   service: ShipmentService = Depends(get_shipment_service)
+   service: ShipmentService = Depends(get_read_shipment_service)
 ):
    return await service.get_by_id(shipment_id)
 
@@ -44,7 +49,7 @@ async def get_by_id(
 @router.get("/province/{province}", response_model= ShipmentRead, status_code= status.HTTP_200_OK)
 async def get_by_province(
    province: Province,
-   service: ShipmentService = Depends(get_shipment_service)
+   service: ShipmentService = Depends(get_read_shipment_service)
 ):
    return await service.get_by_province(province)
 
@@ -53,7 +58,7 @@ async def get_by_province(
 async def create_shipment(
    shipment: ShipmentCreate,
    service: ShipmentService = Depends(get_shipment_service),
-   current_user: User = Depends(require_admin)
+   current_user: UserSnapshot = Depends(require_admin)
 ):
    return await service.create(shipment)
 
@@ -63,7 +68,7 @@ async def update_shipment(
    shipment_id: UUID,
    update_data: ShipmentUpdate,
    service: ShipmentService = Depends(get_shipment_service),
-   current_user: User = Depends(require_admin)
+   current_user: UserSnapshot = Depends(require_admin)
 ):
    return await service.update(shipment_id, update_data)
 
@@ -72,7 +77,7 @@ async def update_shipment(
 async def delete_shipment(
    shipment_id: UUID,
    service: ShipmentService = Depends(get_shipment_service),
-   current_user: User = Depends(require_admin)
+   current_user: UserSnapshot = Depends(require_admin)
 ):
    return await service.delete(shipment_id)
 
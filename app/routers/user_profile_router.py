@@ -5,7 +5,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 
 from app.db.database import get_db
-from app.models.user import User
+from app.authentication.auth_schema import UserSnapshot
 from app.services.user_profile_service import UserProfileService
 from app.schemas.user_profile import UserProfileCreate, UserProfileRead, UserProfileUpdate
 from app.authentication.auth_dependency import (
@@ -60,7 +60,7 @@ async def get_by_id(
 async def create(
    profile_data: UserProfileCreate,
    service: UserProfileService = Depends(get_user_profile_service),
-   current_user: User = Depends(require_user)
+   current_user: UserSnapshot = Depends(require_user)
 ):
    return await service.create(profile_data)
 
@@ -70,7 +70,7 @@ async def update_by_user_id(
    user_id: UUID,
    update_data: UserProfileUpdate,
    service: UserProfileService = Depends(get_user_profile_service),
-   current_user: User = Depends(get_current_active_user)
+   current_user: UserSnapshot = Depends(get_current_active_user)
 ):
    if current_user.id != user_id and current_user.role != "admin":
       raise HTTPException(403, "Not Authorized")
@@ -82,7 +82,7 @@ async def update(
    profile_id: UUID,
    update_data: UserProfileUpdate,
    service: UserProfileService = Depends(get_user_profile_service),
-   current_user: User = Depends(get_current_active_user)
+   current_user: UserSnapshot = Depends(get_current_active_user)
 ):
    return await service.update(profile_id, update_data)
 
@@ -91,7 +91,7 @@ async def update(
 async def delete_by_user_id(
    user_id: UUID,
    service: UserProfileService = Depends(get_user_profile_service),
-   current_user: User = Depends(get_current_active_user)
+   current_user: UserSnapshot = Depends(get_current_active_user)
 ):
    if current_user.id != user_id and current_user.role != "admin":
       raise HTTPException(403, "Not Authorized")
@@ -102,7 +102,7 @@ async def delete_by_user_id(
 async def delete(
    profile_id: UUID,
    service: UserProfileService = Depends(get_user_profile_service),
-   current_user: User = Depends(get_current_active_user)
+   current_user: UserSnapshot = Depends(get_current_active_user)
 ):
    return await service.delete(profile_id)
 
@@ -1,15 +1,17 @@
 
-from typing import List
+from typing import List, Optional
 from uuid import UUID
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import EmailStr
 from pydantic_extra_types.phone_numbers import PhoneNumber
 
-from app.models.user import User
+from app.authentication.auth_schema import UserSnapshot
 PhoneNumber.phone_format = 'E164'
 
-from app.db.database import get_db
+from app.core.streaming import streaming_list_response
+from app.db.database import get_db, read_session_factory
+from app.enums.enums import Stream_Format
 from app.services.user_service import UserService
 from app.schemas.user import UserCreate, UserRead, UserUpdate
 from app.authentication.auth_dependency import (
@@ -32,9 +34,13 @@ async def get_user_service(db: AsyncSession = Depends(get_db)) -> UserService:
 
 @router.get("/", response_model= List[UserRead], status_code= status.HTTP_200_OK)
 async def get_all(
+   request: Request,
+   stream: Optional[Stream_Format] = Query(None, description="ndjson or json, streams the list batch by batch"),
    service: UserService = Depends(get_user_service),
-   current_user: User = Depends(require_admin)
+   current_user: UserSnapshot = Depends(require_admin)
 ):
+   if stream:
+      return streaming_list_response(read_session_factory(request), lambda db: UserService(db).stream_all(), stream)
    return await service.get_all()
 
 
@@ -84,7 +90,7 @@ async def update(
    user_id: UUID,
    update_data: UserUpdate,
    service: UserService = Depends(get_user_service),
-   current_user: User = Depends(get_current_active_user)
+   current_user: UserSnapshot = Depends(get_current_active_user)
 ):
    if current_user.id != user_id and current_user.role != "admin":
       raise HTTPException(403, "Not Authorized")
@@ -95,7 +101,7 @@ async def update(
 async def delete(
    user_id: UUID,
    service: UserService = Depends(get_user_service),
-   current_user: User = Depends(get_current_active_user)
+   current_user: UserSnapshot = Depends(get_current_active_user)
 ):
    if current_user.id != user_id and current_user.role != "admin":
       raise HTTPException(403, "Not Authorized")
@@ -4,24 +4,24 @@ from .cart import CartCreate, CartRead, CartWithItems
 from .category_discount import CategoryDiscountCreate, CategoryDiscountUpdate, CategoryDiscountRead
 from .category import CategoryCreate, CategoryRead, CategoryUpdate, CategoryWithProducts
 from .coupon_usage import CouponUsageCreate, CouponUsageRead
-from .coupon import CouponCreate, CouponRead, CouponUpdate, CouponSetStatus
+from .coupon import CouponCreate, CouponRead, CouponUpdate, CouponSetStatus, CouponSnapshot
 from .order_item import OrderItemCreate, OrderItemRead, OrderItemUpdate
-from .order import OrderCreate, OrderRead, OrderUpdate, OrderWithItems
+from .order import OrderCreate, OrderRead, OrderUpdate, OrderWithItems, OrderPage
 from .product_discount import ProductDiscountCreate, ProductDiscountRead, ProductDiscountUpdate
 from .product_review import ProductReviewCreate, ProductReviewRead, ProductReviewUpdate
-from .product import ProductCreate, ProductRead, ProductUpdate
+from .product import ProductCreate, ProductRead, ProductUpdate, ProductPage, ProductImportRow, ProductImportResult
 from .seller_profile import SellerProfileCreate, SellerProfileRead, SellerProfileUpdate
 from .shipment_discount import ShipmentDiscountCreate, ShipmentDiscountRead, ShipmentDiscountUpdate
 from .shipment import ShipmentCreate, ShipmentRead, ShipmentUpdate
 from .user_profile import UserProfileCreate, UserProfileRead, UserProfileUpdate
 from .user import UserCreate, UserRead, UserUpdate
-from .image import ImageCreate, ImageRead, ImageUpdate
-from .base_schema import BaseSchemaConfig, BaseSchema
+from .image import ImageCreate, ImageRead, ImageUpdate, ImageVariantRead
+from .base_schema import BaseSchemaConfig, BaseSchema, CursorPage
 
 # Exported schemas for easy importing
 __all__ = [
     # Base
-    "BaseSchemaConfig", "BaseSchema"
+    "BaseSchemaConfig", "BaseSchema", "CursorPage",
     # User
     "UserCreate", "UserUpdate", "UserRead",
     "UserProfileCreate", "UserProfileUpdate", "UserProfileRead", # type: ignore
@@ -36,7 +36,7 @@ __all__ = [
     "CategoryCreate", "CategoryUpdate", "CategoryRead", "CategoryWithProducts", "CategoryDiscountCreate", "CategoryDiscountUpdate", "CategoryDiscountRead",
     
     # Product
-    "ProductCreate", "ProductUpdate", "ProductRead",
+    "ProductCreate", "ProductUpdate", "ProductRead", "ProductPage", "ProductImportRow", "ProductImportResult",
     "ProductDiscountCreate", "ProductDiscountUpdate", "ProductDiscountRead",
     "ProductReviewCreate", "ProductReviewUpdate", "ProductReviewRead",
     
@@ -45,11 +45,11 @@ __all__ = [
     "CartItemCreate", "CartItemUpdate", "CartItemRead",
     
     # Order
-    "OrderCreate", "OrderUpdate", "OrderRead", "OrderWithItems",
+    "OrderCreate", "OrderUpdate", "OrderRead", "OrderWithItems", "OrderPage",
     "OrderItemCreate", "OrderItemUpdate", "OrderItemRead",
     
     # Coupon
-    "CouponCreate", "CouponUpdate", "CouponRead",
+    "CouponCreate", "CouponUpdate", "CouponRead", "CouponSnapshot",
     "CouponUsageCreate", "CouponUsageRead",
     "CouponSetStatus"
     
@@ -58,5 +58,5 @@ __all__ = [
     "ShipmentDiscountCreate", "ShipmentDiscountUpdate", "ShipmentDiscountRead",
 
     # Image
-    "ImageCreate", "ImageRead", "ImageUpdate"
+    "ImageCreate", "ImageRead", "ImageUpdate", "ImageVariantRead"
 ]
\ No newline at end of file
@@ -1,28 +1,39 @@
 from datetime import datetime
-from typing import Optional
+from typing import Annotated, Generic, List, Optional, TypeVar
 from uuid import UUID
 from xml.dom.minidom import Entity
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, PlainSerializer
 from decimal import Decimal
 
 from app.enums.enums import Discount_Model_Type
 from app.models import discount_base
 
+def _money_to_json(value: Decimal) -> float:
+    return float(round(value, 2))
+
+
+# Decimal that is written to JSON as a number rounded to cents, python dumps keep the Decimal.
+# Declared on the type so pydantic_core serializes it without the deprecated json_encoders
+Money = Annotated[Decimal, PlainSerializer(_money_to_json, return_type=float, when_used="json")]
+
+
 class BaseSchemaConfig(BaseModel):
-    class Config:
-        from_attributes = True
-        arbitrary_types_allowed = True
-        json_encoders = {
-            Decimal: lambda x: float(round(x, 2)),
-        }
+    model_config = ConfigDict(from_attributes=True, arbitrary_types_allowed=True)
 
 
 
+T = TypeVar("T")
+
+
 class BaseSchema(BaseSchemaConfig):
     id: UUID
     created_at: datetime
     updated_at: datetime
 
+class CursorPage(BaseSchemaConfig, Generic[T]):
+    items: List[T]
+    next_cursor: Optional[str] = None
+
 class DiscountBase(BaseSchemaConfig):
     discount_type: Discount_Model_Type
     entity_id: UUID
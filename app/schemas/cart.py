@@ -3,7 +3,7 @@ from datetime import datetime
 from decimal import Decimal
 from typing import List, Optional
 from uuid import UUID
-from .base_schema import BaseSchemaConfig, BaseSchema
+from .base_schema import BaseSchemaConfig, BaseSchema, Money
 from pydantic import computed_field
 
 
@@ -16,13 +16,13 @@ class CartCreate(CartBase):
 
 
 class CartRead(CartBase, BaseSchema):
-   total: Optional[Decimal] = None
+   total: Optional[Money] = None
    coupon_id: Optional[UUID] = None
-   coupon_amount: Optional[Decimal]  = None
+   coupon_amount: Optional[Money]  = None
 
    @computed_field
    @property
-   def final_total(self) -> Decimal:
+   def final_total(self) -> Money:
       base_total = self.total or Decimal('0.00')
       discount = self.coupon_amount or Decimal('0.00')
       return base_total - discount
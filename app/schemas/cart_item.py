@@ -6,7 +6,7 @@ from uuid import UUID
 from pydantic import Field, computed_field
 
 from app.schemas.product import ProductRead
-from .base_schema import BaseSchemaConfig, BaseSchema
+from .base_schema import BaseSchemaConfig, BaseSchema, Money
 
 
 class CartItemBase(BaseSchemaConfig):
@@ -23,11 +23,11 @@ class CartItemUpdate(BaseSchemaConfig):
 
 class CartItemRead(CartItemBase, BaseSchema):
    cart_id: UUID
-   unit_price: Decimal = Field(ge=0, description="Unit price must be non-negative")
+   unit_price: Money = Field(ge=0, description="Unit price must be non-negative")
 
    @computed_field
    @property
-   def total(self) -> Decimal:
+   def total(self) -> Money:
       return self.unit_price * self.quantity
 
 
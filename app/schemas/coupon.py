@@ -4,14 +4,14 @@ from decimal import Decimal
 from typing import Optional
 from uuid import UUID
 
-from pydantic import Field, field_validator, model_validator
-from .base_schema import BaseSchemaConfig, BaseSchema
+from pydantic import BaseModel, ConfigDict, Field, field_validator, model_validator
+from .base_schema import BaseSchemaConfig, BaseSchema, Money
 
 
 
 class CouponBase(BaseSchemaConfig):
    discount_amount: int = Field(gt=0, lt=101)
-   min_order_amount: Decimal
+   min_order_amount: Money
    max_uses: int
    start_at: datetime
    end_at: datetime
@@ -42,7 +42,7 @@ class CouponCreate(CouponBase):
 
 class CouponUpdate(BaseSchemaConfig):
    discount_amount: Optional[int] = Field(None, gt=0, lt=101)
-   min_order_amount: Optional[Decimal] = None
+   min_order_amount: Optional[Money] = None
    max_uses: Optional[int] = None
    start_at: Optional[datetime] = None
    end_at: Optional[datetime] = None
@@ -80,5 +80,20 @@ class CouponRead(CouponBase, BaseSchema):
    is_currently_active: bool
 
 
+class CouponSnapshot(BaseModel):
+   """What validating a coupon needs, cached per code. Never the usage rows"""
+   model_config = ConfigDict(frozen=True)
 
+   id: UUID
+   code: UUID
+   discount_amount: int
+   min_order_amount: Decimal
+   start_at: datetime
+   end_at: datetime
+   is_active: bool
+   remaining_uses: int
 
+   @property
+   def is_currently_active(self) -> bool:
+      # the window is part of the snapshot, a start or end does not need an invalidation
+      return self.is_active and self.remaining_uses > 0 and self.start_at <= datetime.now() <= self.end_at
@@ -1,7 +1,7 @@
 
 
 
-from typing import Optional
+from typing import Dict, Optional
 from uuid import UUID
 from pydantic import Field, computed_field
 from app.schemas.base_schema import BaseSchema, BaseSchemaConfig
@@ -25,7 +25,22 @@ class ImageCreate(ImageBase):
 class ImageUpdate(BaseSchemaConfig):
    pass
 
+class ImageVariantRead(BaseSchemaConfig):
+   file_name: str
+   width: int
+   height: int
+   file_size: int = Field(ge=0, description="File size in bytes")
+   mime_type: str
+
+   @computed_field
+   @property
+   def file_path(self) -> str:
+      return (MAIN_URL + "/" + UPLOAD_DIRECTORY + "/" + self.file_name)
+
+
 class ImageRead(ImageBase, BaseSchema):
+   variants: Dict[str, ImageVariantRead] = {}
+
    @computed_field 
    @property
    def file_path(self) -> str:
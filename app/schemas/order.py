@@ -4,7 +4,7 @@ from decimal import Decimal
 from typing import List, Optional
 from uuid import UUID
 from app.enums.enums import Order_Status
-from .base_schema import BaseSchemaConfig, BaseSchema
+from .base_schema import BaseSchemaConfig, BaseSchema, CursorPage, Money
 
 
 
@@ -37,10 +37,10 @@ class OrderRead(OrderBase, BaseSchema):
     user_profile_id: UUID
     order_number: str
     coupon_id: Optional[UUID] = None
-    coupon_amount: Optional[Decimal] = None
-    sub_total: Decimal
-    shipping_cost: Decimal
-    total: Decimal
+    coupon_amount: Optional[Money] = None
+    sub_total: Money
+    shipping_cost: Money
+    total: Money
     status: Order_Status
 
 
@@ -48,6 +48,10 @@ class OrderWithItems(OrderRead):
     order_items: List["OrderItemRead"] = []
 
 
+class OrderPage(CursorPage[OrderRead]):
+    pass
+
+
 try:
     from .order_item import OrderItemRead
     OrderRead.model_rebuild()
@@ -4,7 +4,7 @@ from decimal import Decimal
 from typing import Optional
 
 from pydantic import Field
-from .base_schema import BaseSchemaConfig, BaseSchema
+from .base_schema import BaseSchemaConfig, BaseSchema, Money
 from uuid import UUID
 
 
@@ -22,6 +22,6 @@ class OrderItemUpdate(BaseSchemaConfig):
 
 class OrderItemRead(OrderItemBase, BaseSchema):
    order_id: UUID
-   unit_price: Decimal
-   sub_total: Decimal
+   unit_price: Money
+   sub_total: Money
 
@@ -2,16 +2,16 @@ from __future__ import annotations
 from datetime import datetime
 from decimal import Decimal
 from typing import List, Optional
-from pydantic import Field, computed_field
+from pydantic import Field, computed_field, field_validator
 
-from .base_schema import BaseSchemaConfig, BaseSchema
+from .base_schema import BaseSchemaConfig, BaseSchema, CursorPage, Money
 from uuid import UUID
 
 
 
 class ProductBase(BaseSchemaConfig):
    name: str
-   price: Decimal = Field(gt=0.00)
+   price: Money = Field(gt=0.00)
    stock_quantity: int = Field(default=0, ge=0)
    description: str
 
@@ -21,7 +21,7 @@ class ProductCreate(ProductBase):
 
 class ProductUpdate(BaseSchemaConfig):
    name: Optional[str] = None
-   price: Optional[Decimal] = Field(None, gt=0.00)
+   price: Optional[Money] = Field(None, gt=0.00)
    stock_quantity: Optional[int] = Field(None, ge=0)
    description: Optional[str] = None
    category_ids: Optional[List[UUID]] = None
@@ -30,6 +30,8 @@ class ProductUpdate(BaseSchemaConfig):
 
 class ProductRead(ProductBase, BaseSchema):
    seller_profile_id: UUID
+   # price less the best running product or category discount, read from product_prices
+   effective_price: Optional[Money] = None
    images: List["ImageRead"] = []
 
    @computed_field
@@ -44,6 +46,34 @@ class ProductRead(ProductBase, BaseSchema):
 class ProductWithCategories(ProductRead):
    categories: List[CategoryRead] = []
 
+
+class ProductPage(CursorPage[ProductRead]):
+   pass
+
+
+class ProductImportRow(ProductBase):
+   # category ids or names, a CSV cell separates them with "|"
+   categories: List[str] = []
+
+   @field_validator('categories', mode='before')
+   @classmethod
+   def split_categories(cls, value):
+      if isinstance(value, str):
+         return [ref.strip() for ref in value.split("|") if ref.strip()]
+      return value
+
+
+class ProductImportError(BaseSchemaConfig):
+   row: int
+   detail: str
+
+
+class ProductImportResult(BaseSchemaConfig):
+   created: int = 0
+   updated: int = 0
+   failed: int = 0
+   errors: List[ProductImportError] = []
+
       
 try:
    from app.schemas.category import CategoryRead
@@ -3,7 +3,7 @@ from decimal import Decimal
 from typing import Optional
 
 from pydantic import Field
-from .base_schema import BaseSchemaConfig, BaseSchema
+from .base_schema import BaseSchemaConfig, BaseSchema, Money
 from uuid import UUID
 from app.enums.enums import Province
 
@@ -11,7 +11,7 @@ from app.enums.enums import Province
 
 class ShipmentBase(BaseSchemaConfig):
    province: Province
-   cost: Decimal = Field(ge=0.00, le=25000.00)
+   cost: Money = Field(ge=0.00, le=25000.00)
    
 
 class ShipmentCreate(ShipmentBase):
@@ -20,7 +20,7 @@ class ShipmentCreate(ShipmentBase):
 
 class ShipmentUpdate(BaseSchemaConfig):
    province: Optional[Province] = None
-   cost: Optional[Decimal] = Field(None, ge=0.00, le=25000.00)
+   cost: Optional[Money] = Field(None, ge=0.00, le=25000.00)
 
 
 class ShipmentRead(ShipmentBase, BaseSchema):
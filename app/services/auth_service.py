@@ -12,7 +12,7 @@ from app.authentication.auth_schema import (
     ChangePasswordRequest, AuthResponse, Token, UserRole
 )
 from app.authentication.auth_configuration import (
-    verify_password, get_password_hash, create_tokens,
+    hash_password, verify_and_update_password, create_tokens,
     decode_token, create_access_token, create_refresh_token
 )
 
@@ -46,7 +46,7 @@ class AuthService:
             email=register_data.email,
             full_name=register_data.full_name,
             phone_number=register_data.phone_number,
-            password_hash=get_password_hash(register_data.password),
+            password_hash=await hash_password(register_data.password),
             role=register_data.role
         )
         
@@ -88,12 +88,18 @@ class AuthService:
             )
         
         # Verify password
-        if not verify_password(login_data.password, user.password_hash):
+        valid, new_hash = await verify_and_update_password(login_data.password, user.password_hash)
+        if not valid:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid email or password"
             )
         
+        # Rehash with the current cost
+        if new_hash:
+            user.password_hash = new_hash
+            await self.repository.update_user(user)
+        
         # Check if user is active
         if not user.is_active:
             raise HTTPException(
@@ -125,7 +131,7 @@ class AuthService:
     
 
     async def refresh_token(self, refresh_data: RefreshTokenRequest) -> Token:
-        """Refresh access token using refresh token."""
+        """Rotate a refresh token, the presented token can not be used again."""
         # Decode refresh token
         payload = decode_token(refresh_data.refresh_token)
         
@@ -135,16 +141,38 @@ class AuthService:
                 detail="Invalid refresh token"
             )
         
-        # Get user from refresh token
-        user = await self.repository.get_user_by_refresh_token(refresh_data.refresh_token)
+        # Look the token up by its digest
+        stored_token = await self.repository.get_refresh_token(refresh_data.refresh_token)
         
-        if not user:
+        if not stored_token or str(stored_token.user_id) != payload.get("sub"):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid refresh token"
+            )
+        
+        # A rotated token presented again means it leaked, end that device session
+        if stored_token.revoked_at is not None:
+            await self.repository.revoke_refresh_token_family(stored_token.family_id)
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid refresh token"
             )
         
+        if stored_token.expires_at <= datetime.utcnow():
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Refresh token expired"
+            )
+        
         # Check if user is active
+        user = await self.repository.get_user_snapshot(stored_token.user_id)
+        
+        if not user:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid refresh token"
+            )
+        
         if not user.is_active:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
@@ -154,15 +182,17 @@ class AuthService:
         # Generate new tokens
         tokens = create_tokens(
             user_id=str(user.id),
-            email=user.email,
+            email=payload.get("email", ""),
             role=user.role.value
         )
         
-        # Save new refresh token
-        await self.repository.save_refresh_token(
-            user.id,
-            tokens["refresh_token"]
-        )
+        # Replace the refresh token within its family
+        if not await self.repository.rotate_refresh_token(stored_token, tokens["refresh_token"]):
+            await self.repository.revoke_refresh_token_family(stored_token.family_id)
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid refresh token"
+            )
         
         return Token(
             access_token=tokens["access_token"],
@@ -170,8 +200,17 @@ class AuthService:
         )
     
 
-    async def logout(self, user_id: UUID) -> bool:
-        """Logout user by revoking refresh token."""
+    async def logout(self, user_id: UUID, refresh_token: Optional[str] = None) -> bool:
+        """Logout the device the refresh token belongs to, or every device when none is given."""
+        if refresh_token:
+            stored_token = await self.repository.get_refresh_token(refresh_token)
+            if not stored_token or stored_token.user_id != user_id:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Invalid refresh token"
+                )
+            return await self.repository.revoke_refresh_token_family(stored_token.family_id)
+        
         return await self.repository.revoke_refresh_token(user_id)
     
 
@@ -187,17 +226,18 @@ class AuthService:
             )
         
         # Verify old password
-        if not verify_password(change_data.old_password, user.password_hash):
+        valid, _ = await verify_and_update_password(change_data.old_password, user.password_hash)
+        if not valid:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid old password"
             )
         
         # Update password
-        user.password_hash = get_password_hash(change_data.new_password)
+        user.password_hash = await hash_password(change_data.new_password)
         await self.repository.update_user(user)
         
-        # Revoke refresh token to force re-login
+        # Revoke refresh tokens on every device to force re-login
         await self.repository.revoke_refresh_token(user_id)
         
         return True
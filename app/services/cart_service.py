@@ -1,8 +1,9 @@
 from datetime import datetime
 from decimal import Decimal
-from typing import List, Optional
+from typing import List, NoReturn, Optional
 from uuid import UUID
 from fastapi import HTTPException, status
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.cart import Cart
@@ -12,6 +13,7 @@ from app.schemas.cart import CartCreate, CartRead, CartWithItems
 from app.schemas.cart_item import CartItemCreate, CartItemRead, CartItemUpdate, CartItemWithProduct
 from app.repositories.cart_repository import CartRepository
 from app.repositories.product_repository import ProductRepository
+from app.repositories.load_plans import BARE
 
 
 class CartService:
@@ -83,77 +85,65 @@ class CartService:
 
 
    async def add_cart_item(self, cart_id: UUID, cart_item_data: CartItemCreate) -> CartItemRead:
-      cart = await self.repository.get_cart_by_id(cart_id)
-      if not cart:
+      product = await self.product_repository.get_by_id(cart_item_data.product_id, BARE)
+      if not product:
          raise HTTPException(
             status_code= status.HTTP_400_BAD_REQUEST,
-            detail= "Cart not found"
+            detail="Product not found"
          )
       
-      product = await self.product_repository.get_by_id(cart_item_data.product_id)
-      if not product:
+      # early reject, the reservation below is what actually holds the stock
+      await self.__validate_cart_item(cart_item_data.quantity, product.stock_quantity)
+
+      # Product already in the cart increases its quantity, a new one creates the line
+      try:
+         cart_item = await self.repository.upsert_cart_item(
+            cart_id= cart_id,
+            product_id= cart_item_data.product_id,
+            quantity= cart_item_data.quantity,
+            unit_price= product.price
+         )
+      except IntegrityError:
+         # the cart foreign key, checked by postgres instead of loading the cart first
+         await self.db.rollback()
          raise HTTPException(
             status_code= status.HTTP_400_BAD_REQUEST,
-            detail="Product not found"
+            detail= "Cart not found"
          )
-      
-      
-      existing_cart_item = await self.repository.get_cart_item_by_product(cart_id, cart_item_data.product_id)
-
-
-      # Product exists - increase quantity
-      if existing_cart_item:
-         new_quantity = existing_cart_item.quantity + cart_item_data.quantity
 
-         await self.__validate_cart_item(new_quantity, product.stock_quantity)
+      if cart_item is None:
+         existing_cart_item = await self.repository.get_cart_item_by_product(cart_id, cart_item_data.product_id)
+         existing_quantity = existing_cart_item.quantity if existing_cart_item else 0
+         await self.__reservation_failed(cart_id, cart_item_data.product_id, existing_quantity + cart_item_data.quantity)
 
-         existing_cart_item.quantity = new_quantity
-         existing_cart_item.total
-         existing_cart_item.updated_at = datetime.utcnow()
+      return CartItemRead.model_validate(cart_item)
 
-         updated_cart_item = await self.repository.update_cart_item(existing_cart_item)
 
-         return CartItemRead.model_validate(updated_cart_item)
-      
-
-      # Product doesn't exist - create new cart item
-      else:
-         await self.__validate_cart_item(cart_item_data.quantity, product.stock_quantity)
-      
-      cart_item = CartItem(
-         cart_id= cart_id,
-         product_id = product.id,
-         quantity= cart_item_data.quantity,
-         unit_price= product.price
+   async def __reservation_failed(self, cart_id: UUID, product_id: UUID, quantity: int) -> NoReturn:
+      """ failure path of a reservation, a line can have the free stock plus what it already holds """
+      product = await self.product_repository.get_by_id(product_id, BARE)
+      held = await self.repository.reservation_repository.get_held_quantity(cart_id, product_id)
+      await self.__validate_cart_item(quantity, (product.stock_quantity if product else 0) + held)
+      # another cart gave stock back since the reservation failed, the line was still not written
+      raise HTTPException(
+         status_code= status.HTTP_409_CONFLICT,
+         detail= "Not enough stock, retry"
       )
 
-      created_cart_item = await self.repository.add_cart_item(cart_item)
-
-      return CartItemRead.model_validate(created_cart_item)
-
 
    async def update_cart_item(self, cart_item_id: UUID, update_data: CartItemUpdate) -> CartItemRead:
-      cart_item = await self.repository.get_cart_item_by_id(cart_item_id)
-      if not cart_item:
-         raise HTTPException(
-            status_code= status.HTTP_400_BAD_REQUEST,
-            detail= "Cart item not found"
-         )
-      
-      product = await self.product_repository.get_by_id(cart_item.product_id)
-      if not product:
-         raise HTTPException(
-            status_code= status.HTTP_400_BAD_REQUEST,
-            detail="Product not found"
-         )
-      
-      await self.__validate_cart_item(update_data.quantity, product.stock_quantity)
-      
-      cart_item.quantity = update_data.quantity
-      cart_item.updated_at = datetime.utcnow()
-
-      updated_cart_item = await self.repository.update_cart_item(cart_item)
-      return CartItemRead.model_validate(updated_cart_item)
+      cart_item = await self.repository.set_cart_item_quantity(cart_item_id, update_data.quantity)
+      if cart_item is None:
+         # only the failure path looks up why
+         existing_cart_item = await self.repository.get_cart_item_by_id(cart_item_id)
+         if not existing_cart_item:
+            raise HTTPException(
+               status_code= status.HTTP_400_BAD_REQUEST,
+               detail= "Cart item not found"
+            )
+         await self.__reservation_failed(existing_cart_item.cart_id, existing_cart_item.product_id, update_data.quantity)
+
+      return CartItemRead.model_validate(cart_item)
       
       
    async def remove_cart_item(self, cart_item_id: UUID) -> bool:
@@ -177,7 +167,8 @@ class CartService:
 
 
    async def apply_coupon_to_cart(self, cart_id: UUID, coupon_code: UUID) -> CartRead:
-      coupon = await self.coupon_repository.get_by_code(coupon_code)
+      # a cached snapshot, the use itself is counted atomically at checkout
+      coupon = await self.coupon_repository.get_snapshot_by_code(coupon_code)
       if not coupon or coupon.is_currently_active == False:
          raise HTTPException(
             status_code= status.HTTP_400_BAD_REQUEST,
@@ -3,10 +3,12 @@ from datetime import datetime
 from typing import Optional, List
 from uuid import UUID
 from fastapi import HTTPException, status
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import select, func
 
 
+from app.enums.enums import Search_Algorithm
 from app.models.category import Category
 from app.repositories.category_repository import CategoryRepository
 from app.schemas.category import CategoryCreate, CategoryRead, CategoryUpdate, CategoryWithProducts
@@ -60,7 +62,7 @@ class CategoryService:
       return CategoryRead.model_validate(category)
 
 
-   async def search_categories(self, search_text: str, use_full_text: bool=False) -> List[CategoryRead]:
+   async def search_categories(self, search_text: str, algorithm: Search_Algorithm = Search_Algorithm.ILIKE) -> List[CategoryRead]:
       if not search_text.strip():
          raise HTTPException(
             status_code= status.HTTP_400_BAD_REQUEST,
@@ -69,11 +71,20 @@ class CategoryService:
       
       search_text = search_text.strip()
 
-      if use_full_text:
+      if algorithm == Search_Algorithm.FULL_TEXT:
          try:
             categories = await self.repository.full_text_search(search_text)
-         except:
+         except DBAPIError:
             # Fallback to ILIKE search if full-text search fails
+            await self.db.rollback()
+            categories = await self.repository.search(search_text)
+
+      elif algorithm == Search_Algorithm.TRIGRAM:
+         try:
+            categories = await self.repository.trigram_search(search_text)
+         except DBAPIError:
+            # Fallback to ILIKE search if pg_trgm is not available
+            await self.db.rollback()
             categories = await self.repository.search(search_text)
 
       else:
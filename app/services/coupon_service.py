@@ -1,6 +1,6 @@
 
 from tkinter.tix import STATUS
-from typing import List, Optional
+from typing import AsyncIterator, List, Optional
 from uuid import UUID
 from fastapi import HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -53,6 +53,11 @@ class CouponService:
       return [CouponUsageRead.model_validate(usage) for usage in usages]
 
 
+   async def stream_all_coupon_usages(self) -> AsyncIterator[List[CouponUsageRead]]:
+      async for usages in self.repository.stream_coupon_usages():
+         yield [CouponUsageRead.model_validate(usage) for usage in usages]
+
+
    async def get_coupon_usages_by_coupon_id(self, id: UUID) -> List[CouponUsageRead]:
       usages = await self.repository.get_coupon_usages_by_coupon_id(id)
       return [CouponUsageRead.model_validate(usage) for usage in usages]
@@ -1,20 +1,22 @@
+import asyncio
+import hashlib
 import os
 from re import A
 import re
-from typing import List
+from typing import Any, Dict, List, Optional, Tuple
 from uuid import UUID
 import uuid
+import anyio
 from fastapi import HTTPException, status, UploadFile
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.constants import ALLOWED_MIME_TYPES, MAIN_URL, UPLOAD_DIRECTORY, MAX_FILE_SIZE, MAX_IMAGES_PER_PRODUCT, ALLOWED_ENTITES
+from app.core.constants import ALLOWED_MIME_TYPES, MAIN_URL, UPLOAD_DIRECTORY, MAX_FILE_SIZE, MAX_IMAGES_PER_PRODUCT, ALLOWED_ENTITES, UPLOAD_CHUNK_SIZE
+from app.core.image_variants import generate_variants, variant_paths
 from app.models.image import Image
 from app.repositories.image_repository import ImageRepository
 from app.schemas.image import ImageCreate, ImageRead
 
 
-DIRECTORY = MAIN_URL + UPLOAD_DIRECTORY
-
 class ImageService:
    def __init__(self, db: AsyncSession) -> None:
       self.db = db
@@ -30,11 +32,9 @@ class ImageService:
 
 
    def _validate_image_file(self, file: UploadFile) -> None:
+      # early reject on the declared size, the real size is enforced while streaming
       if file.size and file.size > self.max_file_size:
-         raise HTTPException(
-                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-                detail=f"File size too large. Maximum allowed: {self.max_file_size / (1024*1024):.1f}MB"
-            )
+         raise self.__file_too_large()
       if file.content_type not in self.allowed_mime_types:
          raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -42,6 +42,75 @@ class ImageService:
             )
 
 
+   def __file_too_large(self) -> HTTPException:
+      return HTTPException(
+         status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+         detail=f"File size too large. Maximum allowed: {self.max_file_size / (1024*1024):.1f}MB"
+      )
+
+
+   async def __stream_to_disk(self, file: UploadFile, file_path: str) -> Tuple[int, str]:
+      """ copy the upload in chunks, file io runs on worker threads, returns the size written and its sha256 """
+      size = 0
+      digest = hashlib.sha256()
+      try:
+         async with await anyio.open_file(file_path, "wb") as buffer:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+               size += len(chunk)
+               # the declared size can not be trusted, so the limit is checked on what arrives
+               if size > self.max_file_size:
+                  raise self.__file_too_large()
+               digest.update(chunk)
+               await buffer.write(chunk)
+      except BaseException:
+         await self.__remove_files([file_path])
+         raise
+      return size, digest.hexdigest()
+
+
+   def __temp_path(self) -> str:
+      # uploads land here first, the name only becomes known once all bytes are hashed
+      return os.path.join(self.upload_directory, f".{uuid.uuid4().hex}.part").replace("\\", "/")
+
+
+   def __stored_paths(self, file_name: str, variants: Dict[str, Dict[str, Any]]) -> List[str]:
+      file_paths = [os.path.join(self.upload_directory, file_name).replace("\\", "/")]
+      return file_paths + variant_paths(self.upload_directory, variants)
+
+
+   async def __place(self, temp_path: str, content_hash: str, original_file_name: Optional[str]) -> str:
+      """ move a hashed upload to its content addressed name, the content lock must be held """
+      file_extension = (os.path.splitext(original_file_name or "")[1] or ".png").lower()
+      file_name = f"{content_hash}{file_extension}"
+      # a leftover file of the same content is simply replaced, the bytes are identical
+      await anyio.Path(temp_path).replace(os.path.join(self.upload_directory, file_name))
+      return file_name
+
+
+   async def __release_files(self, content_hash: Optional[str], file_paths: List[str]) -> None:
+      """ remove stored files once no image row references their content any more """
+      if content_hash is None:
+         # stored before content addressing, the file belonged to that row alone
+         await self.__remove_files(file_paths)
+         return
+      try:
+         # under the content lock an upload either already committed its reference or
+         # has not looked for one yet, and then writes the file again
+         await self.repository.lock_content_hashes([content_hash])
+         if await self.repository.count_by_content_hash(content_hash) == 0:
+            await self.__remove_files(file_paths)
+      finally:
+         await self.db.commit()
+
+
+   async def __remove_files(self, file_paths: List[str]) -> None:
+      for file_path in file_paths:
+         try:
+            await anyio.Path(file_path).unlink(missing_ok=True)
+         except OSError:
+            pass
+
+
    async def get_image_by_id(self, image_id: UUID) -> ImageRead:
       image = await self.repository.get_by_id(image_id)
       if not image:
@@ -86,29 +155,52 @@ class ImageService:
             detail= f"{entity_type} Not found"
          )
        
-      uploaded_imaegs = []
-
-      for i, file in enumerate(files):
-         # Validate file
+      # Validate every file before anything is written
+      for file in files:
          self._validate_image_file(file)
 
-         # Generate unique filename
-         file_extension = os.path.splitext(file.filename)[1] or ".png" # type: ignore
-         unique_file_name = f"{uuid.uuid4().hex}{file_extension}"
-         file_path = os.path.join(self.upload_directory, unique_file_name).replace("\\", "/")
-
-         # Save file
-         try:
-            with open(file_path, "wb") as buffer:
-               content = await file.read()
-               buffer.write(content)
+      staged: List[Tuple[UploadFile, str, str, int]] = []
+      temp_paths: List[str] = []
+      # content hash -> (file name, variants) of the stored file every row with that content shares
+      stored: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+      placed: Dict[str, str] = {}
 
-            # Create image record
+      try:
+         for file in files:
+            temp_path = self.__temp_path()
+            file_size, content_hash = await self.__stream_to_disk(file, temp_path)
+            temp_paths.append(temp_path)
+            staged.append((file, temp_path, content_hash, file_size))
+
+         await self.repository.lock_content_hashes(content_hash for _, _, content_hash, _ in staged)
+
+         # Same content as an existing image reuses its file and variants, anything new is moved in place
+         for file, temp_path, content_hash, _ in staged:
+            if content_hash in stored or content_hash in placed:
+               continue
+            existing = await self.repository.get_by_content_hash(content_hash)
+            if existing:
+               stored[content_hash] = (existing.file_name, existing.variants)
+            else:
+               placed[content_hash] = await self.__place(temp_path, content_hash, file.filename)
+
+         # Resized webp variants of new content, made concurrently on the variant worker pool
+         all_variants = await asyncio.gather(*[
+            generate_variants(self.upload_directory, file_name) for file_name in placed.values()
+         ])
+         for (content_hash, file_name), variants in zip(placed.items(), all_variants):
+            stored[content_hash] = (file_name, variants)
+
+         images: List[Image] = []
+         for file, _, content_hash, file_size in staged:
+            file_name, variants = stored[content_hash]
             image_data = Image(
-               file_name= unique_file_name,
+               file_name= file_name,
                original_file_name= file.filename or "unknown",
-               file_size= len(content),
-               mime_type= file.content_type or "image/png" ## default one
+               file_size= file_size,
+               mime_type= file.content_type or "image/png", ## default one
+               content_hash= content_hash,
+               variants= variants
             )
 
             # Set entity relationship
@@ -120,21 +212,28 @@ class ImageService:
                image_data.user_profile_id = entity_id
             elif entity_type == "seller_profile":
                image_data.seller_profile_id = entity_id
-            
-            # Save to database
-            image = await self.repository.create(image_data)
-            uploaded_imaegs.append(ImageRead.model_validate(image))
-
-         except Exception as e:
-            # Clean up file if database save fails
-            if os.path.exists(file_path):
-               os.remove(file_path)
-            raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail=f"Failed to save image: {str(e)}"
-                )
 
-      return uploaded_imaegs
+            images.append(image_data)
+
+         # Save all records in one transaction, this also releases the content locks
+         created_images = await self.repository.create_many(images)
+
+      except Exception as e:
+         # Files placed by this upload go again unless another upload referenced them meanwhile
+         await self.db.rollback()
+         for content_hash, file_name in placed.items():
+            variants = stored[content_hash][1] if content_hash in stored else {}
+            await self.__release_files(content_hash, self.__stored_paths(file_name, variants))
+         if isinstance(e, HTTPException):
+            raise
+         raise HTTPException(
+                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                 detail=f"Failed to save image: {str(e)}"
+             )
+      finally:
+         await self.__remove_files(temp_paths)
+
+      return [ImageRead.model_validate(image) for image in created_images]
 
 
    async def update(self, image_id: UUID, file: UploadFile) -> ImageRead:
@@ -147,39 +246,47 @@ class ImageService:
       
       self._validate_image_file(file)
 
-      old_file_path = os.path.join(self.upload_directory, image.file_name).replace("\\", "/")
-      
-      if os.path.exists(old_file_path):
-         try:
-            os.remove(old_file_path)
-         except Exception:
-            pass
-            
-      file_extension = os.path.splitext(file.filename)[1] or ".png" # type: ignore
-      unique_file_name = f"{uuid.uuid4().hex}{file_extension}"
-      new_file_path = os.path.join(self.upload_directory, unique_file_name).replace("\\", "/")
+      old_content_hash = image.content_hash
+      old_file_paths = self.__stored_paths(image.file_name, image.variants)
+
+      temp_path = self.__temp_path()
+      file_size, content_hash = await self.__stream_to_disk(file, temp_path)
+      placed_file_paths: List[str] = []
 
       try:
-         with open(new_file_path, "wb") as buffer:
-                  content = await file.read()
-                  buffer.write(content)
-         
-         image.file_name = unique_file_name
+         await self.repository.lock_content_hashes([content_hash])
+         existing = await self.repository.get_by_content_hash(content_hash)
+         if existing:
+            file_name, variants = existing.file_name, existing.variants
+         else:
+            file_name = await self.__place(temp_path, content_hash, file.filename)
+            placed_file_paths = self.__stored_paths(file_name, {})
+            variants = await generate_variants(self.upload_directory, file_name)
+            placed_file_paths = self.__stored_paths(file_name, variants)
+
+         image.variants = variants
+         image.file_name = file_name
+         image.content_hash = content_hash
          image.original_file_name = file.filename or "unknown"
-         image.file_size = len(content)
+         image.file_size = file_size
          image.mime_type = file.content_type or "image/png"
 
          updated_image = await self.repository.update(image)
-
-         return ImageRead.model_validate(updated_image)
       
       except Exception as e:
-         if os.path.exists(new_file_path):
-            os.remove(new_file_path)
+         await self.db.rollback()
+         if placed_file_paths:
+            await self.__release_files(content_hash, placed_file_paths)
          raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to update image: {str(e)}"
          )
+      finally:
+         await self.__remove_files([temp_path])
+
+      # the old files go only once the new ones are saved and nothing else uses them
+      await self.__release_files(old_content_hash, old_file_paths)
+      return ImageRead.model_validate(updated_image)
 
 
    async def delete(self, image_id: UUID) -> bool:
@@ -189,15 +296,12 @@ class ImageService:
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Image not found"
             )
-      # Delete file from filesystem
-      if os.path.exists(DIRECTORY + image.file_name):
-         try:
-            os.remove(DIRECTORY + image.file_name)
-         except Exception:
-            pass  # Continue even if file deletion fails
+      content_hash = image.content_hash
+      file_paths = self.__stored_paths(image.file_name, image.variants)
 
       # Delete from database
-      return await self.repository.delete(image_id)
-
-
+      deleted = await self.repository.delete(image_id)
 
+      # Delete files from filesystem once the last reference is gone, failures are ignored
+      await self.__release_files(content_hash, file_paths)
+      return deleted
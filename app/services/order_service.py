@@ -1,24 +1,64 @@
 
+from decimal import ROUND_HALF_UP, Decimal
 from fastapi import HTTPException, status
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import desc, select
 from uuid import UUID
-from typing import List, Optional
-
-from app.enums.enums import Order_Status
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional
+
+from app.core.pagination import DEFAULT_PAGE_SIZE, decode_cursor, encode_cursor
+from app.enums.enums import Order_Status, Province
+from app.models.order import Order
+from app.models.order_item import OrderItem
+from app.repositories.cart_repository import CartRepository
+from app.repositories.coupon_repository import CouponRepository
+from app.repositories.discount_repository import DiscountRepository
 from app.repositories.order_repository import OrderRepository
-from app.schemas.order import OrderRead, OrderCreate, OrderWithItems, OrderUpdate
+from app.repositories.shipment_repository import ShipmentRepository
+from app.repositories.stock_reservation_repository import StockReservationRepository
+from app.schemas.order import OrderPage, OrderRead, OrderCreate, OrderWithItems, OrderUpdate
 from app.schemas.order_item import OrderItemCreate, OrderItemRead, OrderItemUpdate
 
+CENT = Decimal("0.01")
+
+
+def _apply_percent(amount: Decimal, percent: int) -> Decimal:
+   """ amount less percent %, rounded to cents """
+   return (amount * (100 - percent) / 100).quantize(CENT, rounding= ROUND_HALF_UP)
+
+
 class OrderService:
    def __init__(self, db: AsyncSession) -> None:
       self.db = db
       self.repository = OrderRepository(db)
+      self.cart_repository = CartRepository(db)
+      self.coupon_repository = CouponRepository(db)
+      self.discount_repository = DiscountRepository(db)
+      self.shipment_repository = ShipmentRepository(db)
+      self.reservation_repository = StockReservationRepository(db)
+
+
+   def __checkout_error(self, detail: str) -> HTTPException:
+      return HTTPException(
+         status_code= status.HTTP_400_BAD_REQUEST,
+         detail= detail
+      )
+
+
+   def __coupon_error(self) -> HTTPException:
+      return self.__checkout_error("Coupon does not exists, expired or the order total is below its minimum")
 
 
    async def get_all(self) -> List[OrderRead]:
       orders = await self.repository.get_all()
       return [OrderRead.model_validate(order) for order in orders]
+
+
+   async def stream_all(self) -> AsyncIterator[List[OrderRead]]:
+      async for orders in self.repository.stream_all():
+         yield [OrderRead.model_validate(order) for order in orders]
    
 
    async def get_by_id(self, order_id: UUID) -> OrderRead:
@@ -41,18 +81,121 @@ class OrderService:
       return OrderRead.model_validate(order)
 
 
-   async def get_by_status(self, order_status: Order_Status) -> OrderRead:
-      order = await self.repository.get_by_status(order_status)
-      if not order:
-         raise HTTPException(
-            status_code= status.HTTP_404_NOT_FOUND,
-            detail="order Not found"
+   async def get_by_status(
+         self,
+         order_status: Order_Status,
+         limit: int = DEFAULT_PAGE_SIZE,
+         after: Optional[str] = None
+         ) -> OrderPage:
+      """ a page of the orders in order_status, oldest first. An empty queue is an empty page """
+      after_key = decode_cursor(after, datetime.fromisoformat, UUID) if after else None
+      orders, next_key = await self.repository.get_by_status(order_status, limit, after_key) # type: ignore
+      return OrderPage(
+         items= [OrderRead.model_validate(order) for order in orders],
+         next_cursor= encode_cursor(next_key) if next_key else None
+      )
+
+
+   async def get_status_counts(self) -> Dict[Order_Status, int]:
+      return await self.repository.get_status_counts()
+
+
+   async def create(self, order_data: OrderCreate) -> OrderWithItems:
+      """
+      Checkout the cart of the profile's user into an order. Everything runs in one transaction with a
+      fixed number of round trips, whatever the number of lines: stock, discounts and order items
+      are handled as batches, never per line
+      """
+      try:
+         order = await self.__checkout(order_data)
+         await self.db.commit()
+      except HTTPException:
+         await self.db.rollback()
+         raise
+      except IntegrityError:
+         # the address, or a row removed meanwhile, checked by postgres instead of loading it first
+         await self.db.rollback()
+         raise self.__checkout_error("Address not found")
+
+      return OrderWithItems.model_validate(order)
+
+
+   async def __checkout(self, order_data: OrderCreate) -> Order:
+      cart = await self.cart_repository.get_cart_for_checkout(order_data.user_profile_id)
+      if not cart:
+         raise self.__checkout_error("Cart not found")
+      if not cart.cart_items:
+         raise self.__checkout_error("Cart is empty")
+      cart_items = list(cart.cart_items)
+
+      # Shipping, the cost comes from the shipment serving the province
+      try:
+         province = Province(order_data.ship_to_province.lower())
+      except ValueError:
+         raise self.__checkout_error(f"Invalid province {order_data.ship_to_province}")
+      shipment = await self.shipment_repository.get_by_province(province)
+      if not shipment or shipment.id != order_data.shipment_id:
+         raise self.__checkout_error(f"No shipment serves {province}")
+      shipment_discount = max(
+         (discount.discount_amount for discount in shipment.shipment_discounts if discount.is_currently_active),
+         default= 0
+      )
+      shipping_cost = _apply_percent(shipment.cost, shipment_discount)
+
+      # Stock, reservations become sold, expired lines are reserved now
+      quantities = {cart_item.product_id: cart_item.quantity for cart_item in cart_items}
+      short = await self.reservation_repository.consume(cart.id, quantities)
+      if short:
+         raise self.__checkout_error(f"Not enough stock for products: {', '.join(str(product_id) for product_id in short)}")
+
+      # Lines, each at its price less the best active product or category discount
+      discounts = await self.discount_repository.get_best_product_discounts(list(quantities))
+      order_items = [
+         OrderItem(
+            product_id= cart_item.product_id,
+            quantity= cart_item.quantity,
+            unit_price= _apply_percent(cart_item.unit_price, discounts.get(cart_item.product_id, 0))
          )
-      return OrderRead.model_validate(order)
-
-
-   async def create(self, order_data: OrderCreate):
-      pass
+         for cart_item in cart_items
+      ]
+      sub_total = sum((order_item.sub_total for order_item in order_items), Decimal("0.00"))
+
+      # Coupon, from the order or the one applied to the cart. Priced here, its use is counted last
+      coupon_id = order_data.coupon_id or cart.coupon_id
+      coupon_amount = Decimal("0.00")
+      coupon_percent = await self.coupon_repository.get_discount_amount(coupon_id) if coupon_id else None
+      if coupon_id and coupon_percent is None:
+         raise self.__coupon_error()
+      if coupon_percent is not None:
+         coupon_amount = sub_total - _apply_percent(sub_total, coupon_percent)
+
+      order = Order(
+         ship_to_province= province.value,
+         ship_to_city= order_data.ship_to_city,
+         ship_to_street= order_data.ship_to_street,
+         ship_to_contact= order_data.ship_to_contact,
+         coupon_amount= coupon_amount,
+         sub_total= sub_total,
+         shipping_cost= shipping_cost,
+         total= sub_total + shipping_cost - coupon_amount,
+         status= Order_Status.PENDING,
+         coupon_id= coupon_id,
+         shipment_id= shipment.id,
+         user_profile_id= order_data.user_profile_id,
+         address_id= order_data.address_id
+      )
+      order.order_items = order_items
+
+      await self.cart_repository.empty_after_checkout(cart.id)
+      # order and items are written by the flush, the items as one multi row insert
+      await self.repository.add_with_items(order)
+
+      # the redemption locks the coupon row until commit, as the last statement checkouts sharing
+      # a popular coupon only queue behind each other for that update
+      if coupon_percent is not None:
+         if not await self.coupon_repository.redeem(coupon_id, cart.user_id, sub_total, coupon_percent):
+            raise self.__coupon_error()
+      return order
 
 
    async def update(self, order_id: UUID, update_data: OrderUpdate):
@@ -1,17 +1,34 @@
 
-from typing import List, Optional
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 from uuid import UUID
 from fastapi import HTTPException, status
+from pydantic import ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import select
 from sqlalchemy import or_, text
+from sqlalchemy.exc import DBAPIError
 
 
+from app.authentication.auth_schema import UserRole, UserSnapshot
+from app.enums.enums import Bulk_Format, Search_Algorithm
+from app.core.bulk_io import csv_line, iter_records, ndjson_line
+from app.core.constants import PRODUCT_IMPORT_CHUNK_SIZE, PRODUCT_IMPORT_MAX_ERRORS
+from app.core.pagination import DEFAULT_PAGE_SIZE, decode_cursor, encode_cursor
 from app.models.product import Product
 from app.models.seller_profile import SellerProfile
 from app.repositories.seller_profile_repository import SellerProfileRepository
-from app.schemas.product import ProductCreate, ProductRead, ProductUpdate, ProductWithCategories
+from app.schemas.product import (
+   ProductCreate,
+   ProductImportError,
+   ProductImportResult,
+   ProductImportRow,
+   ProductPage,
+   ProductRead,
+   ProductUpdate,
+   ProductWithCategories
+)
 from app.repositories.product_repository import ProductRepository
+from app.repositories.load_plans import PRODUCT_UPDATE
 from app.repositories.category_repository import CategoryRepository
 
 
@@ -25,14 +42,36 @@ class ProductService:
 
 
 
-   async def get_all_products(self, only_available: bool =False) -> List[ProductRead]:
-      products = await self.repository.get_all(only_available)
-      if not products:
+   def __decode_name_cursor(self, after: Optional[str]) -> Optional[Tuple[str, UUID]]:
+      return decode_cursor(after, str, UUID) if after else None # type: ignore
+
+
+   def __to_response(self, products: List[Product], limit: Optional[int], next_key: Optional[tuple]) -> List[ProductRead] | ProductPage:
+      items = [ProductRead.model_validate(product) for product in products]
+      if limit is None:
+         return items
+      return ProductPage(
+         items= items,
+         next_cursor= encode_cursor(next_key) if next_key else None
+      )
+
+
+   async def get_all_products(
+         self,
+         only_available: bool =False,
+         limit: Optional[int] = None,
+         after: Optional[str] = None
+         ) -> List[ProductRead] | ProductPage:
+      if after and not limit:
+         limit = DEFAULT_PAGE_SIZE
+
+      products, next_key = await self.repository.get_all(only_available, limit, self.__decode_name_cursor(after))
+      if not products and not after:
          raise HTTPException(
             status_code= status.HTTP_404_NOT_FOUND,
             detail= "There are no products"
          )
-      return [ProductRead.model_validate(product) for product in products]
+      return self.__to_response(products, limit, next_key)
 
 
    async def get_product_by_id(self, id: UUID, include_categories: bool = False) -> ProductRead | ProductWithCategories:
@@ -64,29 +103,56 @@ class ProductService:
       return ProductRead.model_validate(product)
 
 
-   async def get_products_by_category_id(self, category_id: UUID, only_available: bool = False) -> List[ProductRead]:
-      products = await self.repository.get_by_category_id(category_id, only_available)
-      
-      if not products:
+   async def get_products_by_category_id(
+         self,
+         category_id: UUID,
+         only_available: bool = False,
+         limit: Optional[int] = None,
+         after: Optional[str] = None
+         ) -> List[ProductRead] | ProductPage:
+      if after and not limit:
+         limit = DEFAULT_PAGE_SIZE
+
+      products, next_key = await self.repository.get_by_category_id(
+         category_id, only_available, limit, self.__decode_name_cursor(after)
+      )
+      if not products and not after:
          raise HTTPException(
             status_code = status.HTTP_404_NOT_FOUND,
             detail = "There are no products"
          )
-      return [ProductRead.model_validate(product) for product in products]
+      return self.__to_response(products, limit, next_key)
 
 
-   async def get_products_by_seller_id(self, seller_id: UUID, only_available: bool = False) -> List[ProductRead]:
-      products = await self.repository.get_by_seller_id(seller_id, only_available)
+   async def get_products_by_seller_id(
+         self,
+         seller_id: UUID,
+         only_available: bool = False,
+         limit: Optional[int] = None,
+         after: Optional[str] = None
+         ) -> List[ProductRead] | ProductPage:
+      if after and not limit:
+         limit = DEFAULT_PAGE_SIZE
 
-      if not products:
+      products, next_key = await self.repository.get_by_seller_id(
+         seller_id, only_available, limit, self.__decode_name_cursor(after)
+      )
+      if not products and not after:
          raise HTTPException(
             status_code = status.HTTP_404_NOT_FOUND,
             detail = "There are no products"
          )
-      return [ProductRead.model_validate(product) for product in products] 
+      return self.__to_response(products, limit, next_key)
 
 
-   async def search_products(self, text: str, use_full_text: bool = False, only_available: bool = False) -> List[ProductRead]:
+   async def search_products(
+         self,
+         text: str,
+         algorithm: Search_Algorithm = Search_Algorithm.ILIKE,
+         only_available: bool = False,
+         limit: Optional[int] = None,
+         after: Optional[str] = None
+         ) -> List[ProductRead] | ProductPage:
       if not text.strip():
          raise HTTPException(
             status_code= status.HTTP_400_BAD_REQUEST,
@@ -94,16 +160,33 @@ class ProductService:
          )
       
       text = text.strip()
-
-      if use_full_text:
+      if after and not limit:
+         limit = DEFAULT_PAGE_SIZE
+
+      # full text and trigram pages are ordered by (rank, id), ILIKE pages by (name, id)
+      if algorithm in (Search_Algorithm.FULL_TEXT, Search_Algorithm.TRIGRAM):
+         rank_after = decode_cursor(after, float, UUID) if after else None
+         ranked_search = (
+            self.repository.full_text_search
+            if algorithm == Search_Algorithm.FULL_TEXT
+            else self.repository.trigram_search
+         )
          try:
-            products = await self.repository.full_text_search(text, only_available)
-         except:
-            products = await self.repository.search(text, only_available)
+            products, next_key = await ranked_search(text, only_available, limit, rank_after) # type: ignore
+         except DBAPIError:
+            # e.g. pg_trgm is not installed, the failed statement aborted the transaction
+            await self.db.rollback()
+            if limit:
+               # ILIKE pages use (name, id) cursors, switching mid pagination would hand out the wrong kind
+               raise HTTPException(
+                  status_code= status.HTTP_503_SERVICE_UNAVAILABLE,
+                  detail= f"{algorithm.value} search is not available, use {Search_Algorithm.ILIKE.value}"
+               )
+            products, next_key = await self.repository.search(text, only_available)
       else:
-         products = await self.repository.search(text, only_available)
+         products, next_key = await self.repository.search(text, only_available, limit, self.__decode_name_cursor(after))
 
-      return [ProductRead.model_validate(product) for product in products]
+      return self.__to_response(products, limit, next_key)
 
 
    async def create_product(self, user_id: UUID, product_data: ProductCreate) -> ProductRead:
@@ -126,6 +209,12 @@ class ProductService:
             detail="One or more categories not found"
             )
 
+      if await self.repository.exists_by_name(product_data.name):
+         raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Product with name {product_data.name} already exists"
+         )
+
       product = Product(
          name = product_data.name,
          price= product_data.price,
@@ -158,7 +247,7 @@ class ProductService:
     update_data: ProductUpdate
 ) -> ProductRead:
     
-    product = await self.repository.get_by_id(product_id)
+    product = await self.repository.get_by_id(product_id, PRODUCT_UPDATE)
     if not product:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -192,6 +281,17 @@ class ProductService:
                 detail=f"Product with name {update_dict['name']} already exists"
             )
 
+    # the seller writes the total on hand, carts keep what they hold
+    stock_quantity = update_dict.pop("stock_quantity", None)
+    if stock_quantity is not None:
+        held = await self.repository.lock_held_quantity(product_id)
+        if stock_quantity < held:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"{held} units are held in carts, stock can not go below that"
+            )
+        product.stock_quantity = stock_quantity - held
+
     # Update other fields
     for field, value in update_dict.items():
         if field != "category_ids" and hasattr(product, field) and value is not None:
@@ -201,3 +301,140 @@ class ProductService:
     return ProductRead.model_validate(updated_product)
 
 
+   def __import_failed(self, result: ProductImportResult, row: int, detail: str) -> None:
+      result.failed += 1
+      if len(result.errors) < PRODUCT_IMPORT_MAX_ERRORS:
+         result.errors.append(ProductImportError(row= row, detail= detail))
+
+
+   async def import_products(self, user_id: UUID, chunks: AsyncIterator[bytes], bulk_format: Bulk_Format) -> ProductImportResult:
+      """
+      Create or update (by name) the seller's products from a CSV or NDJSON stream.
+      Rows are handled PRODUCT_IMPORT_CHUNK_SIZE at a time and each chunk commits on its own,
+      bad rows are reported and skipped
+      """
+      seller = await self.seller_profile_repository.get_by_user_id(user_id)
+      if not seller:
+         raise HTTPException(
+            status_code= status.HTTP_400_BAD_REQUEST,
+            detail="Seller profile not found"
+         )
+
+      result = ProductImportResult()
+      batch: List[Tuple[int, ProductImportRow]] = []
+      async for record in iter_records(chunks, bulk_format):
+         if record.error:
+            self.__import_failed(result, record.row, record.error)
+            continue
+         try:
+            batch.append((record.row, ProductImportRow.model_validate(record.values)))
+         except ValidationError as e:
+            detail = "; ".join(f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in e.errors())
+            self.__import_failed(result, record.row, detail)
+            continue
+
+         if len(batch) >= PRODUCT_IMPORT_CHUNK_SIZE:
+            await self.__import_chunk(seller.id, batch, result)
+            batch = []
+
+      if batch:
+         await self.__import_chunk(seller.id, batch, result)
+      return result
+
+
+   async def __import_chunk(self, seller_profile_id: UUID, batch: List[Tuple[int, ProductImportRow]], result: ProductImportResult) -> None:
+      # one statement cannot upsert a name twice, the last row of a name wins
+      rows_by_name: Dict[str, Tuple[int, ProductImportRow]] = {}
+      for row, product in reversed(batch):
+         if product.name in rows_by_name:
+            self.__import_failed(result, row, f"Superseded by row {rows_by_name[product.name][0]}")
+            continue
+         rows_by_name[product.name] = (row, product)
+
+      refs = list({ref for _, product in rows_by_name.values() for ref in product.categories})
+      category_ids, ambiguous = await self.category_repository.get_ids_by_refs(refs) if refs else ({}, set())
+
+      valid: Dict[str, Tuple[int, ProductImportRow]] = {}
+      for name, (row, product) in rows_by_name.items():
+         shared = [ref for ref in product.categories if ref in ambiguous]
+         if shared:
+            self.__import_failed(result, row, f"Category names shared by several categories, use their ids: {', '.join(shared)}")
+            continue
+         missing = [ref for ref in product.categories if ref not in category_ids]
+         if missing:
+            self.__import_failed(result, row, f"Categories not found: {', '.join(missing)}")
+            continue
+         valid[name] = (row, product)
+      if not valid:
+         return
+
+      existing = await self.repository.lock_by_names(list(valid))
+      for name, (row, product) in list(valid.items()):
+         if name not in existing:
+            continue
+         seller_id, held = existing[name]
+         if seller_id != seller_profile_id:
+            self.__import_failed(result, row, f"Product with name {name} belongs to another seller")
+            del valid[name]
+         elif product.stock_quantity < held:
+            self.__import_failed(result, row, f"{held} units of {name} are held in carts, stock can not go below that")
+            del valid[name]
+      if not valid:
+         await self.db.commit()
+         return
+
+      upserted = await self.repository.upsert_many(
+         seller_profile_id,
+         [product.model_dump(exclude={"categories"}) for _, product in valid.values()]
+      )
+      links: Dict[UUID, List[UUID]] = {}
+      for name, (row, product) in valid.items():
+         if name not in upserted:
+            self.__import_failed(result, row, f"Product with name {name} could not be written")
+            continue
+         product_id, created = upserted[name]
+         if created:
+            result.created += 1
+         else:
+            result.updated += 1
+         links[product_id] = [category_ids[ref] for ref in product.categories]
+
+      await self.repository.replace_categories(links)
+      await self.db.commit()
+
+
+   async def get_export_seller_id(self, user: UserSnapshot) -> Optional[UUID]:
+      """ sellers export their own catalog, admins every product (None) """
+      if user.role == UserRole.ADMIN:
+         return None
+      seller = await self.seller_profile_repository.get_by_user_id(user.id)
+      if not seller:
+         raise HTTPException(
+            status_code= status.HTTP_400_BAD_REQUEST,
+            detail="Seller profile not found"
+         )
+      return seller.id
+
+
+   async def export_products(self, bulk_format: Bulk_Format, seller_profile_id: Optional[UUID] = None) -> AsyncIterator[str]:
+      """ the import format, one chunk of text per fetched batch. Reads back with import_products """
+      if bulk_format == Bulk_Format.CSV:
+         yield csv_line(["name", "price", "stock_quantity", "description", "categories"])
+
+      async for batch in self.repository.stream_for_export(seller_profile_id):
+         if bulk_format == Bulk_Format.CSV:
+            yield "".join(
+               csv_line([row.name, row.price, row.stock_quantity, row.description, "|".join(row.categories or [])])
+               for row in batch
+            )
+         else:
+            yield "".join(
+               ndjson_line({
+                  "name": row.name,
+                  "price": row.price,
+                  "stock_quantity": row.stock_quantity,
+                  "description": row.description,
+                  "categories": row.categories or []
+               })
+               for row in batch
+            )
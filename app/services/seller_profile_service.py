@@ -1,6 +1,6 @@
 from __future__ import annotations
 from datetime import datetime
-from typing import Optional, List
+from typing import AsyncIterator, Optional, List
 from uuid import UUID
 from fastapi import HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -21,6 +21,11 @@ class SellerProfileService:
     async def get_all(self) -> List[SellerProfileRead]:
         sellers = await self.repository.get_all()
         return [SellerProfileRead.model_validate(seller) for seller in sellers]
+
+
+    async def stream_all(self) -> AsyncIterator[List[SellerProfileRead]]:
+        async for sellers in self.repository.stream_all():
+            yield [SellerProfileRead.model_validate(seller) for seller in sellers]
     
 
     async def get_all_active(self, is_active: bool) -> List[SellerProfileRead]:
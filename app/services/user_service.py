@@ -1,6 +1,6 @@
 from __future__ import annotations
 from datetime import datetime
-from typing import Optional, List
+from typing import AsyncIterator, Optional, List
 from uuid import UUID
 from fastapi import HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -21,6 +21,11 @@ class UserService:
       return [UserRead.model_validate(user) for user in users]
 
 
+   async def stream_all(self) -> AsyncIterator[List[UserRead]]:
+      async for users in self.repository.stream_all():
+         yield [UserRead.model_validate(user) for user in users]
+
+
    async def get_by_id(self, id: UUID) -> Optional[UserRead]:
       user = await self.repository.get_by_id(id)
       if not user:
@@ -0,0 +1,148 @@
+"""
+Concurrent redemptions of one coupon, the atomic path against a read-check-write one.
+
+"atomic" is CouponRepository.redeem, the checkout path: one conditional UPDATE .. used_count + 1
+WHERE used_count < max_uses .. RETURNING, and the CouponUsage row in the same transaction.
+"naive" reads the coupon, checks is_currently_active in Python and writes used_count + 1 back,
+which is how a coupon was validated before. Each of --requests tasks runs its own transaction, all
+started at once, against a throwaway coupon with --max-uses uses in DATABASE_URL. The atomic run
+fails unless exactly max_uses redemptions succeed and used_count and the usage rows agree.
+
+    python -m benchmarks.coupon_redemption --requests 500 --max-uses 100
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Awaitable, Callable, Dict, List
+from uuid import UUID
+
+from sqlalchemy import delete, func, select
+
+import app.main  # noqa: F401, the app's modules import in this order
+from app.db.database import AsyncSessionLocal
+from app.models.coupon import Coupon
+from app.models.coupon_usage import CouponUsage
+from app.models.user import User
+from app.repositories.coupon_repository import CouponRepository
+
+ORDER_TOTAL = Decimal("100.00")
+DISCOUNT_AMOUNT = 10
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+   ordered = sorted(samples)
+   return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+async def create_coupon(max_uses: int) -> UUID:
+   now = datetime.now()
+   async with AsyncSessionLocal() as session: # type: ignore
+      coupon = Coupon(
+         discount_amount= DISCOUNT_AMOUNT,
+         min_order_amount= Decimal("1.00"),
+         max_uses= max_uses,
+         start_at= now - timedelta(hours= 1),
+         end_at= now + timedelta(hours= 1)
+      )
+      session.add(coupon)
+      await session.commit()
+      return coupon.id
+
+
+async def delete_coupon(coupon_id: UUID) -> None:
+   async with AsyncSessionLocal() as session: # type: ignore
+      await session.execute(delete(CouponUsage).where(CouponUsage.coupon_id == coupon_id)) # type: ignore
+      await session.execute(delete(Coupon).where(Coupon.id == coupon_id)) # type: ignore
+      await session.commit()
+
+
+async def redeem_atomic(coupon_id: UUID, user_id: UUID) -> bool:
+   async with AsyncSessionLocal() as session: # type: ignore
+      redeemed = await CouponRepository(session).redeem(coupon_id, user_id, ORDER_TOTAL, DISCOUNT_AMOUNT)
+      await session.commit()
+      return redeemed
+
+
+async def redeem_naive(coupon_id: UUID, user_id: UUID) -> bool:
+   async with AsyncSessionLocal() as session: # type: ignore
+      coupon = (await session.execute(select(Coupon).where(Coupon.id == coupon_id))).scalar_one()
+      if not coupon.is_currently_active:
+         return False
+      # the window between the read above and this write is where other requests slip in
+      await asyncio.sleep(0)
+      coupon.used_count = coupon.used_count + 1
+      session.add(CouponUsage(user_id= user_id, coupon_id= coupon_id))
+      await session.commit()
+      return True
+
+
+async def counts(coupon_id: UUID) -> Dict[str, int]:
+   async with AsyncSessionLocal() as session: # type: ignore
+      used_count = (await session.execute(select(Coupon.used_count).where(Coupon.id == coupon_id))).scalar_one()
+      usages = (await session.execute(
+         select(func.count()).select_from(CouponUsage).where(CouponUsage.coupon_id == coupon_id) # type: ignore
+      )).scalar_one()
+   return {"used_count": used_count, "usages": usages}
+
+
+async def measure(redeem: Callable[[UUID, UUID], Awaitable[bool]], requests: int, max_uses: int, user_id: UUID) -> Dict[str, float]:
+   coupon_id = await create_coupon(max_uses)
+   try:
+      samples: List[float] = []
+
+      async def attempt() -> bool:
+         started = time.perf_counter()
+         try:
+            return await redeem(coupon_id, user_id)
+         finally:
+            samples.append((time.perf_counter() - started) * 1000)
+
+      started = time.perf_counter()
+      results = await asyncio.gather(*(attempt() for _ in range(requests)), return_exceptions= True)
+      elapsed = time.perf_counter() - started
+      return {
+         "redeemed": sum(1 for result in results if result is True),
+         "failed": sum(1 for result in results if isinstance(result, Exception)),
+         **(await counts(coupon_id)),
+         "p50": statistics.median(samples),
+         "p99": percentile(samples, 0.99),
+         "per_second": requests / elapsed,
+      }
+   finally:
+      await delete_coupon(coupon_id)
+
+
+def report(label: str, result: Dict[str, float]) -> None:
+   print(
+      f"{label:7s} redeemed {int(result['redeemed']):5d}   used_count {int(result['used_count']):5d}   "
+      f"usages {int(result['usages']):5d}   errors {int(result['failed']):4d}   "
+      f"p50 {result['p50']:8.2f} ms   p99 {result['p99']:8.2f} ms   {result['per_second']:8.1f} req/s"
+   )
+
+
+async def run(requests: int, max_uses: int) -> None:
+   async with AsyncSessionLocal() as session: # type: ignore
+      user_id = (await session.execute(select(User.id).limit(1))).scalar_one_or_none()
+   if user_id is None:
+      raise SystemExit("No user, seed the database first (SEED_DATABASE=true)")
+
+   print(f"{requests} concurrent redemptions of a coupon with max_uses {max_uses}")
+   naive = await measure(redeem_naive, requests, max_uses, user_id)
+   report("naive", naive)
+   atomic = await measure(redeem_atomic, requests, max_uses, user_id)
+   report("atomic", atomic)
+
+   expected = min(requests, max_uses)
+   if atomic["failed"] or not atomic["redeemed"] == atomic["used_count"] == atomic["usages"] == expected:
+      raise SystemExit(f"atomic redemption is off, expected {expected} everywhere")
+
+
+if __name__ == "__main__":
+   parser = argparse.ArgumentParser(description= __doc__, formatter_class= argparse.RawDescriptionHelpFormatter)
+   parser.add_argument("--requests", type= int, default= 500, help= "concurrent redemption attempts")
+   parser.add_argument("--max-uses", type= int, default= 100, help= "max_uses of the throwaway coupon")
+   arguments = parser.parse_args()
+   asyncio.run(run(arguments.requests, arguments.max_uses))
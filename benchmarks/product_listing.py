@@ -0,0 +1,124 @@
+"""
+p50 / p99 latency of GET /api/v1/products/ before and after PydanticJSONResponse.
+
+"before" serves the same ProductService result the way the route did before: FastAPI validates
+the returned schemas against response_model, dumps them to jsonable dicts and JSONResponse runs
+json.dumps. "after" is the real route, which writes the schemas straight to JSON with pydantic_core.
+Both run in process through the ASGI app against DATABASE_URL, with --products throwaway products
+inserted first and deleted at the end.
+
+    python -m benchmarks.product_listing --products 500 --requests 200
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+from decimal import Decimal
+from typing import Dict, List
+
+import httpx
+from fastapi import Depends
+from fastapi.responses import JSONResponse
+from sqlalchemy import delete, select
+
+import app.main as main
+from app.db.database import AsyncSessionLocal
+from app.models.product import Product
+from app.models.seller_profile import SellerProfile
+from app.routers.product_router import ProductListResponse, get_read_product_service
+from app.services.product_service import ProductService
+
+BEFORE_PATH = "/benchmark/products-before"
+AFTER_PATH = "/api/v1/products/"
+
+
+@main.app.get(BEFORE_PATH, response_model= ProductListResponse, response_class= JSONResponse, include_in_schema= False)
+async def products_before(service: ProductService = Depends(get_read_product_service)):
+   return await service.get_all_products()
+
+
+async def insert_products(count: int, marker: str) -> None:
+   async with AsyncSessionLocal() as session: # type: ignore
+      seller_id = (await session.execute(select(SellerProfile.id).limit(1))).scalar_one_or_none()
+      if seller_id is None:
+         raise SystemExit("No seller profile, seed the database first (SEED_DATABASE=true)")
+      session.add_all([
+         Product(
+            name= f"{marker} {i}",
+            price= Decimal("19.99") + i,
+            stock_quantity= i % 20,
+            description= "Benchmark product " * 8,
+            seller_profile_id= seller_id
+         )
+         for i in range(count)
+      ])
+      await session.commit()
+
+
+async def delete_products(marker: str) -> None:
+   async with AsyncSessionLocal() as session: # type: ignore
+      await session.execute(delete(Product).where(Product.name.startswith(marker))) # type: ignore
+      await session.commit()
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+   ordered = sorted(samples)
+   return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+async def measure(client: httpx.AsyncClient, path: str, requests: int, warmup: int) -> Dict[str, float]:
+   for _ in range(warmup):
+      (await client.get(path)).raise_for_status()
+   samples = []
+   size = 0
+   for _ in range(requests):
+      started = time.perf_counter()
+      response = await client.get(path)
+      samples.append((time.perf_counter() - started) * 1000)
+      response.raise_for_status()
+      size = len(response.content)
+   return {
+      "p50": statistics.median(samples),
+      "p99": percentile(samples, 0.99),
+      "mean": statistics.fmean(samples),
+      "bytes": size,
+   }
+
+
+def report(label: str, result: Dict[str, float]) -> None:
+   print(f"{label:8s} p50 {result['p50']:8.2f} ms   p99 {result['p99']:8.2f} ms   mean {result['mean']:8.2f} ms   {int(result['bytes'])} bytes")
+
+
+async def run(products: int, requests: int, warmup: int) -> None:
+   marker = f"benchmark-{uuid.uuid4().hex[:8]}"
+   await insert_products(products, marker)
+   try:
+      transport = httpx.ASGITransport(app= main.app)
+      async with httpx.AsyncClient(transport= transport, base_url= "http://benchmark") as client:
+         before_body = (await client.get(BEFORE_PATH)).json()
+         after_body = (await client.get(AFTER_PATH)).json()
+         if before_body != after_body:
+            raise SystemExit("before and after bodies differ")
+
+         # alternate the two so drift in the database affects both alike
+         runs: Dict[str, List[Dict[str, float]]] = {"before": [], "after": []}
+         rounds = 4
+         for _ in range(rounds):
+            runs["before"].append(await measure(client, BEFORE_PATH, requests // rounds, warmup))
+            runs["after"].append(await measure(client, AFTER_PATH, requests // rounds, warmup))
+
+      print(f"GET /api/v1/products/ with {len(after_body)} products, {requests} requests each")
+      for label, results in runs.items():
+         report(label, {key: statistics.median(result[key] for result in results) for key in results[0]})
+   finally:
+      await delete_products(marker)
+
+
+if __name__ == "__main__":
+   parser = argparse.ArgumentParser(description= __doc__, formatter_class= argparse.RawDescriptionHelpFormatter)
+   parser.add_argument("--products", type= int, default= 500, help= "throwaway products inserted for the run")
+   parser.add_argument("--requests", type= int, default= 200, help= "timed requests per variant")
+   parser.add_argument("--warmup", type= int, default= 5, help= "untimed requests before each round")
+   arguments = parser.parse_args()
+   asyncio.run(run(arguments.products, arguments.requests, arguments.warmup))
@@ -0,0 +1,112 @@
+"""
+SQL statements per read endpoint, checked against a budget so a relationship that goes back to
+selectin (or a schema field that needs an unplanned relationship) shows up as a failure.
+
+Each endpoint runs in process through the ASGI app against DATABASE_URL and every statement sent
+on any engine is counted. The budgets are the counts with the load plans of
+app/repositories/load_plans.py. Before them GET /products/{id} took 7 statements, GET /categories/ 7
+and GET /carts/{id} 9. A throwaway user with a --items line cart is inserted first and deleted at
+the end, the products and categories are the seeded ones. Exits 1 when an endpoint is over budget.
+
+    python -m benchmarks.query_counts --items 5
+"""
+import argparse
+import asyncio
+import uuid
+from decimal import Decimal
+from typing import Dict, List, Tuple
+from uuid import UUID
+
+import httpx
+from sqlalchemy import delete, event, select
+from sqlalchemy.engine import Engine
+
+import app.main as main
+from app.db.database import AsyncSessionLocal
+from app.models.cart import Cart
+from app.models.cart_item import CartItem
+from app.models.category import Category
+from app.models.product import Product
+from app.models.user import User
+
+STATEMENTS = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+
+statements: List[str] = []
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def count_statement(conn, cursor, statement, parameters, context, executemany):
+   if statement.lstrip().upper().startswith(STATEMENTS):
+      statements.append(statement)
+
+
+async def insert_cart(items: int) -> Tuple[UUID, UUID]:
+   async with AsyncSessionLocal() as session: # type: ignore
+      products = (await session.execute(select(Product).limit(items))).scalars().all()
+      if not products:
+         raise SystemExit("No products, seed the database first (SEED_DATABASE=true)")
+      user = User(full_name= "Query Count", email= f"query-count-{uuid.uuid4().hex[:8]}@example.com", password_hash= "x")
+      session.add(user)
+      await session.flush()
+      cart = Cart(user_id= user.id)
+      session.add(cart)
+      await session.flush()
+      session.add_all([
+         CartItem(cart_id= cart.id, product_id= product.id, quantity= 1, unit_price= product.price or Decimal("1.00"))
+         for product in products
+      ])
+      await session.commit()
+      return user.id, cart.id
+
+
+async def delete_cart(user_id: UUID, cart_id: UUID) -> None:
+   async with AsyncSessionLocal() as session: # type: ignore
+      await session.execute(delete(CartItem).where(CartItem.cart_id == cart_id)) # type: ignore
+      await session.execute(delete(Cart).where(Cart.id == cart_id)) # type: ignore
+      await session.execute(delete(User).where(User.id == user_id)) # type: ignore
+      await session.commit()
+
+
+async def endpoints(cart_id: UUID) -> Dict[str, int]:
+   """ path to statement budget, one per planned relationship whatever the number of rows """
+   async with AsyncSessionLocal() as session: # type: ignore
+      product_id = (await session.execute(select(Product.id).limit(1))).scalar_one()
+      category_id = (await session.execute(select(Category.id).limit(1))).scalar_one()
+   return {
+      "/api/v1/products/": 2,
+      "/api/v1/products/?limit=10": 2,
+      f"/api/v1/products/{product_id}": 2,
+      f"/api/v1/products/{product_id}?include_categories=true": 5,
+      "/api/v1/categories/": 3,
+      f"/api/v1/categories/{category_id}?include_products=true": 5,
+      f"/api/v1/carts/{cart_id}": 4,
+      f"/api/v1/carts/items/{cart_id}": 3,
+   }
+
+
+async def run(items: int) -> bool:
+   user_id, cart_id = await insert_cart(items)
+   within_budget = True
+   try:
+      budgets = await endpoints(cart_id)
+      transport = httpx.ASGITransport(app= main.app)
+      async with httpx.AsyncClient(transport= transport, base_url= "http://benchmark") as client:
+         print(f"{'endpoint':70s} {'status':>6s} {'queries':>7s} {'budget':>6s}")
+         for path, budget in budgets.items():
+            statements.clear()
+            response = await client.get(path)
+            count = len(statements)
+            over = response.status_code != 200 or count > budget
+            within_budget = within_budget and not over
+            print(f"{path:70s} {response.status_code:6d} {count:7d} {budget:6d}{'  <- over' if over else ''}")
+   finally:
+      await delete_cart(user_id, cart_id)
+   return within_budget
+
+
+if __name__ == "__main__":
+   parser = argparse.ArgumentParser(description= __doc__, formatter_class= argparse.RawDescriptionHelpFormatter)
+   parser.add_argument("--items", type= int, default= 5, help= "lines in the throwaway cart")
+   arguments = parser.parse_args()
+   if not asyncio.run(run(arguments.items)):
+      raise SystemExit(1)